@@ -7,8 +7,9 @@ Coordinates the 7-agent pipeline to transform scripts into animated video reels:
 3. Planner → Create video-optimized scene plans
 4. AnimatedVisual → Generate 6-second video clips (Nova Reel)
 5. EnhancedVoice → Generate audio with character voices + visemes
-6. AnimationCompositor → Stitch video clips with audio sync
-7. DialogueOverlay → Add character name badges + karaoke dialogue
+6. DialogueOverlay → Plan character name badges + karaoke dialogue
+7. AnimationCompositor → Stitch video clips with audio sync, drawing the
+   dialogue overlays in the same encode
 
 Usage:
     python animated_reel_orchestrator.py <script_file> <reel_name> [--theme <theme>]
@@ -17,7 +18,9 @@ Usage:
 import os
 import sys
 import json
+import logging
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
 from moviepy import VideoFileClip, CompositeVideoClip
 
@@ -28,6 +31,17 @@ from animated_visual_agent import AnimatedVisualAgent
 from voice_agent import VoiceAgent
 from animation_compositor_agent import AnimationCompositorAgent
 from dialogue_overlay_agent import DialogueOverlayAgent
+from media_utils import drawtext_available, get_h264_encoder_params, probe_durations, remux_video
+
+# Configure logging (REEL_LOG=DEBUG also shows per-poll Nova Reel progress)
+logging.basicConfig(
+    level=os.getenv("REEL_LOG", "INFO"),
+    format="%(asctime)s %(message)s",
+    handlers=[
+        logging.StreamHandler(sys.stdout)
+    ]
+)
+logger = logging.getLogger(__name__)
 
 
 class AnimatedReelOrchestrator:
@@ -43,7 +57,8 @@ class AnimatedReelOrchestrator:
         script_text: str,
         reel_name: str,
         theme: str = "Cinematic",
-        mode: str = "story"
+        mode: str = "story",
+        legacy_compose: bool = False
     ) -> str:
         """
         Full pipeline: script → animated reel with dialogue overlays.
@@ -53,22 +68,24 @@ class AnimatedReelOrchestrator:
             reel_name: Name for organizing outputs
             theme: Visual theme (Cinematic, Cartoon, etc.)
             mode: "story" or "news"
+            legacy_compose: Composite first, then draw overlays with MoviePy
+                CompositeVideoClip in a second encode
 
         Returns:
             Path to final animated reel MP4
         """
-        print("=" * 80)
-        print("ANIMATED REEL ORCHESTRATOR")
-        print("=" * 80)
-        print(f"\nReel Name: {reel_name}")
-        print(f"Theme: {theme}")
-        print(f"Mode: {mode}\n")
+        logger.info("=" * 80)
+        logger.info("ANIMATED REEL ORCHESTRATOR")
+        logger.info("=" * 80)
+        logger.info(f"Reel Name: {reel_name}")
+        logger.info(f"Theme: {theme}")
+        logger.info(f"Mode: {mode}")
 
         try:
             # Stage 1: Parse Script
-            print("\n" + "=" * 80)
-            print("STAGE 1/7: SCRIPT PARSING")
-            print("=" * 80)
+            logger.info("=" * 80)
+            logger.info("STAGE 1/7: SCRIPT PARSING")
+            logger.info("=" * 80)
 
             script_parser = ScriptParserAgent()
 
@@ -77,15 +94,27 @@ class AnimatedReelOrchestrator:
 
             parsed_script = script_parser.parse_script(script_text, reel_name)
 
-            print(f"\n✓ Script parsed: {parsed_script['title']}")
-            print(f"  Characters: {len(parsed_script['characters'])}")
-            print(f"  Scenes: {len(parsed_script['scenes'])}")
-            print(f"  Total duration: {parsed_script['total_duration']}s")
+            logger.info(f"✓ Script parsed: {parsed_script['title']}")
+            logger.info(f"  Characters: {len(parsed_script['characters'])}")
+            logger.info(f"  Scenes: {len(parsed_script['scenes'])}")
+            logger.info(f"  Total duration: {parsed_script['total_duration']}s")
+
+            # Stage 5 only needs the parsed script, so synthesize voices in the
+            # background while characters, planning and Nova Reel run
+            voice_executor = ThreadPoolExecutor(max_workers=1)
+            voice_agent = VoiceAgent()
+            audio_future = voice_executor.submit(
+                voice_agent.generate_audio_for_animated_scenes,
+                parsed_script=parsed_script,
+                reel_name=reel_name,
+                mode=mode
+            )
+            voice_executor.shutdown(wait=False)
 
             # Stage 2: Design Characters
-            print("\n" + "=" * 80)
-            print("STAGE 2/7: CHARACTER DESIGN")
-            print("=" * 80)
+            logger.info("=" * 80)
+            logger.info("STAGE 2/7: CHARACTER DESIGN")
+            logger.info("=" * 80)
 
             character_designer = CharacterDesignerAgent()
             character_bibles = character_designer.design_characters(
@@ -94,12 +123,12 @@ class AnimatedReelOrchestrator:
                 reel_name=reel_name
             )
 
-            print(f"\n✓ Characters designed: {len(character_bibles['characters'])}")
+            logger.info(f"✓ Characters designed: {len(character_bibles['characters'])}")
 
             # Stage 3: Plan Video Scenes
-            print("\n" + "=" * 80)
-            print("STAGE 3/7: VIDEO PLANNING")
-            print("=" * 80)
+            logger.info("=" * 80)
+            logger.info("STAGE 3/7: VIDEO PLANNING")
+            logger.info("=" * 80)
 
             video_plan = generate_video_plan(
                 parsed_script=parsed_script,
@@ -108,14 +137,14 @@ class AnimatedReelOrchestrator:
                 reel_name=reel_name
             )
 
-            print(f"\n✓ Video plan created: {len(video_plan['scenes'])} scenes")
+            logger.info(f"✓ Video plan created: {len(video_plan['scenes'])} scenes")
 
             # Stage 4: Generate Animated Video Clips
-            print("\n" + "=" * 80)
-            print("STAGE 4/7: ANIMATED VIDEO GENERATION (Nova Reel)")
-            print("=" * 80)
-            print("\n⚠️  WARNING: Each video takes 14-17 minutes to generate!")
-            print(f"   Total estimated time: {len(video_plan['scenes']) * 15} minutes\n")
+            logger.info("=" * 80)
+            logger.info("STAGE 4/7: ANIMATED VIDEO GENERATION (Nova Reel)")
+            logger.info("=" * 80)
+            logger.info("⚠️  WARNING: Each video takes 14-17 minutes to generate!")
+            logger.info(f"   All {len(video_plan['scenes'])} scenes run in parallel (~15-20 minutes total)")
 
             animated_visual = AnimatedVisualAgent()
             scene_videos = animated_visual.generate_scene_videos(
@@ -124,95 +153,181 @@ class AnimatedReelOrchestrator:
                 reel_name=reel_name
             )
 
-            print(f"\n✓ Videos generated: {len(scene_videos)} clips")
+            logger.info(f"✓ Videos generated: {len(scene_videos)} clips")
 
             # Stage 5: Generate Character Audio + Visemes
-            print("\n" + "=" * 80)
-            print("STAGE 5/7: CHARACTER VOICE SYNTHESIS")
-            print("=" * 80)
+            logger.info("=" * 80)
+            logger.info("STAGE 5/7: CHARACTER VOICE SYNTHESIS")
+            logger.info("=" * 80)
 
-            voice_agent = VoiceAgent()
-            audio_data = voice_agent.generate_audio_for_animated_scenes(
-                parsed_script=parsed_script,
-                reel_name=reel_name,
-                mode=mode
-            )
+            # Started after Stage 1 - usually already finished by now
+            audio_data = audio_future.result()
 
-            print(f"\n✓ Audio generated: {len(audio_data)} tracks")
+            logger.info(f"✓ Audio generated: {len(audio_data)} tracks")
 
-            # Stage 6: Composite Video Clips
-            print("\n" + "=" * 80)
-            print("STAGE 6/7: VIDEO COMPOSITION")
-            print("=" * 80)
+            final_path = os.path.join(self.base_output_dir, reel_name, f"{reel_name}.mp4")
+
+            # Calculate scene start times based on actual audio durations -
+            # the overlays only depend on the audio, not on the composite video
+            scene_start_times = self._calculate_scene_start_times(audio_data)
 
             compositor = AnimationCompositorAgent()
-            composite_video_path = compositor.composite_scenes(
-                scene_videos=scene_videos,
-                audio_data=audio_data,
-                reel_name=reel_name
-            )
+            dialogue_agent = DialogueOverlayAgent()
 
-            print(f"\n✓ Composite video created: {composite_video_path}")
+            if not legacy_compose and not drawtext_available():
+                logger.warning("ffmpeg has no drawtext filter, drawing dialogue overlays with MoviePy")
+                legacy_compose = True
+
+            if legacy_compose:
+                self._composite_two_pass(
+                    compositor,
+                    dialogue_agent,
+                    parsed_script,
+                    scene_videos,
+                    audio_data,
+                    scene_start_times,
+                    reel_name,
+                    final_path
+                )
+            else:
+                # Stage 6: Plan Dialogue Overlays
+                logger.info("=" * 80)
+                logger.info("STAGE 6/7: DIALOGUE OVERLAYS")
+                logger.info("=" * 80)
+
+                overlay_specs = dialogue_agent.create_dialogue_overlay_specs_for_scenes(
+                    parsed_script=parsed_script,
+                    audio_data=audio_data,
+                    scene_start_times=scene_start_times
+                )
+
+                logger.info(f"✓ Dialogue overlays created: {len(overlay_specs)} clips")
+
+                # Stage 7: Composite Video Clips + Overlays in one encode
+                logger.info("=" * 80)
+                logger.info("STAGE 7/7: VIDEO COMPOSITION")
+                logger.info("=" * 80)
+
+                compositor.composite_scenes(
+                    scene_videos=scene_videos,
+                    audio_data=audio_data,
+                    reel_name=reel_name,
+                    overlay_specs=overlay_specs,
+                    font_path=dialogue_agent.font,
+                    output_path=final_path
+                )
+
+            logger.info("=" * 80)
+            logger.info("✓ ANIMATED REEL COMPLETE!")
+            logger.info("=" * 80)
+            logger.info(f"Final video: {final_path}")
+            logger.info(f"Duration: {parsed_script['total_duration']}s")
+            logger.info(f"Scenes: {len(parsed_script['scenes'])}")
+            logger.info(f"Characters: {len(parsed_script['characters'])}")
 
-            # Stage 7: Add Dialogue Overlays
-            print("\n" + "=" * 80)
-            print("STAGE 7/7: DIALOGUE OVERLAYS")
-            print("=" * 80)
+            return final_path
 
-            # Calculate scene start times based on actual audio durations
-            scene_start_times = self._calculate_scene_start_times(audio_data)
+        except Exception as e:
+            # Stack traces only with REEL_DEBUG=1; formatted by logging, off the hot path
+            logger.error(f"✗ ERROR in orchestration: {e}", exc_info=bool(os.getenv("REEL_DEBUG")))
+            raise
 
-            dialogue_agent = DialogueOverlayAgent()
-            dialogue_clips = dialogue_agent.create_dialogue_overlays_for_scenes(
-                parsed_script=parsed_script,
-                audio_data=audio_data,
-                scene_start_times=scene_start_times
-            )
+    def _composite_two_pass(
+        self,
+        compositor: AnimationCompositorAgent,
+        dialogue_agent: DialogueOverlayAgent,
+        parsed_script: Dict,
+        scene_videos: List[str],
+        audio_data: List[Dict],
+        scene_start_times: List[float],
+        reel_name: str,
+        final_path: str
+    ):
+        """
+        Composite the scenes, then draw MoviePy overlays in a second encode (legacy path).
 
-            print(f"\n✓ Dialogue overlays created: {len(dialogue_clips)} clips")
+        Args:
+            compositor: Compositor agent
+            dialogue_agent: Dialogue overlay agent
+            parsed_script: Output from ScriptParserAgent
+            scene_videos: Scene video paths or URLs
+            audio_data: Audio data dicts from VoiceAgent
+            scene_start_times: Start time of each scene in seconds
+            reel_name: Name of the reel
+            final_path: Output MP4 path
+        """
+        # Stage 6: Composite Video Clips
+        logger.info("=" * 80)
+        logger.info("STAGE 6/7: VIDEO COMPOSITION")
+        logger.info("=" * 80)
+
+        composite_video_path = compositor.composite_scenes(
+            scene_videos=scene_videos,
+            audio_data=audio_data,
+            reel_name=reel_name
+        )
 
-            # Final composition
-            print("\nCompositing final video with dialogue overlays...")
+        logger.info(f"✓ Composite video created: {composite_video_path}")
 
-            composite_video = VideoFileClip(composite_video_path)
+        # Stage 7: Add Dialogue Overlays
+        logger.info("=" * 80)
+        logger.info("STAGE 7/7: DIALOGUE OVERLAYS")
+        logger.info("=" * 80)
 
-            if dialogue_clips:
-                final_video = CompositeVideoClip([composite_video] + dialogue_clips)
-            else:
-                final_video = composite_video
+        dialogue_clips = dialogue_agent.create_dialogue_overlays_for_scenes(
+            parsed_script=parsed_script,
+            audio_data=audio_data,
+            scene_start_times=scene_start_times
+        )
 
-            # Save final video
-            final_path = os.path.join(self.base_output_dir, reel_name, f"{reel_name}.mp4")
+        logger.info(f"✓ Dialogue overlays created: {len(dialogue_clips)} clips")
+
+        if not dialogue_clips:
+            # Nothing to draw - copy the composite streams without re-encoding
+            logger.info(f"No dialogue overlays, remuxing composite video to: {final_path}")
+            remux_video(composite_video_path, final_path)
+        else:
+            self._compose_with_moviepy(composite_video_path, dialogue_clips, final_path)
+
+    def _compose_with_moviepy(
+        self,
+        composite_video_path: str,
+        dialogue_clips: List,
+        final_path: str
+    ):
+        """
+        Composite MoviePy dialogue clips over the video and re-encode (legacy path).
+
+        Args:
+            composite_video_path: Path to the stitched scene video
+            dialogue_clips: MoviePy overlay clips from DialogueOverlayAgent
+            final_path: Output MP4 path
+        """
+        logger.info("Compositing final video with dialogue overlays...")
+
+        composite_video = VideoFileClip(composite_video_path)
 
-            print(f"\nWriting final video to: {final_path}")
+        try:
+            final_video = CompositeVideoClip([composite_video] + dialogue_clips)
+
+            # Use NVENC when a GPU is available, libx264 otherwise
+            encoder_params = get_h264_encoder_params()
+
+            logger.info(f"Writing final video to: {final_path} ({encoder_params['codec']})")
             final_video.write_videofile(
                 final_path,
                 fps=24,
-                codec='libx264',
                 audio_codec='aac',
                 temp_audiofile='temp-audio-final.m4a',
-                remove_temp=True
+                remove_temp=True,
+                **encoder_params
             )
 
-            # Cleanup
-            composite_video.close()
             final_video.close()
 
-            print("\n" + "=" * 80)
-            print("✓ ANIMATED REEL COMPLETE!")
-            print("=" * 80)
-            print(f"\nFinal video: {final_path}")
-            print(f"Duration: {parsed_script['total_duration']}s")
-            print(f"Scenes: {len(parsed_script['scenes'])}")
-            print(f"Characters: {len(parsed_script['characters'])}")
-
-            return final_path
-
-        except Exception as e:
-            print(f"\n✗ ERROR in orchestration: {e}")
-            import traceback
-            traceback.print_exc()
-            raise
+        finally:
+            # Always release the ffmpeg reader process
+            composite_video.close()
 
     def _calculate_scene_start_times(self, audio_data: List[Dict]) -> List[float]:
         """
@@ -224,19 +339,14 @@ class AnimatedReelOrchestrator:
         Returns:
             List of start times in seconds
         """
-        from moviepy import AudioFileClip
+        # Probe all durations in parallel straight from the container headers
+        durations = probe_durations([audio_dict['audio_path'] for audio_dict in audio_data])
 
         start_times = []
         cumulative_time = 0.0
 
-        for audio_dict in audio_data:
+        for actual_duration in durations:
             start_times.append(cumulative_time)
-
-            # Get actual audio duration
-            audio_clip = AudioFileClip(audio_dict['audio_path'])
-            actual_duration = audio_clip.duration
-            audio_clip.close()
-
             cumulative_time += actual_duration
 
         return start_times
@@ -269,12 +379,17 @@ def main():
         choices=["story", "news"],
         help="Content mode: story (creative) or news (factual)"
     )
+    parser.add_argument(
+        "--legacy-compose",
+        action="store_true",
+        help="Composite, then draw dialogue overlays with MoviePy in a second encode"
+    )
 
     args = parser.parse_args()
 
     # Read script file
     if not os.path.exists(args.script_file):
-        print(f"Error: Script file not found: {args.script_file}")
+        logger.error(f"Error: Script file not found: {args.script_file}")
         sys.exit(1)
 
     with open(args.script_file, "r") as f:
@@ -288,23 +403,24 @@ def main():
             script_text=script_text,
             reel_name=args.reel_name,
             theme=args.theme,
-            mode=args.mode
+            mode=args.mode,
+            legacy_compose=args.legacy_compose
         )
 
-        print(f"\n🎬 Success! Watch your animated reel: {final_video}")
+        logger.info(f"🎬 Success! Watch your animated reel: {final_video}")
         sys.exit(0)
 
     except Exception as e:
-        print(f"\n❌ Failed to generate animated reel: {e}")
+        logger.error(f"❌ Failed to generate animated reel: {e}")
         sys.exit(1)
 
 
 if __name__ == "__main__":
     # Test mode if no arguments provided
     if len(sys.argv) == 1:
-        print("=" * 80)
-        print("ANIMATED REEL ORCHESTRATOR - TEST MODE")
-        print("=" * 80)
+        logger.info("=" * 80)
+        logger.info("ANIMATED REEL ORCHESTRATOR - TEST MODE")
+        logger.info("=" * 80)
 
         # Create test script
         test_script = """TITLE: The Robot's Journey
@@ -330,8 +446,8 @@ CAMERA: Pan down from robot to flower
 
         orchestrator = AnimatedReelOrchestrator()
 
-        print("\nTest script loaded. Running orchestrator...")
-        print("Note: This will take approximately 30 minutes (2 scenes × 15 min each)\n")
+        logger.info("Test script loaded. Running orchestrator...")
+        logger.info("Note: This will take approximately 30 minutes (2 scenes × 15 min each)")
 
         try:
             final_video = orchestrator.orchestrate_animated_reel(
@@ -341,12 +457,11 @@ CAMERA: Pan down from robot to flower
                 mode="story"
             )
 
-            print(f"\n✓ Test successful! Video: {final_video}")
+            logger.info(f"✓ Test successful! Video: {final_video}")
 
         except Exception as e:
-            print(f"\n✗ Test failed: {e}")
-            import traceback
-            traceback.print_exc()
+            # orchestrate_animated_reel already logged the traceback (with REEL_DEBUG=1)
+            logger.error(f"✗ Test failed: {e}")
 
     else:
         main()
@@ -1,18 +1,180 @@
 import os
 import json
+import logging
 import base64
+import hashlib
 import time
-import random
 import uuid
+import threading
 import boto3
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import unquote_plus
+from boto3.s3.transfer import TransferConfig
 from botocore.auth import SigV4Auth
 from botocore.awsrequest import AWSRequest
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
+from bedrock_utils import get_aws_client, get_bedrock_client
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+class _PollerStopped(RuntimeError):
+    """A scene's wait ended because the reel's poller was stopped, not because it failed."""
+
+
+class _S3Poller:
+    """
+    Watches a reel's S3 output prefix on behalf of every in-flight scene.
+
+    A single background thread lists the prefix (or drains the S3 event queue
+    when one is configured) and wakes each scene waiting on its sub-prefix,
+    so the number of S3 calls no longer grows with the number of scenes.
+    """
+
+    # With an event queue, S3 is still listed this often (seconds) in case
+    # the queue's notifications are misconfigured or lost
+    FALLBACK_LIST_INTERVAL = 300
+
+    def __init__(self, agent: "AnimatedVisualAgent", prefix: str, poll_interval: int = 30):
+        self.agent = agent
+        self.prefix = prefix
+        self.poll_interval = poll_interval
+        self._last_list = 0.0
+        self._keys: Dict[str, str] = {}
+        self._events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._start_time = time.time()
+
+    def start(self):
+        self._start_time = time.time()
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling; scenes still waiting are released with _PollerStopped."""
+        self._stop.set()
+        with self._lock:
+            for event in self._events.values():
+                event.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def register(self, s3_path: str) -> threading.Event:
+        """Start watching a scene output prefix (idempotent)."""
+        with self._lock:
+            event = self._events.setdefault(s3_path, threading.Event())
+            if self._stop.is_set():
+                event.set()
+            return event
+
+    def wait_for(self, s3_path: str, timeout: float) -> str:
+        """
+        Block until a video appears under s3_path.
+
+        Args:
+            s3_path: S3 key prefix for the scene output
+            timeout: Maximum seconds to wait
+
+        Returns:
+            S3 key of the generated .mp4
+        """
+        if not self.register(s3_path).wait(timeout):
+            raise TimeoutError(f"Video generation timed out after {timeout} seconds")
+        with self._lock:
+            if s3_path not in self._keys:
+                raise _PollerStopped(f"Stopped waiting for {s3_path}")
+            return self._keys[s3_path]
+
+    def _run(self):
+        # List once up front in case jobs finished before we started waiting
+        self._list_once()
+
+        while not self._stop.is_set() and self._pending():
+            if self.agent.sqs_client:
+                # Long-poll blocks for up to 20s, no extra sleep needed
+                self._drain_events()
+                if time.time() - self._last_list >= self.FALLBACK_LIST_INTERVAL:
+                    self._list_once()
+            elif self._stop.wait(self.poll_interval):
+                break
+            else:
+                self._list_once()
+
+            if self._pending():
+                elapsed = int(time.time() - self._start_time)
+                logger.debug("  Waiting for %d video(s)... (%ds elapsed)", self._pending(), elapsed)
+
+    def _pending(self) -> int:
+        with self._lock:
+            return sum(1 for event in self._events.values() if not event.is_set())
+
+    def _found(self, key: str):
+        if not key.endswith(".mp4"):
+            return
+        with self._lock:
+            for s3_path, event in self._events.items():
+                if key.startswith(s3_path) and not event.is_set():
+                    self._keys[s3_path] = key
+                    event.set()
+
+    def _list_once(self):
+        self._last_list = time.time()
+        try:
+            paginator = self.agent.s3_client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.agent.s3_bucket, Prefix=self.prefix):
+                for obj in page.get("Contents", []):
+                    self._found(obj["Key"])
+        except Exception as e:
+            logger.warning("  Poll error - checking S3: %.50s...", e)
+
+    def _drain_events(self):
+        """
+        Long-poll the S3 event queue and match created keys against our prefix.
+
+        The queue must be dedicated to the output bucket's
+        s3:ObjectCreated:* notifications (directly, via SNS, or via
+        EventBridge). Messages for our prefix and S3 test events are deleted;
+        messages for other prefixes (e.g. another reel being generated) are
+        left alone and become visible again after the queue's visibility
+        timeout, without being released early and received over and over.
+        """
+        try:
+            response = self.agent.sqs_client.receive_message(
+                QueueUrl=self.agent.s3_event_queue_url,
+                MaxNumberOfMessages=10,
+                WaitTimeSeconds=20
+            )
+        except Exception as e:
+            logger.warning("  Poll error - reading S3 events: %.50s...", e)
+            self._stop.wait(self.poll_interval)
+            return
+
+        for message in response.get("Messages", []):
+            body = message.get("Body", "")
+            keys = self.agent._extract_event_keys(body)
+            ours = [k for k in keys if k.startswith(self.prefix)]
+
+            for key in ours:
+                self._found(key)
+
+            # S3 sends a test event when notifications are set up; it is
+            # nobody's, so it would otherwise circle the queue forever
+            if ours or "s3:TestEvent" in body:
+                try:
+                    self.agent.sqs_client.delete_message(
+                        QueueUrl=self.agent.s3_event_queue_url,
+                        ReceiptHandle=message["ReceiptHandle"]
+                    )
+                except Exception as e:
+                    logger.warning("  Poll error - deleting S3 event: %s...", str(e)[:50])
+
+
 class AnimatedVisualAgent:
     """
     Generates animated video clips using Amazon Nova Reel 1.1.
@@ -23,16 +185,55 @@ class AnimatedVisualAgent:
 
     def __init__(self):
         self.region = os.getenv("AWS_REGION", "us-east-1")
-        self.bedrock_runtime = boto3.client(
-            service_name="bedrock-runtime",
-            region_name=self.region
+        self.bedrock_runtime = get_bedrock_client(self.region)
+        self.s3_client = get_aws_client("s3", self.region)
+
+        # Ranged, concurrent GETs for scene downloads - one stream rarely fills the link
+        self._s3_transfer_config = TransferConfig(
+            multipart_threshold=8 * 1024 * 1024,
+            multipart_chunksize=8 * 1024 * 1024,
+            max_concurrency=10,
+            use_threads=True
+        )
+
+        # Keep-alive HTTP session and credentials for direct async-invoke calls
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        self._http.mount("https://", adapter)
+        self._credentials = boto3.Session().get_credentials()
+
+        # Optional SQS queue, dedicated to the output bucket's
+        # s3:ObjectCreated:* events. When set, completion is detected from
+        # events instead of polling (S3 is still listed every few minutes).
+        self.s3_event_queue_url = os.getenv("S3_EVENT_QUEUE_URL")
+        self.sqs_client = (
+            get_aws_client("sqs", self.region)
+            if self.s3_event_queue_url else None
         )
-        self.s3_client = boto3.client("s3", region_name=self.region)
         self.model_id = os.getenv("NOVA_REEL_MODEL_ID", "amazon.nova-reel-v1:1")
         self.s3_bucket = os.getenv("S3_BUCKET_NAME", "reelforge-video-output")
         self.s3_prefix = os.getenv("S3_VIDEO_PREFIX", "generated-videos/")
         self.base_output_dir = "output"
 
+        # Hand scene videos to ffmpeg as presigned S3 URLs instead of downloading
+        # them first. Off by default: resume_composition.py needs the local MP4s.
+        self.stream_scene_videos = os.getenv("STREAM_SCENE_VIDEOS") == "1"
+        self.presigned_url_ttl = int(os.getenv("S3_PRESIGNED_URL_TTL", "21600"))  # 6 hours
+
+        # Nova Reel jobs run for 14-17 minutes on the service side, so all
+        # scenes are submitted up front and polled concurrently. Submissions
+        # themselves are throttled to stay under the async-invoke TPS limit.
+        self.max_concurrent_submits = int(os.getenv("NOVA_REEL_MAX_CONCURRENT_SUBMITS", "1"))
+        self.submit_delay = 5  # Seconds to hold off new submissions after a 429
+        self._last_429_time = 0.0
+        self._submit_semaphore = threading.BoundedSemaphore(self.max_concurrent_submits)
+
+        # Finished prompts keyed by (characters, action, camera)
+        self._prompt_cache: Dict[tuple, str] = {}
+
+        # Guards output/<reel>/nova_reel_jobs.json across submit/await threads
+        self._job_state_lock = threading.Lock()
+
     def generate_scene_videos(
         self,
         video_plan: Dict,
@@ -51,35 +252,58 @@ class AnimatedVisualAgent:
             List of file paths to generated video clips
         """
         scenes = video_plan.get("scenes", [])
-        generated_videos = []
-
-        videos_dir = os.path.join(self.base_output_dir, reel_name, "videos")
-        os.makedirs(videos_dir, exist_ok=True)
+        if not scenes:
+            return []
 
-        print(f"\n=== Generating {len(scenes)} animated video clips ===")
+        logger.info("=== Generating %d animated video clips ===", len(scenes))
 
-        for i, scene in enumerate(scenes):
-            scene_num = scene.get("scene_number")
-            print(f"\nScene {scene_num}:")
+        bible_index = self._index_character_bibles(character_bibles)
 
-            try:
-                video_path = self.generate_scene_video(
-                    scene=scene,
-                    character_bibles=character_bibles,
-                    reel_name=reel_name
-                )
-                generated_videos.append(video_path)
-                print(f"  ✓ Video saved: {video_path}")
-
-                # Add delay between scenes to avoid rate limits (except after last scene)
-                if i < len(scenes) - 1:
-                    delay = 5  # 5 seconds between scenes
-                    print(f"  Waiting {delay}s before next scene...")
-                    time.sleep(delay)
-
-            except Exception as e:
-                print(f"  ✗ Error generating scene {scene_num}: {e}")
-                raise
+        # Submit every scene first so the Nova Reel jobs run in parallel
+        jobs = [None] * len(scenes)
+        with ThreadPoolExecutor(max_workers=len(scenes)) as executor:
+            futures = {
+                executor.submit(self._submit_scene_job, scene, bible_index, reel_name): idx
+                for idx, scene in enumerate(scenes)
+            }
+            for future in as_completed(futures):
+                idx = futures[future]
+                scene_num = scenes[idx].get("scene_number")
+                try:
+                    jobs[idx] = future.result()
+                except Exception as e:
+                    logger.error("  ✗ Error submitting scene %s: %s", scene_num, e)
+                    raise
+
+        logger.info("All %d jobs submitted, waiting for completion (this takes 14-17 minutes)...", len(jobs))
+
+        # Then wait for all of them concurrently, with one poller for the whole reel
+        poller = _S3Poller(self, f"{self.s3_prefix}{reel_name}/")
+        for job in jobs:
+            poller.register(self._s3_key_prefix(job["s3_output_uri"]))
+        poller.start()
+
+        generated_videos = [None] * len(jobs)
+        executor = ThreadPoolExecutor(max_workers=len(jobs))
+        try:
+            futures = {
+                executor.submit(self._await_scene_job, job, reel_name, poller): idx
+                for idx, job in enumerate(jobs)
+            }
+            for future in as_completed(futures):
+                idx = futures[future]
+                scene_num = jobs[idx]["scene_number"]
+                try:
+                    generated_videos[idx] = future.result()
+                    logger.info("  ✓ Scene %s video saved: %s", scene_num, generated_videos[idx])
+                except Exception as e:
+                    logger.error("  ✗ Error generating scene %s: %s", scene_num, e)
+                    raise
+        finally:
+            # After a failure, stopping the poller releases the scenes still
+            # waiting, so the error surfaces now instead of after the others
+            poller.stop()
+            executor.shutdown(wait=False, cancel_futures=True)
 
         return generated_videos
 
@@ -100,25 +324,51 @@ class AnimatedVisualAgent:
         Returns:
             File path to generated video
         """
-        scene_num = scene.get("scene_number")
+        bible_index = self._index_character_bibles(character_bibles)
+        job = self._submit_scene_job(scene, bible_index, reel_name)
+        return self._await_scene_job(job, reel_name)
 
-        # Build video prompt
-        video_prompt = self._build_video_prompt(scene, character_bibles)
+    def _submit_scene_job(
+        self,
+        scene: Dict,
+        bible_index: Dict[str, Dict],
+        reel_name: str
+    ) -> Dict:
+        """
+        Build the Nova Reel request for a scene and start the async job.
 
-        # Truncate to 512 chars max (Nova Reel limit)
-        if len(video_prompt) > 512:
-            video_prompt = video_prompt[:509] + "..."
-            print(f"  Prompt truncated to 512 chars")
+        Args:
+            scene: Scene plan with action_prompt, characters, camera_movement
+            bible_index: Character bibles keyed by name
+            reel_name: Name for organizing output
+
+        Returns:
+            Job handle with scene_number, invocation_arn, s3_output_uri and client_token
+        """
+        scene_num = scene.get("scene_number")
+
+        # Build video prompt (truncated to the Nova Reel limit)
+        video_prompt = self._build_video_prompt(scene, bible_index)
 
-        print(f"  Prompt ({len(video_prompt)} chars): {video_prompt[:100]}...")
+        logger.info("  Scene %s: Prompt (%d chars): %.100s...", scene_num, len(video_prompt), video_prompt)
 
         # Get character reference image (if available)
         character_ref_path = self._get_character_reference(
             scene.get("characters", []),
-            character_bibles,
+            bible_index,
             reel_name
         )
 
+        # Same reel, scene and prompt -> same token, so a retried or re-run
+        # submission is deduplicated instead of starting another 14-minute job
+        client_token = hashlib.sha1(f"{reel_name}:{scene_num}:{video_prompt}".encode("utf-8")).hexdigest()
+
+        with self._job_state_lock:
+            previous_job = self._load_job_state(reel_name).get(client_token)
+        if previous_job:
+            logger.info("  Scene %s: Resuming submitted job: %s", scene_num, previous_job["invocation_arn"])
+            return previous_job
+
         # Prepare Nova Reel request
         s3_output_uri = f"s3://{self.s3_bucket}/{self.s3_prefix}{reel_name}/scene_{scene_num}/"
 
@@ -130,7 +380,8 @@ class AnimatedVisualAgent:
             "videoGenerationConfig": {
                 "fps": 24,
                 "dimension": "1280x720",  # Nova Reel only supports horizontal (will crop to vertical later)
-                "seed": random.randint(0, 2147483646),
+                # Derived from the token: a reused token must carry an identical request
+                "seed": int(client_token[:8], 16) % 2147483647,
                 "durationSeconds": 6
             }
         }
@@ -139,7 +390,7 @@ class AnimatedVisualAgent:
         # For now, skip reference images - rely on detailed text prompts for consistency
         # TODO: Generate horizontal reference images at 1280x720
         # if character_ref_path and os.path.exists(character_ref_path):
-        #     print(f"  Using reference image: {os.path.basename(character_ref_path)}")
+        #     logger.info(f"  Using reference image: {os.path.basename(character_ref_path)}")
         #     with open(character_ref_path, "rb") as f:
         #         image_bytes = base64.b64encode(f.read()).decode('utf-8')
         #     model_input["textToVideoParams"]["images"] = [{
@@ -147,54 +398,167 @@ class AnimatedVisualAgent:
         #         "source": {"bytes": image_bytes}
         #     }]
 
-        # Start async job
-        print(f"  Starting Nova Reel generation (this takes 14-17 minutes)...")
+        # Start async job, backing off only if we were throttled recently
+        with self._submit_semaphore:
+            delay = self.submit_delay - (time.time() - self._last_429_time)
+            if delay > 0:
+                logger.info("  Scene %s: Recently rate limited, waiting %.1fs before submitting...", scene_num, delay)
+                time.sleep(delay)
 
-        try:
-            # Use direct HTTP request (boto3's start_async_invoke doesn't work)
-            invocation_arn = self._start_async_invoke_direct(model_input, s3_output_uri)
-            print(f"  Job ARN: {invocation_arn}")
+            try:
+                # Use direct HTTP request (boto3's start_async_invoke doesn't work)
+                invocation_arn = self._start_async_invoke_direct(
+                    model_input,
+                    s3_output_uri,
+                    client_token=client_token
+                )
+                logger.info("  Scene %s: Job ARN: %s", scene_num, invocation_arn)
+            except Exception as e:
+                logger.error("  Scene %s: Error in Nova Reel API call: %s", scene_num, e)
+                raise
+
+        job = {
+            "scene_number": scene_num,
+            "invocation_arn": invocation_arn,
+            "s3_output_uri": s3_output_uri,
+            "client_token": client_token
+        }
+        self._record_job(reel_name, job)
+        return job
 
-            # Poll S3 for completion
-            video_path = self._poll_and_download(
-                s3_output_uri,
+    def _await_scene_job(
+        self,
+        job: Dict,
+        reel_name: str,
+        poller: Optional[_S3Poller] = None
+    ) -> str:
+        """
+        Wait for a submitted Nova Reel job and download its video.
+
+        Args:
+            job: Job handle returned by _submit_scene_job
+            reel_name: Name for organizing output
+            poller: Shared poller for the reel (a private one is used if None)
+
+        Returns:
+            File path (or presigned URL when streaming) to generated video
+        """
+        # Poll S3 for completion
+        try:
+            return self._poll_and_download(
+                job["s3_output_uri"],
                 reel_name,
-                scene_num
+                job["scene_number"],
+                download=not self.stream_scene_videos,
+                poller=poller
             )
+        except _PollerStopped:
+            # Another scene failed; this job is still fine to resume next run
+            raise
+        except Exception:
+            # Don't resume this job on the next run; a resubmission reuses the
+            # same token, so Bedrock still deduplicates it if it is in flight
+            self._forget_job(reel_name, job["client_token"])
+            raise
 
-            return video_path
+    def _job_state_path(self, reel_name: str) -> str:
+        """Path of the JSON file recording submitted Nova Reel jobs for a reel."""
+        return os.path.join(self.base_output_dir, reel_name, "nova_reel_jobs.json")
 
-        except Exception as e:
-            print(f"  Error in Nova Reel API call: {e}")
-            raise
+    def _load_job_state(self, reel_name: str) -> Dict[str, Dict]:
+        """
+        Load submitted jobs for a reel, keyed by client token.
+
+        Args:
+            reel_name: Name of the reel
 
-    def _build_video_prompt(self, scene: Dict, character_bibles: Dict) -> str:
+        Returns:
+            Dictionary of client token -> job handle (empty if none recorded)
+        """
+        path = self._job_state_path(reel_name)
+        if not os.path.exists(path):
+            return {}
+
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("  Ignoring unreadable job state %s: %s", path, e)
+            return {}
+
+    def _save_job_state(self, reel_name: str, state: Dict[str, Dict]):
+        """Write the job state file atomically (caller holds _job_state_lock)."""
+        path = self._job_state_path(reel_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _record_job(self, reel_name: str, job: Dict):
+        """Persist a submitted job so a re-run resumes it instead of resubmitting."""
+        with self._job_state_lock:
+            state = self._load_job_state(reel_name)
+            state[job["client_token"]] = job
+            self._save_job_state(reel_name, state)
+
+    def _forget_job(self, reel_name: str, client_token: str):
+        """Drop a job from the state file."""
+        with self._job_state_lock:
+            state = self._load_job_state(reel_name)
+            if state.pop(client_token, None) is not None:
+                self._save_job_state(reel_name, state)
+
+    def _index_character_bibles(self, character_bibles: Dict) -> Dict[str, Dict]:
+        """
+        Index character bibles by name for O(1) lookup per scene.
+
+        Also resets the prompt cache, since prompts depend on the bibles.
+
+        Args:
+            character_bibles: Character visual bible collection
+
+        Returns:
+            Dictionary of character name to bible (first entry wins)
+        """
+        bible_index = {}
+        for char_bible in character_bibles.get("characters", []):
+            bible_index.setdefault(char_bible["name"], char_bible)
+
+        self._prompt_cache = {}
+        return bible_index
+
+    def _build_video_prompt(self, scene: Dict, bible_index: Dict[str, Dict]) -> str:
         """
         Build detailed video generation prompt.
 
+        Scenes with the same characters, action and camera share one cached prompt.
+
         Args:
             scene: Scene plan with action and camera info
-            character_bibles: Character descriptions
+            bible_index: Character bibles keyed by name
 
         Returns:
-            Formatted prompt string for Nova Reel
+            Formatted prompt string for Nova Reel (max 512 bytes)
         """
         # Get character prompt templates
         characters = scene.get("characters", [])
         action = scene.get("action_prompt", scene.get("action", ""))
         camera = scene.get("camera_movement", scene.get("camera", "static"))
 
+        cache_key = (tuple(characters), action, camera)
+        if cache_key in self._prompt_cache:
+            return self._prompt_cache[cache_key]
+
         # Find character in bible
         char_prompts = []
         for char_name in characters:
-            for char_bible in character_bibles.get("characters", []):
-                if char_bible["name"] == char_name:
-                    template = char_bible.get("nova_reel_prompt_template", "")
-                    if template:
-                        # Replace [ACTION] placeholder with actual action
-                        char_prompt = template.replace("[ACTION]", action)
-                        char_prompts.append(char_prompt)
-                        break
+            char_bible = bible_index.get(char_name)
+            template = char_bible.get("nova_reel_prompt_template", "") if char_bible else ""
+            if template:
+                # Replace [ACTION] placeholder with actual action
+                char_prompts.append(template.replace("[ACTION]", action))
 
         # If no character templates found, use basic action
         if not char_prompts:
@@ -208,12 +572,22 @@ class AnimatedVisualAgent:
         # Add style and quality
         style = "Cinematic, high quality, professional animation, 9:16 vertical format."
 
-        return f"{base_prompt} {camera_instruction} {style}"
+        video_prompt = f"{base_prompt} {camera_instruction} {style}"
+
+        # Truncate to 512 bytes max (Nova Reel limit) - counting bytes keeps
+        # non-ASCII prompts under the cap; a split character is dropped
+        prompt_bytes = video_prompt.encode("utf-8")
+        if len(prompt_bytes) > 512:
+            video_prompt = prompt_bytes[:509].decode("utf-8", "ignore") + "..."
+            logger.info("  Prompt truncated to 512 bytes")
+
+        self._prompt_cache[cache_key] = video_prompt
+        return video_prompt
 
     def _get_character_reference(
         self,
         characters: List[str],
-        character_bibles: Dict,
+        bible_index: Dict[str, Dict],
         reel_name: str
     ) -> Optional[str]:
         """
@@ -221,7 +595,7 @@ class AnimatedVisualAgent:
 
         Args:
             characters: List of character names in scene
-            character_bibles: Character visual bible collection
+            bible_index: Character bibles keyed by name
             reel_name: Name for finding files
 
         Returns:
@@ -231,25 +605,25 @@ class AnimatedVisualAgent:
             return None
 
         # Use first character's reference image
-        char_name = characters[0]
+        char_bible = bible_index.get(characters[0])
+        if not char_bible:
+            return None
 
-        # Find in character bibles
-        for char_bible in character_bibles.get("characters", []):
-            if char_bible["name"] == char_name:
-                ref_images = char_bible.get("reference_images", [])
-                if ref_images:
-                    # Prefer the "reference" view, otherwise use first
-                    for img in ref_images:
-                        if "reference" in img:
-                            return img
-                    return ref_images[0]
+        ref_images = char_bible.get("reference_images", [])
+        if not ref_images:
+            return None
 
-        return None
+        # Prefer the "reference" view, otherwise use first
+        for img in ref_images:
+            if "reference" in img:
+                return img
+        return ref_images[0]
 
     def _start_async_invoke_direct(
         self,
         model_input: Dict,
-        s3_output_uri: str
+        s3_output_uri: str,
+        client_token: Optional[str] = None
     ) -> str:
         """
         Start async invocation using direct HTTP request (boto3 method doesn't work).
@@ -257,6 +631,8 @@ class AnimatedVisualAgent:
         Args:
             model_input: Model input parameters
             s3_output_uri: S3 URI for output
+            client_token: Idempotency token; requests repeating a token are
+                deduplicated by Bedrock (a random one is used if None)
 
         Returns:
             Invocation ARN
@@ -270,39 +646,44 @@ class AnimatedVisualAgent:
                     "s3Uri": s3_output_uri
                 }
             },
-            "clientRequestToken": str(uuid.uuid4())
+            "clientRequestToken": client_token or str(uuid.uuid4())
         }
 
         url = f"https://bedrock-runtime.{self.region}.amazonaws.com/async-invoke"
 
-        # Sign request
-        session = boto3.Session()
-        credentials = session.get_credentials()
-
-        request = AWSRequest(
-            method='POST',
-            url=url,
-            data=json.dumps(body),
-            headers={'Content-Type': 'application/json'}
-        )
-        SigV4Auth(credentials, 'bedrock', self.region).add_auth(request)
+        # Body is identical across retries: serialize once, compactly, and use
+        # the same bytes for signing and sending
+        body_bytes = json.dumps(body, separators=(',', ':')).encode("utf-8")
 
         # Make request with retry logic for rate limits
         max_retries = 5
         base_delay = 10  # Start with 10 seconds
 
         for attempt in range(max_retries):
-            response = requests.post(url, data=json.dumps(body), headers=dict(request.headers))
+            # Sign every attempt - backoff can outlast the SigV4 validity window
+            request = AWSRequest(
+                method='POST',
+                url=url,
+                data=body_bytes,
+                headers={'Content-Type': 'application/json'}
+            )
+            SigV4Auth(self._credentials, 'bedrock', self.region).add_auth(request)
+
+            response = self._http.post(url, data=body_bytes, headers=dict(request.headers))
 
             if response.status_code == 200:
                 result = response.json()
                 return result["invocationArn"]
 
             elif response.status_code == 429:
+                self._last_429_time = time.time()
+
                 # Rate limit hit - wait and retry with exponential backoff
                 if attempt < max_retries - 1:
                     delay = base_delay * (2 ** attempt)  # 10s, 20s, 40s, 80s, 160s
-                    print(f"  Rate limit hit (429). Retrying in {delay}s... (attempt {attempt + 1}/{max_retries})")
+                    logger.warning(
+                        "  Rate limit hit (429). Retrying in %ss... (attempt %d/%d)", delay, attempt + 1, max_retries
+                    )
                     time.sleep(delay)
                 else:
                     raise Exception(f"Nova Reel API failed after {max_retries} attempts: {response.status_code} - {response.text}")
@@ -313,80 +694,118 @@ class AnimatedVisualAgent:
 
         raise Exception("Nova Reel API failed: Max retries exceeded")
 
+    def _s3_key_prefix(self, s3_output_uri: str) -> str:
+        """Strip the s3://bucket/ part of an output URI."""
+        return s3_output_uri.replace(f"s3://{self.s3_bucket}/", "")
+
     def _poll_and_download(
         self,
         s3_output_uri: str,
         reel_name: str,
         scene_num: int,
         poll_interval: int = 30,
-        max_wait: int = 1200  # 20 minutes max
+        max_wait: int = 1200,  # 20 minutes max
+        download: bool = True,
+        poller: Optional[_S3Poller] = None
     ) -> str:
         """
-        Poll S3 for video generation completion and download.
+        Wait for video generation completion in S3 and download.
+
+        Uses S3 event notifications from S3_EVENT_QUEUE_URL when configured,
+        otherwise lists the output prefix every poll_interval.
 
         Args:
             s3_output_uri: S3 URI where video will be saved
             reel_name: Name for organizing output
             scene_num: Scene number
-            poll_interval: Seconds between polls
+            poll_interval: Seconds between polls (when no shared poller is given)
             max_wait: Maximum seconds to wait
+            download: If False, return a presigned HTTPS URL instead of
+                downloading (MoviePy/ffmpeg can read it directly)
+            poller: Shared poller watching the whole reel prefix
 
         Returns:
-            Local file path to downloaded video
+            Local file path to downloaded video, or presigned URL
         """
         # Parse S3 URI
-        s3_path = s3_output_uri.replace(f"s3://{self.s3_bucket}/", "")
+        s3_path = self._s3_key_prefix(s3_output_uri)
 
-        print(f"  Polling S3: s3://{self.s3_bucket}/{s3_path}")
+        logger.info("  Scene %s: Polling S3: s3://%s/%s", scene_num, self.s3_bucket, s3_path)
 
-        start_time = time.time()
-        attempts = 0
+        if poller:
+            key = poller.wait_for(s3_path, max_wait)
+        else:
+            poller = _S3Poller(self, s3_path, poll_interval)
+            poller.register(s3_path)
+            poller.start()
+            try:
+                key = poller.wait_for(s3_path, max_wait)
+            finally:
+                poller.stop()
 
-        while time.time() - start_time < max_wait:
-            attempts += 1
+        logger.info("  Scene %s: ✓ Video found in S3: %s", scene_num, key)
 
-            try:
-                # List objects in output path
-                response = self.s3_client.list_objects_v2(
-                    Bucket=self.s3_bucket,
-                    Prefix=s3_path
-                )
+        if not download:
+            url = self.s3_client.generate_presigned_url(
+                "get_object",
+                Params={"Bucket": self.s3_bucket, "Key": key},
+                ExpiresIn=self.presigned_url_ttl
+            )
+            logger.info("  Scene %s: ✓ Streaming from S3 (presigned URL)", scene_num)
+            return url
 
-                if "Contents" in response:
-                    # Look for video file (usually .mp4)
-                    for obj in response["Contents"]:
-                        key = obj["Key"]
-                        if key.endswith(".mp4"):
-                            print(f"  ✓ Video found in S3: {key}")
-
-                            # Download to local
-                            local_path = os.path.join(
-                                self.base_output_dir,
-                                reel_name,
-                                "videos",
-                                f"scene_{scene_num}.mp4"
-                            )
-
-                            self.s3_client.download_file(
-                                self.s3_bucket,
-                                key,
-                                local_path
-                            )
-
-                            print(f"  ✓ Downloaded to: {local_path}")
-                            return local_path
+        # Download to local
+        videos_dir = os.path.join(self.base_output_dir, reel_name, "videos")
+        os.makedirs(videos_dir, exist_ok=True)
+        local_path = os.path.join(videos_dir, f"scene_{scene_num}.mp4")
 
-            except Exception as e:
-                print(f"  Poll attempt {attempts} - checking S3: {str(e)[:50]}...")
+        self.s3_client.download_file(
+            self.s3_bucket,
+            key,
+            local_path,
+            Config=self._s3_transfer_config
+        )
 
-            # Wait before next poll
-            elapsed = int(time.time() - start_time)
-            print(f"  Waiting... ({elapsed}s / {max_wait}s)")
-            time.sleep(poll_interval)
+        logger.info("  Scene %s: ✓ Downloaded to: %s", scene_num, local_path)
+        return local_path
 
-        raise TimeoutError(f"Video generation timed out after {max_wait} seconds")
+    def _extract_event_keys(self, body: str) -> List[str]:
+        """
+        Extract object keys from an S3 event notification message body.
+
+        Args:
+            body: SQS message body (S3, SNS-wrapped S3, or EventBridge event)
+
+        Returns:
+            List of decoded S3 object keys
+        """
+        try:
+            event = json.loads(body)
+            if "Message" in event:
+                # SNS envelope around the S3 event
+                event = json.loads(event["Message"])
+        except (ValueError, TypeError):
+            return []
+
+        if "detail" in event:
+            # EventBridge "Object Created" event
+            key = event["detail"].get("object", {}).get("key")
+            return [key] if key else []
+
+        keys = []
+        for record in event.get("Records", []):
+            if not record.get("eventName", "").startswith("ObjectCreated"):
+                continue
+            key = record.get("s3", {}).get("object", {}).get("key")
+            if key:
+                # S3 notifications URL-encode object keys
+                keys.append(unquote_plus(key))
+
+        return keys
 
 if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s %(message)s", level=os.getenv("REEL_LOG", "INFO"))
+
     # Test with example scene
     test_video_plan = {
         "scenes": [
@@ -405,7 +824,7 @@ if __name__ == "__main__":
             {
                 "name": "ROBO-7",
                 "nova_reel_prompt_template": "ROBO-7, a small rusty robot with glowing blue eyes and antenna ears, [ACTION]",
-                "reference_images": ["output/test_robot_journey/characters/robo_7_reference.png"]
+                "reference_images": ["output/test_robot_journey/characters/robo_7_reference.webp"]
             }
         ]
     }
@@ -1,7 +1,55 @@
 import os
-from typing import List, Dict
-from moviepy import VideoFileClip, AudioFileClip, CompositeVideoClip, concatenate_videoclips
-from moviepy.video.fx import FadeIn, FadeOut
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+
+from media_utils import (
+    build_drawtext_filter,
+    concat_copy,
+    encode_filter_complex,
+    existing_files,
+    get_h264_encoder_params,
+    probe_durations,
+    probe_video_stream
+)
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _compute_crop_params(
+    current_width: int,
+    current_height: int,
+    target_width: int,
+    target_height: int
+) -> Tuple[int, int, int, int]:
+    """
+    Center-crop window that matches the target aspect ratio.
+
+    Scenes share a handful of source sizes, so results are memoized.
+
+    Returns:
+        (x1, y1, new_width, new_height) of the crop window
+    """
+    target_aspect = target_width / target_height
+    current_aspect = current_width / current_height
+
+    if current_aspect > target_aspect:
+        # Video is wider, crop sides
+        new_height = current_height
+        new_width = int(current_height * target_aspect)
+    else:
+        # Video is taller, crop top/bottom
+        new_width = current_width
+        new_height = int(current_width / target_aspect)
+
+    # Calculate crop position (center)
+    x1 = int(current_width / 2 - new_width / 2)
+    y1 = int(current_height / 2 - new_height / 2)
+
+    return x1, y1, new_width, new_height
+
 
 class AnimationCompositorAgent:
     """
@@ -16,222 +64,341 @@ class AnimationCompositorAgent:
     def __init__(self):
         self.base_output_dir = "output"
         self.crossfade_duration = 0.3  # 300ms overlap
+        self.fps = 24
 
     def composite_scenes(
         self,
         scene_videos: List[str],
         audio_data: List[Dict],
         reel_name: str,
-        target_size: tuple = (1080, 1920)  # 9:16 vertical
+        target_size: tuple = (1080, 1920),  # 9:16 vertical
+        overlay_specs: List[Dict] = None,
+        font_path: str = None,
+        output_path: str = None,
+        use_gpu: bool = True
     ) -> str:
         """
         Composite multiple scene videos with synchronized audio.
 
+        When overlay_specs is given, the dialogue text is drawn by an ffmpeg
+        drawtext filter inside this same encode, so the result is the final
+        reel and no second decode/re-encode pass is needed.
+
         Args:
-            scene_videos: List of video file paths
+            scene_videos: List of video file paths (or HTTPS URLs ffmpeg can read)
             audio_data: List of dicts with audio_path, speech_marks, etc.
             reel_name: Name for saving output
             target_size: Output resolution (width, height)
+            overlay_specs: Optional overlay spec dicts (see TextOverlayAgent._overlay_spec)
+                to burn in while encoding
+            font_path: TrueType font for overlay_specs
+            output_path: Output MP4 path (defaults to output/<reel>/composite_video.mp4)
+            use_gpu: Encode with NVENC when an NVIDIA GPU is available
 
         Returns:
             Path to composited video file
         """
-        print(f"\n=== Compositing {len(scene_videos)} video clips ===")
-
-        clips = []
-
-        for idx, (video_path, audio_dict) in enumerate(zip(scene_videos, audio_data)):
-            print(f"\nProcessing scene {idx + 1}...")
-
-            # Load video and audio
-            video_clip = VideoFileClip(video_path)
-            audio_path = audio_dict.get("audio_path")
-
-            if not audio_path or not os.path.exists(audio_path):
-                print(f"  Warning: Audio file not found for scene {idx + 1}, using video audio")
-                clips.append(video_clip)
-                continue
-
-            audio_clip = AudioFileClip(audio_path)
-
-            print(f"  Video duration: {video_clip.duration:.2f}s")
-            print(f"  Audio duration: {audio_clip.duration:.2f}s")
+        if not scene_videos:
+            raise ValueError("No scene videos to composite")
 
-            # Adjust video duration to match audio
-            synced_video = self._sync_video_to_audio(video_clip, audio_clip)
-
-            # Resize to target dimensions (crop center for vertical format)
-            if synced_video.size != target_size:
-                synced_video = self._resize_and_crop(synced_video, target_size)
-
-            clips.append(synced_video)
-
-            print(f"  ✓ Scene {idx + 1} prepared")
+        logger.info("=== Compositing %d video clips ===", len(scene_videos))
 
-        # Concatenate with crossfade transitions
-        print(f"\nConcatenating clips with {self.crossfade_duration}s crossfades...")
+        if output_path is None:
+            output_path = os.path.join(
+                self.base_output_dir,
+                reel_name,
+                "composite_video.mp4"
+            )
 
-        if len(clips) == 1:
-            final = clips[0]
+        # Probe every scene's stream format once; reused for the stream-copy
+        # check and the resize decision
+        with ThreadPoolExecutor(max_workers=min(len(scene_videos), 8)) as executor:
+            streams = list(executor.map(probe_video_stream, scene_videos))
+        needs_reencode = [not self._matches_output_format(stream, target_size) for stream in streams]
+
+        # One directory listing per audio dir instead of a stat per scene
+        audio_paths = [audio_dict.get("audio_path") for audio_dict in audio_data]
+        existing_audio = existing_files(audio_paths)
+        has_audio = [audio_path in existing_audio for audio_path in audio_paths]
+
+        # Nothing to draw and the scenes already are the output format:
+        # join the encoded packets instead of decoding and re-encoding them
+        if not overlay_specs and self._can_stream_copy(scene_videos, audio_paths, has_audio, needs_reencode):
+            logger.info("Scenes already match the output format, concatenating without re-encoding")
+            concat_copy(scene_videos, audio_paths, output_path)
+            logger.info("✓ Composite video saved: %s", output_path)
+            return output_path
+
+        # Use NVENC when a GPU is available, libx264 otherwise
+        encoder_params = get_h264_encoder_params(use_gpu)
+
+        # One probe pass for every scene video and narration track
+        durations = probe_durations(
+            list(scene_videos) + [audio_path for audio_path, exists in zip(audio_paths, has_audio) if exists]
+        )
+        video_durations = durations[:len(scene_videos)]
+        narration_durations = iter(durations[len(scene_videos):])
+
+        # Sync, resize, concatenate and (optionally) draw the dialogue in a
+        # single ffmpeg filtergraph: one decode and one encode per scene,
+        # no frames pass through Python
+        input_paths = []
+        scenes = []
+
+        for index, (video_path, audio_path, stream) in enumerate(zip(scene_videos, audio_paths, streams)):
+            video_input = len(input_paths)
+            input_paths.append(video_path)
+
+            if has_audio[index]:
+                audio_input = len(input_paths)
+                input_paths.append(audio_path)
+                audio_duration = next(narration_durations)
+            else:
+                audio_input = None
+                audio_duration = None
+
+            video_filters, audio_filters, duration = self._scene_filters(
+                index + 1,
+                video_durations[index],
+                audio_duration,
+                stream,
+                target_size
+            )
+            scenes.append((video_input, audio_input, video_filters, audio_filters, duration))
+
+        # Keep fades shorter than half of any scene so they never overlap
+        crossfade = min([self.crossfade_duration] + [scene[4] / 2 for scene in scenes])
+        if len(scenes) == 1:
+            crossfade = 0
+
+        graph = []
+        for index, (video_input, audio_input, video_filters, audio_filters, duration) in enumerate(scenes):
+            if crossfade > 0 and index < len(scenes) - 1:
+                # Hold the last frame through the fade, so the next scene
+                # still starts exactly when its narration does
+                video_filters = video_filters + [f"tpad=stop_mode=clone:stop_duration={crossfade:.3f}"]
+
+            graph.append(f"[{video_input}:v]{','.join(video_filters)}[v{index}]")
+            if audio_input is None:
+                graph.append(f"{','.join(audio_filters)}[a{index}]")
+            else:
+                graph.append(f"[{audio_input}:a]{','.join(audio_filters)}[a{index}]")
+
+        if crossfade > 0:
+            logger.info("Joining clips with %.2fs crossfades...", crossfade)
+            previous = "[v0]"
+            offset = 0.0
+            for index in range(1, len(scenes)):
+                offset += scenes[index - 1][4]
+                output = "[vcat]" if index == len(scenes) - 1 else f"[x{index}]"
+                graph.append(
+                    f"{previous}[v{index}]xfade=transition=fade:duration={crossfade:.3f}:offset={offset:.3f}{output}"
+                )
+                previous = output
         else:
-            final = self._concatenate_with_crossfade(clips)
+            graph.append("[v0]null[vcat]")
 
-        # Save composite video
-        output_path = os.path.join(
-            self.base_output_dir,
-            reel_name,
-            "composite_video.mp4"
-        )
+        # Narration stays back to back (no acrossfade), so no line is clipped
+        segments = "".join(f"[a{index}]" for index in range(len(scenes)))
+        graph.append(f"{segments}concat=n={len(scenes)}:v=0:a=1[a]")
 
-        print(f"\nWriting composite video...")
-        final.write_videofile(
-            output_path,
-            fps=24,
-            codec='libx264',
-            audio_codec='aac',
-            temp_audiofile='temp-audio.m4a',
-            remove_temp=True
-        )
+        if overlay_specs:
+            # Final pixels: draw the overlays on the concatenated timeline
+            graph.append(f"[vcat]{build_drawtext_filter(overlay_specs, font_path)}[v]")
+            logger.info("Drawing %d dialogue overlays in the same pass", len(overlay_specs))
+        else:
+            graph.append("[vcat]null[v]")
 
-        # Clean up
-        for clip in clips:
-            clip.close()
-        final.close()
+        logger.info("Writing composite video (%s)...", encoder_params["codec"])
+        encode_filter_complex(input_paths, ";\n".join(graph), output_path, encoder_params)
 
-        print(f"✓ Composite video saved: {output_path}")
+        logger.info("✓ Composite video saved: %s", output_path)
 
         return output_path
 
-    def _sync_video_to_audio(
-        self,
-        video_clip: VideoFileClip,
-        audio_clip: AudioFileClip
-    ) -> VideoFileClip:
+    def _matches_output_format(self, stream: Dict, target_size: tuple) -> bool:
         """
-        Synchronize video duration with audio.
+        Check whether a probed video stream is already H.264 yuv420p at target_size and fps.
 
         Args:
-            video_clip: Input video
-            audio_clip: Target audio
+            stream: Stream info from probe_video_stream()
+            target_size: Output resolution (width, height)
 
         Returns:
-            Video clip with synchronized duration and audio
+            True if the stream's packets can be used in the output as-is
+        """
+        return (
+            stream["codec_name"] == "h264"
+            and stream["pix_fmt"] == "yuv420p"
+            and (stream["width"], stream["height"]) == tuple(target_size)
+            and abs(stream["fps"] - self.fps) <= 0.01
+        )
+
+    def _can_stream_copy(
+        self,
+        scene_videos: List[str],
+        audio_paths: List[str],
+        has_audio: List[bool],
+        needs_reencode: List[bool]
+    ) -> bool:
         """
-        video_duration = video_clip.duration
-        audio_duration = audio_clip.duration
+        Check whether the scenes can be joined by stream copy.
 
-        # Sync video duration with audio (MoviePy 2.x compatible)
-        if abs(video_duration - audio_duration) < 0.1:
-            # Durations are close enough
-            synced_video = video_clip
-        elif video_duration > audio_duration:
-            # Video is longer, trim it
-            synced_video = video_clip.subclipped(0, audio_duration)
-            print(f"    Trimming video to {audio_duration:.2f}s")
-        else:
-            # Video is shorter - slow it down and/or freeze last frame
-            speed_factor = video_duration / audio_duration
+        True when no scene needs re-encoding and every scene lasts as long as
+        its narration (within the 0.1s sync tolerance).
 
-            # If speed reduction is moderate (<0.7x), just slow down the video
-            if speed_factor >= 0.7:
-                synced_video = video_clip.time_transform(lambda t: t * speed_factor)
-                print(f"    Slowing video to {1/speed_factor:.2f}x speed to match {audio_duration:.2f}s")
-            else:
-                # For larger gaps, slow to 0.7x and freeze last frame for remainder
-                slowed_video = video_clip.time_transform(lambda t: t * 0.7)
-                slowed_duration = video_duration / 0.7
-                freeze_duration = audio_duration - slowed_duration
+        Args:
+            scene_videos: Video file paths or URLs
+            audio_paths: Narration track per scene
+            has_audio: Per-scene flags, True if the narration file exists
+            needs_reencode: Per-scene flags from _matches_output_format()
 
-                # Get last frame and hold it
-                last_frame = video_clip.to_ImageClip(t=video_duration - 0.1).with_duration(freeze_duration)
-                synced_video = concatenate_videoclips([slowed_video, last_frame], method="compose")
-                print(f"    Slowing to 1.43x + freezing last frame for {freeze_duration:.2f}s to match {audio_duration:.2f}s")
+        Returns:
+            True if the scenes can be concatenated without re-encoding
+        """
+        if any(needs_reencode) or len(scene_videos) != len(audio_paths) or not all(has_audio):
+            return False
 
-        # Set audio (MoviePy 2.x uses with_audio)
-        synced_video = synced_video.with_audio(audio_clip)
+        durations = probe_durations(list(scene_videos) + audio_paths)
+        video_durations = durations[:len(scene_videos)]
+        audio_durations = durations[len(scene_videos):]
 
-        return synced_video
+        return all(
+            abs(video_duration - audio_duration) < 0.1
+            for video_duration, audio_duration in zip(video_durations, audio_durations)
+        )
 
-    def _resize_and_crop(
+    def _scene_filters(
         self,
-        video_clip: VideoFileClip,
+        scene_num: int,
+        video_duration: float,
+        audio_duration: Optional[float],
+        stream: Dict,
         target_size: tuple
-    ) -> VideoFileClip:
+    ) -> Tuple[List[str], List[str], float]:
         """
-        Resize and crop video to target dimensions.
+        Build one scene's video and audio filter chains for the composite graph.
+
+        Both chains produce exactly the scene's output duration, so the
+        segments line up in the concat filter.
 
         Args:
-            video_clip: Input video
-            target_size: (width, height)
+            scene_num: 1-based scene number (for logging)
+            video_duration: Scene video duration in seconds
+            audio_duration: Narration duration in seconds, or None without narration
+            stream: Stream info from probe_video_stream()
+            target_size: Output resolution (width, height)
 
         Returns:
-            Resized and cropped video
+            (video filters, audio filters, scene duration); the audio chain is
+            a silent source when the scene has no narration
         """
-        target_width, target_height = target_size
-        target_aspect = target_width / target_height
+        video_filters = ["setpts=PTS-STARTPTS"]
+        duration = video_duration
 
-        current_width, current_height = video_clip.size
-        current_aspect = current_width / current_height
+        # Resize to target dimensions (crop center for vertical format)
+        source_size = (stream["width"], stream["height"])
+        if source_size != tuple(target_size):
+            video_filters.append(self._resize_and_crop(source_size, target_size))
 
-        if current_aspect > target_aspect:
-            # Video is wider, crop sides
-            new_height = current_height
-            new_width = int(current_height * target_aspect)
-        else:
-            # Video is taller, crop top/bottom
-            new_width = current_width
-            new_height = int(current_width / target_aspect)
-
-        # Calculate crop position (center)
-        x_center = current_width / 2
-        y_center = current_height / 2
-
-        x1 = int(x_center - new_width / 2)
-        y1 = int(y_center - new_height / 2)
-
-        # Crop and resize (MoviePy 2.x)
-        cropped = video_clip.cropped(
-            x1=x1,
-            y1=y1,
-            width=new_width,
-            height=new_height
-        )
+        if audio_duration is not None:
+            logger.debug("Scene %s: video %.2fs, audio %.2fs", scene_num, video_duration, audio_duration)
 
-        resized = cropped.resized(target_size)
+            # Adjust video duration to match audio
+            retime_filters, sync_duration = self._sync_video_to_audio(video_duration, audio_duration, scene_num)
+            video_filters += retime_filters
+            duration = sync_duration or video_duration
+        else:
+            logger.warning("Audio file not found for scene %s, using silence", scene_num)
+
+        if not any(video_filter.startswith("fps=") for video_filter in video_filters):
+            video_filters.append(f"fps={self.fps}")
+        video_filters += [
+            f"trim=duration={duration:.3f}",
+            "format=yuv420p",
+            "setsar=1"
+        ]
+
+        # Pad/cut the narration to the scene length, in one common audio format
+        if audio_duration is None:
+            audio_filters = ["anullsrc=r=44100:cl=stereo"]
+        else:
+            audio_filters = ["asetpts=PTS-STARTPTS", "aresample=44100", "aformat=channel_layouts=stereo", "apad"]
+        audio_filters.append(f"atrim=duration={duration:.3f}")
 
-        return resized
+        return video_filters, audio_filters, duration
 
-    def _concatenate_with_crossfade(
+    def _sync_video_to_audio(
         self,
-        clips: List[VideoFileClip]
-    ) -> VideoFileClip:
+        video_duration: float,
+        audio_duration: float,
+        scene_num: int = None
+    ) -> Tuple[List[str], Optional[float]]:
         """
-        Concatenate clips with crossfade transitions.
+        Plan how to synchronize video duration with audio.
+
+        Retiming is done by ffmpeg's setpts (plus an fps filter to keep a
+        constant frame rate) instead of a per-frame Python time transform;
+        freezing on the last frame is tpad cloning it in the same pass.
 
         Args:
-            clips: List of video clips
+            video_duration: Scene video duration in seconds
+            audio_duration: Narration duration in seconds
+            scene_num: Scene number (for logging)
 
         Returns:
-            Concatenated video with crossfades
+            (video filters, output duration or None)
         """
-        if not clips:
-            raise ValueError("No clips to concatenate")
-
-        if len(clips) == 1:
-            return clips[0]
+        # Durations are close enough
+        if abs(video_duration - audio_duration) < 0.1:
+            return [], None
+
+        # Video is longer, trim it
+        if video_duration > audio_duration:
+            logger.debug("Scene %s: trimming video to %.2fs", scene_num, audio_duration)
+            return [], audio_duration
+
+        # Video is shorter - slow it down and/or freeze last frame
+        speed_factor = video_duration / audio_duration
+
+        # If speed reduction is moderate (<0.7x), just slow down the video
+        if speed_factor >= 0.7:
+            logger.debug("Scene %s: slowing video to %.2fx speed to match %.2fs", scene_num, 1 / speed_factor, audio_duration)
+            return [f"setpts=PTS/{speed_factor:.6f}", f"fps={self.fps}"], audio_duration
+
+        # For larger gaps, slow to 0.7x and freeze last frame for remainder
+        slowed_duration = video_duration / 0.7
+        freeze_duration = audio_duration - slowed_duration
+        logger.debug(
+            "Scene %s: slowing to 1.43x + freezing last frame for %.2fs to match %.2fs",
+            scene_num, freeze_duration, audio_duration
+        )
+        filters = [
+            "setpts=PTS/0.7",
+            f"fps={self.fps}",
+            # A little extra padding; the trim filter cuts the padded tail at the narration length
+            f"tpad=stop_mode=clone:stop_duration={freeze_duration + 1:.3f}"
+        ]
+        return filters, audio_duration
+
+    def _resize_and_crop(self, source_size: tuple, target_size: tuple) -> str:
+        """
+        Build the ffmpeg filter that center-crops and resizes to target dimensions.
 
-        # MoviePy 2.x: Simplified concatenation without crossfades
-        # TODO: Re-implement crossfades when MoviePy 2.x API is more stable
-        print("  Using straight cuts (crossfades temporarily disabled)")
+        Args:
+            source_size: Input (width, height)
+            target_size: (width, height)
 
-        final = concatenate_videoclips(
-            clips,
-            method="compose"
-        )
+        Returns:
+            crop,scale filter chain (one ffmpeg pass)
+        """
+        target_width, target_height = target_size
+        x1, y1, new_width, new_height = _compute_crop_params(*source_size, target_width, target_height)
 
-        return final
+        return f"crop={new_width}:{new_height}:{x1}:{y1},scale={target_width}:{target_height}:flags=lanczos"
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     # Test with example clips
     print("=== Animation Compositor Agent Test ===")
     print("\nNote: This test requires existing video and audio files")
@@ -248,8 +415,8 @@ if __name__ == "__main__":
     ]
 
     # Check if test files exist
-    all_exist = all(os.path.exists(v) for v in test_videos)
-    all_exist = all_exist and all(os.path.exists(a["audio_path"]) for a in test_audio_data)
+    test_paths = test_videos + [a["audio_path"] for a in test_audio_data]
+    all_exist = existing_files(test_paths) == set(test_paths)
 
     if not all_exist:
         print("\n✗ Test files not found. Generate videos and audio first.")
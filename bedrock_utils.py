@@ -0,0 +1,153 @@
+"""
+Shared Bedrock helpers for the agents.
+
+One boto3 client per service and region (connection pool, adaptive retries,
+keep-alive) and a thin Claude Messages API call for prompts that don't need
+LangChain.
+"""
+
+import os
+import re
+import json
+from functools import lru_cache
+from typing import List
+
+import boto3
+from botocore.config import Config
+
+CLAUDE_MODEL_ID = "us.anthropic.claude-3-5-sonnet-20240620-v1:0"
+# For structured reformatting / factual summaries that don't need Sonnet
+CLAUDE_FAST_MODEL_ID = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
+
+# Bedrock latency-optimized inference, for models that offer it (Claude 3.5
+# Haiku). Only enable in a region where it is available.
+LATENCY_OPTIMIZED = os.getenv("BEDROCK_LATENCY_OPTIMIZED", "").lower() in ("1", "true", "yes")
+TITAN_EMBED_MODEL_ID = "amazon.titan-embed-text-v2:0"
+
+_JSON_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+
+# Shared by every AWS client: a pool big enough for the per-scene fan-out,
+# adaptive retries against throttling, and kept-alive connections so idle
+# gaps between pipeline stages don't cost a new TLS handshake
+AWS_CLIENT_CONFIG = Config(
+    max_pool_connections=32,
+    retries={"mode": "adaptive", "total_max_attempts": 5},
+    connect_timeout=5,
+    read_timeout=120,
+    tcp_keepalive=True
+)
+
+
+@lru_cache(maxsize=None)
+def get_aws_client(service_name: str, region: str = None):
+    """
+    Shared boto3 client per service and region.
+
+    Reused across agents so repeated calls don't redo TLS handshakes and
+    credential resolution.
+    """
+    return boto3.client(
+        service_name=service_name,
+        region_name=region or os.getenv("AWS_REGION", "us-east-1"),
+        config=AWS_CLIENT_CONFIG
+    )
+
+
+def get_bedrock_client(region: str = None):
+    """Shared bedrock-runtime client per region."""
+    return get_aws_client("bedrock-runtime", region)
+
+
+def invoke_claude(
+    system_prompt: str,
+    user_text: str,
+    temperature: float = 0.5,
+    max_tokens: int = 4096,
+    model_id: str = CLAUDE_MODEL_ID,
+    region: str = None
+) -> str:
+    """
+    Send one system + user message to Claude on Bedrock.
+
+    The response is streamed: text arrives as it is generated instead of in
+    one block at the end, and long generations are never cut off by the
+    client's read timeout while the model is still writing.
+
+    Args:
+        system_prompt: System prompt
+        user_text: User message
+        temperature: Sampling temperature
+        max_tokens: Maximum tokens to generate
+        model_id: Bedrock model or inference profile ID
+        region: AWS region (defaults to AWS_REGION)
+
+    Returns:
+        Generated text
+    """
+    body = json.dumps({
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "system": system_prompt,
+        "messages": [{"role": "user", "content": user_text}]
+    }, separators=(",", ":"))
+
+    response = get_bedrock_client(region).invoke_model_with_response_stream(modelId=model_id, body=body)
+
+    parts = []
+    for event in response["body"]:
+        chunk = event.get("chunk")
+        if not chunk:
+            continue
+        message = json.loads(chunk["bytes"])
+        if message.get("type") == "content_block_delta" and message["delta"].get("type") == "text_delta":
+            parts.append(message["delta"]["text"])
+
+    return "".join(parts)
+
+
+def embed_text(text: str, model_id: str = TITAN_EMBED_MODEL_ID, region: str = None) -> List[float]:
+    """
+    Embed text with Titan Text Embeddings on Bedrock.
+
+    Args:
+        text: Text to embed
+        model_id: Bedrock embedding model ID
+        region: AWS region (defaults to AWS_REGION)
+
+    Returns:
+        Unit-length embedding vector
+    """
+    response = get_bedrock_client(region).invoke_model(
+        modelId=model_id,
+        body=json.dumps({"inputText": text, "normalize": True})
+    )
+    return json.loads(response["body"].read())["embedding"]
+
+
+def parse_json_response(text: str):
+    """
+    Parse the JSON object in a model response.
+
+    Tolerates a ```json fence or text around the object.
+
+    Args:
+        text: Model output
+
+    Returns:
+        Parsed JSON value
+
+    Raises:
+        ValueError: If no JSON object can be parsed
+    """
+    match = _JSON_FENCE_PATTERN.search(text)
+    if match:
+        text = match.group(1)
+
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError(f"No JSON object in model response: {text[:100]}")
+
+    return json.loads(text[start:end + 1])
@@ -1,16 +1,30 @@
 import os
 import json
+import io
 import base64
-import boto3
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
 from langchain_aws import ChatBedrock
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
+from PIL import Image
 from pydantic import BaseModel, Field
 
+from bedrock_utils import get_bedrock_client
+
 load_dotenv()
 
+@lru_cache(maxsize=None)
+def _get_llm(region: str) -> ChatBedrock:
+    """Shared ChatBedrock per region, on top of the shared bedrock-runtime client."""
+    return ChatBedrock(
+        model_id="us.anthropic.claude-3-5-sonnet-20240620-v1:0",
+        model_kwargs={"temperature": 0.5},  # Moderate creativity for descriptions
+        client=get_bedrock_client(region)
+    )
+
 class CharacterVisualBible(BaseModel):
     """Complete visual reference for a character"""
     name: str = Field(description="Character name")
@@ -27,16 +41,13 @@ class CharacterBibleCollection(BaseModel):
 class CharacterDesignerAgent:
     def __init__(self):
         self.region = os.getenv("AWS_REGION", "us-east-1")
-        self.bedrock = boto3.client(
-            service_name="bedrock-runtime",
-            region_name=self.region
-        )
-        self.llm = ChatBedrock(
-            model_id="us.anthropic.claude-3-5-sonnet-20240620-v1:0",
-            model_kwargs={"temperature": 0.5}  # Moderate creativity for descriptions
-        )
+        self.bedrock = get_bedrock_client(self.region)
+        self.llm = _get_llm(self.region)
         self.nova_canvas_model_id = "amazon.nova-canvas-v1:0"
         self.base_output_dir = "output"
+        self.max_concurrent_characters = int(os.getenv("CHARACTER_DESIGN_CONCURRENCY", "4"))
+        # "webp" (default, ~3x smaller) or "png" (Nova Canvas' raw output)
+        self.reference_image_format = os.getenv("REFERENCE_IMAGE_FORMAT", "webp").lower()
 
     def design_characters(self, characters: List[Dict], theme: str, reel_name: str) -> Dict:
         """
@@ -50,41 +61,13 @@ class CharacterDesignerAgent:
         Returns:
             Dictionary with complete character visual bibles
         """
-        character_bibles = []
-
-        for char in characters:
-            print(f"\nDesigning character: {char['name']}")
-
-            # Step 1: Expand character description using Claude
-            expanded_desc = self._expand_character_description(
-                char['name'],
-                char['description'],
-                theme
-            )
-
-            print(f"Expanded description generated")
-
-            # Step 2: Generate reference images using Nova Canvas
-            reference_images = self._generate_character_references(
-                char['name'],
-                expanded_desc['full_description'],
-                theme,
-                reel_name
-            )
-
-            print(f"Reference images generated: {len(reference_images)} files")
-
-            # Step 3: Create character visual bible
-            bible = CharacterVisualBible(
-                name=char['name'],
-                full_description=expanded_desc['full_description'],
-                distinctive_features=expanded_desc['distinctive_features'],
-                color_palette=expanded_desc['color_palette'],
-                reference_images=reference_images,
-                nova_reel_prompt_template=expanded_desc['nova_reel_prompt_template']
-            )
-
-            character_bibles.append(bible.model_dump())
+        # Characters are independent - design them concurrently, bounded to
+        # stay under Bedrock's per-account request rates
+        with ThreadPoolExecutor(max_workers=max(1, min(len(characters), self.max_concurrent_characters))) as executor:
+            character_bibles = list(executor.map(
+                lambda char: self._design_character(char, theme, reel_name),
+                characters
+            ))
 
         # Save complete character bible collection
         result = {
@@ -103,6 +86,51 @@ class CharacterDesignerAgent:
 
         return result
 
+    def _design_character(self, char: Dict, theme: str, reel_name: str) -> Dict:
+        """
+        Expand one character's description and render its reference images.
+
+        Args:
+            char: Character definition with name and description
+            theme: Visual theme
+            reel_name: Name for organizing output files
+
+        Returns:
+            Character visual bible as a dictionary
+        """
+        print(f"\nDesigning character: {char['name']}")
+
+        # Step 1: Expand character description using Claude
+        expanded_desc = self._expand_character_description(
+            char['name'],
+            char['description'],
+            theme
+        )
+
+        print(f"Expanded description generated: {char['name']}")
+
+        # Step 2: Generate reference images using Nova Canvas
+        reference_images = self._generate_character_references(
+            char['name'],
+            expanded_desc['full_description'],
+            theme,
+            reel_name
+        )
+
+        print(f"Reference images generated for {char['name']}: {len(reference_images)} files")
+
+        # Step 3: Create character visual bible
+        bible = CharacterVisualBible(
+            name=char['name'],
+            full_description=expanded_desc['full_description'],
+            distinctive_features=expanded_desc['distinctive_features'],
+            color_palette=expanded_desc['color_palette'],
+            reference_images=reference_images,
+            nova_reel_prompt_template=expanded_desc['nova_reel_prompt_template']
+        )
+
+        return bible.model_dump()
+
     def _expand_character_description(self, name: str, basic_description: str, theme: str) -> Dict:
         """
         Use Claude to expand basic character description into detailed visual bible.
@@ -193,8 +221,6 @@ Return ONLY valid JSON (no explanatory text) with these keys:
         char_dir = os.path.join(self.base_output_dir, reel_name, "characters")
         os.makedirs(char_dir, exist_ok=True)
 
-        reference_images = []
-
         # Define views for character model sheet
         views = [
             {
@@ -211,55 +237,86 @@ Return ONLY valid JSON (no explanatory text) with these keys:
             }
         ]
 
-        for view_config in views:
-            view_name = view_config["view"]
-            prompt = view_config["prompt"]
-
-            try:
-                print(f"  Generating {view_name} view...")
-
-                # Nova Canvas API payload
-                body_dict = {
-                    "taskType": "TEXT_IMAGE",
-                    "textToImageParams": {
-                        "text": prompt
-                    },
-                    "imageGenerationConfig": {
-                        "numberOfImages": 1,
-                        "height": 1024,  # Vertical format for reference
-                        "width": 576,
-                        "quality": "standard",
-                        "cfgScale": 8.0
-                    }
-                }
+        # Nova Canvas renders each view for 10-20s; request all views at once
+        safe_name = name.replace(" ", "_").replace("-", "_").lower()
+        with ThreadPoolExecutor(max_workers=len(views)) as executor:
+            results = list(executor.map(
+                lambda view_config: self._generate_view(view_config, safe_name, char_dir),
+                views
+            ))
+
+        reference_images = [file_path for file_path in results if file_path]
+
+        if not reference_images:
+            print(f"  Warning: No reference images generated for {name}")
+
+        return reference_images
+
+    def _generate_view(self, view_config: Dict, safe_name: str, char_dir: str) -> Optional[str]:
+        """
+        Render one reference view with Nova Canvas and save it.
+
+        Args:
+            view_config: Dict with view name and prompt
+            safe_name: Filesystem-safe character name
+            char_dir: Directory for character images
 
-                response = self.bedrock.invoke_model(
-                    modelId=self.nova_canvas_model_id,
-                    body=json.dumps(body_dict)
-                )
+        Returns:
+            Path to the saved image, or None if generation failed
+        """
+        view_name = view_config["view"]
+        prompt = view_config["prompt"]
+
+        try:
+            print(f"  Generating {view_name} view...")
+
+            # Nova Canvas API payload
+            body_dict = {
+                "taskType": "TEXT_IMAGE",
+                "textToImageParams": {
+                    "text": prompt
+                },
+                "imageGenerationConfig": {
+                    "numberOfImages": 1,
+                    "height": 1024,  # Vertical format for reference
+                    "width": 576,
+                    "quality": "standard",
+                    "cfgScale": 8.0
+                }
+            }
 
-                response_body = json.loads(response.get("body").read())
-                base64_image = response_body.get("images")[0]
-                image_data = base64.b64decode(base64_image)
+            response = self.bedrock.invoke_model(
+                modelId=self.nova_canvas_model_id,
+                body=json.dumps(body_dict)
+            )
 
-                # Save image
-                safe_name = name.replace(" ", "_").replace("-", "_").lower()
-                file_path = os.path.join(char_dir, f"{safe_name}_{view_name}.png")
+            response_body = json.loads(response.get("body").read())
+            base64_image = response_body.get("images")[0]
+            # Bedrock returns well-formed base64, skip the validation pass
+            image_data = base64.b64decode(base64_image, validate=False)
 
-                with open(file_path, "wb") as f:
-                    f.write(image_data)
+            if self.reference_image_format == "webp":
+                # Only the pixels matter downstream; WebP is a fraction of the PNG's size
+                buffer = io.BytesIO()
+                Image.open(io.BytesIO(image_data)).save(buffer, format="WEBP", quality=92, method=4)
+                image_data = buffer.getvalue()
+                extension = "webp"
+            else:
+                extension = "png"
 
-                reference_images.append(file_path)
-                print(f"    ✓ Saved: {file_path}")
+            # Save image
+            file_path = os.path.join(char_dir, f"{safe_name}_{view_name}.{extension}")
 
-            except Exception as e:
-                print(f"    ✗ Error generating {view_name} view: {e}")
-                # Continue with other views even if one fails
+            with open(file_path, "wb") as f:
+                f.write(image_data)
 
-        if not reference_images:
-            print(f"  Warning: No reference images generated for {name}")
+            print(f"    ✓ Saved: {file_path}")
+            return file_path
 
-        return reference_images
+        except Exception as e:
+            print(f"    ✗ Error generating {view_name} view: {e}")
+            # Continue with other views even if one fails
+            return None
 
 if __name__ == "__main__":
     # Test with example characters
@@ -9,13 +9,64 @@ Usage:
 
     Or interactive mode:
     python3 create_reel.py
+
+    Or a batch of stories (JSON list of {"story", "reel_name", ...} objects):
+    python3 create_reel.py --batch stories.json --concurrency 4
 """
 
 import argparse
+import json
+import os
 import sys
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from story_to_script_agent import StoryToScriptAgent
 
+
+def detect_gpu_count() -> int:
+    """Number of NVIDIA GPUs reported by nvidia-smi (0 if unavailable)."""
+    try:
+        result = subprocess.run(["nvidia-smi", "-L"], capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return 0
+    if result.returncode != 0:
+        return 0
+    return sum(1 for line in result.stdout.splitlines() if line.startswith("GPU "))
+
+
+def run_orchestrator(script_file: str, reel_name: str, theme: str, gpu_index: int = None) -> str:
+    """
+    Generate the animated reel for a script with the orchestrator.
+
+    Args:
+        script_file: Path to script JSON
+        reel_name: Name for output reel
+        theme: Visual theme
+        gpu_index: Optional GPU to pin the run to (CUDA_VISIBLE_DEVICES)
+
+    Returns:
+        Path to final video
+
+    Raises:
+        subprocess.CalledProcessError: If the orchestrator fails
+    """
+    cmd = [
+        "python3",
+        "animated_reel_orchestrator.py",
+        script_file,
+        reel_name,
+        "--theme",
+        theme
+    ]
+
+    env = None
+    if gpu_index is not None:
+        env = {**os.environ, "CUDA_VISIBLE_DEVICES": str(gpu_index)}
+
+    subprocess.run(cmd, check=True, env=env)
+
+    return f"output/{reel_name}/{reel_name}.mp4"
+
 def interactive_mode():
     """Interactive story input mode."""
     print("\n" + "="*60)
@@ -169,17 +220,8 @@ def create_reel_from_story(
     print("\n🚀 Starting reel generation...\n")
 
     # Run the orchestrator
-    cmd = [
-        "python3",
-        "animated_reel_orchestrator.py",
-        script_file,
-        reel_name,
-        "--theme",
-        theme
-    ]
-
     try:
-        subprocess.run(cmd, check=True)
+        run_orchestrator(script_file, reel_name, theme)
 
         print("\n" + "="*60)
         print("✅ ANIMATED REEL COMPLETE!")
@@ -195,6 +237,71 @@ def create_reel_from_story(
         return None
 
 
+def create_reels_from_batch(story_batch: list, concurrency: int = None) -> dict:
+    """
+    Generate several reels at once.
+
+    Scripts are written first, then the orchestrator runs for up to
+    `concurrency` reels in parallel. On multi-GPU machines each run is pinned
+    to one GPU (round-robin over CUDA_VISIBLE_DEVICES) so every GPU encodes.
+
+    Args:
+        story_batch: Dicts with story and reel_name, plus optional
+            characters, theme and duration (as for create_reel_from_story)
+        concurrency: Reels to generate at once (defaults to the GPU count, or 1)
+
+    Returns:
+        Dictionary mapping reel name to final video path (None if it failed)
+    """
+    gpu_count = detect_gpu_count()
+    if concurrency is None:
+        concurrency = max(1, gpu_count)
+
+    print("\n" + "="*60)
+    print(f"🎬 CREATING {len(story_batch)} ANIMATED REELS")
+    print(f"   Concurrency: {concurrency}, GPUs: {gpu_count}")
+    print("="*60 + "\n")
+
+    # Step 1: Generate scripts, concurrently; a story whose script fails is
+    # reported as failed and the rest of the batch carries on
+    print(f"📝 Generating {len(story_batch)} scripts")
+    agent = StoryToScriptAgent()
+    scripts = agent.generate_scripts(story_batch, return_exceptions=True, fallback=True)
+
+    # Batch order; reels whose script failed stay None
+    results = {entry["reel_name"]: None for entry in story_batch}
+    jobs = []
+    for entry, script in zip(story_batch, scripts):
+        reel_name = entry["reel_name"]
+        if isinstance(script, Exception):
+            print(f"\n❌ Error generating script for {reel_name}: {script}")
+            continue
+        script_file = agent.save_script(script, f"{reel_name}_script")
+        jobs.append((script_file, reel_name, entry.get("theme", "Cinematic")))
+
+    # Step 2: Generate reels; the orchestrator runs are separate processes,
+    # so threads are enough to keep them going side by side
+    def generate(index_job):
+        index, (script_file, reel_name, theme) = index_job
+        gpu_index = index % gpu_count if gpu_count > 1 else None
+        try:
+            return reel_name, run_orchestrator(script_file, reel_name, theme, gpu_index)
+        except subprocess.CalledProcessError as e:
+            print(f"\n❌ Error generating reel {reel_name}: {e}")
+            return reel_name, None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results.update(executor.map(generate, enumerate(jobs)))
+
+    print("\n" + "="*60)
+    print("✅ BATCH COMPLETE")
+    print("="*60)
+    for reel_name, final_path in results.items():
+        print(f"  {'✓' if final_path else '✗'} {reel_name}: {final_path or 'failed'}")
+
+    return results
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Create animated Instagram Reels from natural language stories"
@@ -228,9 +335,25 @@ def main():
         action="store_true",
         help="Only generate script, don't create video"
     )
+    parser.add_argument(
+        "--batch",
+        help="JSON file with a list of stories ({\"story\", \"reel_name\", ...}) to generate"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Reels to generate at once in batch mode (default: one per GPU)"
+    )
 
     args = parser.parse_args()
 
+    if args.batch:
+        with open(args.batch) as f:
+            story_batch = json.load(f)
+
+        results = create_reels_from_batch(story_batch, concurrency=args.concurrency)
+        sys.exit(0 if all(results.values()) else 1)
+
     # Interactive mode if no story provided
     if not args.story:
         config = interactive_mode()
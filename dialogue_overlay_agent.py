@@ -1,8 +1,32 @@
 import json
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import List, Dict, Tuple
-from moviepy import TextClip, ColorClip, VideoClip
-from text_overlay_agent import TextOverlayAgent
+import numpy as np
+from moviepy import VideoClip
+from text_overlay_agent import TextOverlayAgent, render_text_rgba, text_image_clip
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=64)
+def badge_background_rgba(width: int, height: int, color: tuple, opacity: float) -> np.ndarray:
+    """
+    Solid semi-transparent rectangle as an RGBA array, built once per size.
+
+    The result is shared between callers - don't modify it.
+
+    Returns:
+        (height, width, 4) uint8 array
+    """
+    rgba = np.empty((height, width, 4), dtype=np.uint8)
+    rgba[..., :3] = color
+    rgba[..., 3] = int(255 * opacity)
+    rgba.flags.writeable = False
+    return rgba
+
 
 class DialogueOverlayAgent(TextOverlayAgent):
     """
@@ -33,7 +57,8 @@ class DialogueOverlayAgent(TextOverlayAgent):
         speech_marks_path: str,
         scene_start_time: float,
         scene_duration: float,
-        video_size: tuple = (1080, 1920)
+        video_size: tuple = (1080, 1920),
+        speech_marks: list = None
     ) -> List[VideoClip]:
         """
         Create complete dialogue overlay with character name and karaoke.
@@ -45,6 +70,7 @@ class DialogueOverlayAgent(TextOverlayAgent):
             scene_start_time: Start time of scene in final video
             scene_duration: Duration of the scene
             video_size: Video dimensions
+            speech_marks: Already-loaded speech marks (skips reading speech_marks_path)
 
         Returns:
             List of clips (name badge + karaoke dialogue)
@@ -55,7 +81,8 @@ class DialogueOverlayAgent(TextOverlayAgent):
         # (Skipping character name display)
 
         # 2. Load speech marks
-        speech_marks = self.load_speech_marks(speech_marks_path)
+        if speech_marks is None:
+            speech_marks = self.load_speech_marks(speech_marks_path)
 
         if not speech_marks:
             # Fallback: static dialogue text if no speech marks
@@ -100,25 +127,27 @@ class DialogueOverlayAgent(TextOverlayAgent):
         """
         try:
             # Create text clip
-            name_text = TextClip(
-                text=character_name.upper(),
-                font=self.font,
-                font_size=self.name_font_size,
-                color=self.name_color,
-                stroke_color=self.stroke_color,
-                stroke_width=2,
-                method='label',
+            name_text = text_image_clip(render_text_rgba(
+                character_name.upper(),
+                self.font,
+                self.name_font_size,
+                self.name_color,
+                self.stroke_color,
+                2,
+                'label',
                 margin=(15, 8)
-            ).with_duration(duration).with_start(start_time)
+            )).with_duration(duration).with_start(start_time)
 
             text_w, text_h = name_text.size
 
             # Create semi-transparent background
             bg_padding = 10
-            bg = ColorClip(
-                size=(text_w + 2 * bg_padding, text_h + 2 * bg_padding),
-                color=self.name_bg_color
-            ).with_duration(duration).with_opacity(self.name_bg_opacity).with_start(start_time)
+            bg = text_image_clip(badge_background_rgba(
+                text_w + 2 * bg_padding,
+                text_h + 2 * bg_padding,
+                tuple(self.name_bg_color),
+                self.name_bg_opacity
+            )).with_duration(duration).with_start(start_time)
 
             # Position background
             bg = bg.with_position(('center', self.name_y_position))
@@ -131,7 +160,7 @@ class DialogueOverlayAgent(TextOverlayAgent):
             return [bg, name_text]
 
         except Exception as e:
-            print(f"    Warning: Could not create character name badge: {e}")
+            logger.warning("Could not create character name badge: %s", e)
             return None
 
     def _create_dialogue_karaoke(
@@ -153,23 +182,15 @@ class DialogueOverlayAgent(TextOverlayAgent):
         Returns:
             List of karaoke clips
         """
-        # Temporarily adjust bottom_offset for dialogue positioning
-        original_offset = self.bottom_offset
-        self.bottom_offset = video_size[1] - self.dialogue_y_offset
-
-        # Use parent class karaoke method
-        karaoke_clips = self.create_karaoke_clips(
+        # Use parent class karaoke method, positioned below the name badge
+        return self.create_karaoke_clips(
             narration=dialogue,
             speech_marks=speech_marks,
             scene_start_time=scene_start_time,
-            video_size=video_size
+            video_size=video_size,
+            bottom_offset=video_size[1] - self.dialogue_y_offset
         )
 
-        # Restore original offset
-        self.bottom_offset = original_offset
-
-        return karaoke_clips
-
     def _create_static_dialogue(
         self,
         dialogue: str,
@@ -190,22 +211,22 @@ class DialogueOverlayAgent(TextOverlayAgent):
             Text clip
         """
         try:
-            text_clip = TextClip(
-                text=dialogue,
-                font=self.font,
-                font_size=self.font_size,
-                color=self.normal_color,
-                stroke_color=self.stroke_color,
-                stroke_width=self.stroke_width,
-                method='caption',
+            text_clip = text_image_clip(render_text_rgba(
+                dialogue,
+                self.font,
+                self.font_size,
+                self.normal_color,
+                self.stroke_color,
+                self.stroke_width,
+                'caption',
                 size=(self.max_line_width, None),
-                align='center'
-            ).with_duration(duration).with_start(start_time).with_position(('center', self.dialogue_y_offset))
+                text_align='center'
+            )).with_duration(duration).with_start(start_time).with_position(('center', self.dialogue_y_offset))
 
             return text_clip
 
         except Exception as e:
-            print(f"    Warning: Could not create static dialogue: {e}")
+            logger.warning("Could not create static dialogue: %s", e)
             return None
 
     def create_dialogue_overlays_for_scenes(
@@ -227,56 +248,189 @@ class DialogueOverlayAgent(TextOverlayAgent):
         Returns:
             List of all dialogue overlay clips
         """
-        all_dialogue_clips = []
+        scenes = parsed_script.get("scenes", [])
+
+        logger.info("=== Creating dialogue overlays for %d scenes ===", len(scenes))
+
+        jobs = list(zip(range(len(scenes)), scenes, audio_data))
+        if not jobs:
+            return []
+
+        # Read every scene's speech marks up front in one concurrent batch
+        speech_marks_list = self._prefetch_speech_marks(scenes, audio_data)
+
+        # Scenes are independent; Pillow text rendering releases the GIL,
+        # so build them concurrently (order is kept)
+        with ThreadPoolExecutor(max_workers=min(os.cpu_count() or 4, len(jobs))) as executor:
+            futures = [
+                executor.submit(
+                    self._build_one_scene, idx, scene, audio_dict, scene_start_times[idx], video_size,
+                    speech_marks_list[idx]
+                )
+                for idx, scene, audio_dict in jobs
+            ]
+            all_dialogue_clips = []
+            for future in futures:
+                all_dialogue_clips.extend(future.result())
+
+        logger.info("✓ %d dialogue overlay clips for %d scenes", len(all_dialogue_clips), len(jobs))
+        return all_dialogue_clips
+
+    def _build_one_scene(
+        self,
+        idx: int,
+        scene: Dict,
+        audio_dict: Dict,
+        start_time: float,
+        video_size: tuple,
+        speech_marks: list = None
+    ) -> List[VideoClip]:
+        """
+        Create the dialogue overlay clips for one scene.
+
+        Args:
+            idx: Scene index in the script
+            scene: Scene dict from the parsed script
+            audio_dict: Audio data dict from VoiceAgent
+            start_time: Start time of the scene in the final video
+            video_size: Video dimensions
+            speech_marks: Prefetched speech marks (read from disk if None)
+
+        Returns:
+            Flat list of overlay clips (empty if the scene has no dialogue or fails)
+        """
+        scene_num = scene.get("scene_number", idx + 1)
+        character_name = audio_dict.get("character", "NARRATOR")
+        dialogue = scene.get("dialogue", "")
+        speech_marks_path = audio_dict.get("speech_marks_path", "")
+
+        if not dialogue:
+            logger.debug("Scene %s: No dialogue, skipping", scene_num)
+            return []
+
+        # Estimate duration from scene or audio
+        duration = scene.get("duration_seconds", 6.0)
+
+        try:
+            clips = self.create_dialogue_overlay_clips(
+                character_name=character_name,
+                dialogue=dialogue,
+                speech_marks_path=speech_marks_path,
+                scene_start_time=start_time,
+                scene_duration=duration,
+                video_size=video_size,
+                speech_marks=speech_marks
+            )
+        except Exception as e:
+            logger.error("Scene %s (%s): ✗ Error: %s", scene_num, character_name, e)
+            return []
+
+        # Flatten list (name badge returns list of [bg, text])
+        flat_clips = []
+        for clip in clips:
+            if isinstance(clip, list):
+                flat_clips.extend(clip)
+            else:
+                flat_clips.append(clip)
+
+        logger.debug(
+            "Scene %s (%s): start %.2fs, duration %.2fs, ✓ %d dialogue clips created",
+            scene_num, character_name, start_time, duration, len(clips)
+        )
+
+        return flat_clips
+
+    def _prefetch_speech_marks(self, scenes: List[Dict], audio_data: List[Dict]) -> List[list]:
+        """
+        Load the speech marks of every scene with dialogue in one concurrent batch.
+
+        Args:
+            scenes: Scenes from the parsed script
+            audio_data: Audio data dicts with speech_marks_path
+
+        Returns:
+            Speech marks per scene (empty for scenes without dialogue)
+        """
+        return self.load_speech_marks_batch([
+            audio_dict.get("speech_marks_path", "") if scene.get("dialogue") else None
+            for scene, audio_dict in zip(scenes, audio_data)
+        ])
+
+    def create_dialogue_overlay_specs_for_scenes(
+        self,
+        parsed_script: Dict,
+        audio_data: List[Dict],
+        scene_start_times: List[float],
+        video_size: tuple = (1080, 1920)
+    ) -> List[Dict]:
+        """
+        Create dialogue overlays for all scenes as ffmpeg drawtext specs.
+
+        Same layout as create_dialogue_overlays_for_scenes, but nothing is
+        rasterized in Python: ffmpeg drawtext draws the specs (in the compositor
+        encode or via media_utils.burn_text_overlays).
+
+        Args:
+            parsed_script: Parsed script with scenes
+            audio_data: List of audio data dicts from VoiceAgent
+            scene_start_times: List of cumulative start times for each scene
+            video_size: Video dimensions
+
+        Returns:
+            List of overlay spec dicts
+        """
+        all_specs = []
 
         scenes = parsed_script.get("scenes", [])
 
-        print(f"\n=== Creating dialogue overlays for {len(scenes)} scenes ===")
+        logger.info("=== Creating dialogue overlays for %d scenes ===", len(scenes))
+
+        speech_marks_list = self._prefetch_speech_marks(scenes, audio_data)
 
         for idx, (scene, audio_dict) in enumerate(zip(scenes, audio_data)):
             scene_num = scene.get("scene_number")
-            character_name = audio_dict.get("character", "NARRATOR")
             dialogue = scene.get("dialogue", "")
-            speech_marks_path = audio_dict.get("speech_marks_path", "")
 
             if not dialogue:
-                print(f"\nScene {scene_num}: No dialogue, skipping")
+                logger.debug("Scene %s: No dialogue, skipping", scene_num)
                 continue
 
             start_time = scene_start_times[idx]
-
-            # Estimate duration from scene or audio
             duration = scene.get("duration_seconds", 6.0)
 
-            print(f"\nScene {scene_num}: {character_name}")
-            print(f"  Start time: {start_time:.2f}s")
-            print(f"  Duration: {duration:.2f}s")
-
             try:
-                clips = self.create_dialogue_overlay_clips(
-                    character_name=character_name,
-                    dialogue=dialogue,
-                    speech_marks_path=speech_marks_path,
-                    scene_start_time=start_time,
-                    scene_duration=duration,
-                    video_size=video_size
-                )
-
-                # Flatten list (name badge returns list of [bg, text])
-                for clip in clips:
-                    if isinstance(clip, list):
-                        all_dialogue_clips.extend(clip)
-                    else:
-                        all_dialogue_clips.append(clip)
-
-                print(f"  ✓ {len(clips)} dialogue clips created")
+                speech_marks = speech_marks_list[idx]
+
+                if speech_marks:
+                    specs = self.create_karaoke_specs(
+                        narration=dialogue,
+                        speech_marks=speech_marks,
+                        scene_start_time=start_time,
+                        video_size=video_size,
+                        bottom_offset=video_size[1] - self.dialogue_y_offset
+                    )
+                else:
+                    # Fallback: static dialogue text if no speech marks
+                    specs = self.wrap_text_specs(
+                        dialogue,
+                        start_time,
+                        duration,
+                        self.dialogue_y_offset,
+                        video_size
+                    )
+
+                all_specs.extend(specs)
+                logger.debug("Scene %s: ✓ %d dialogue overlays", scene_num, len(specs))
 
             except Exception as e:
-                print(f"  ✗ Error: {e}")
+                logger.error("Scene %s: ✗ Error: %s", scene_num, e)
 
-        return all_dialogue_clips
+        logger.info("✓ %d dialogue overlays for %d scenes", len(all_specs), len(scenes))
+
+        return all_specs
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("=== Dialogue Overlay Agent Test ===")
 
     # Test with example data
@@ -0,0 +1,731 @@
+"""
+Shared ffmpeg helpers for the video pipeline.
+
+Resolves the ffmpeg binary the same way MoviePy does (FFMPEG_BINARY env var,
+falling back to the imageio-ffmpeg build) so direct ffmpeg calls and MoviePy
+renders use the same encoder set.
+"""
+
+import os
+import re
+import json
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+from functools import lru_cache
+from typing import Dict, List
+
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY", "ffprobe")
+
+_DURATION_PATTERN = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+_VIDEO_STREAM_PATTERN = re.compile(
+    r"Video: (\w+)[^,]*, (\w+)(?:\([^)]*\))?, (\d+)x(\d+).*? (\d+(?:\.\d+)?) fps"
+)
+
+# NVENC settings for the final H.264 encode: p4 is the balanced preset, and
+# B-frames/lookahead delay are disabled for maximum encoder throughput.
+NVENC_PARAMS = {
+    "codec": "h264_nvenc",
+    "preset": "p4",
+    "ffmpeg_params": ["-tune", "ll", "-rc", "vbr", "-cq", "23", "-bf", "0", "-delay", "0"]
+}
+
+# macOS (VideoToolbox) and Intel Quick Sync settings for the same encode
+VIDEOTOOLBOX_PARAMS = {
+    "codec": "h264_videotoolbox",
+    "ffmpeg_params": ["-b:v", "6M"]
+}
+
+QSV_PARAMS = {
+    "codec": "h264_qsv",
+    "preset": "faster",
+    "ffmpeg_params": ["-global_quality", "23"]
+}
+
+# Hardware encoders in the order they are tried
+HARDWARE_ENCODER_PARAMS = {
+    "h264_nvenc": NVENC_PARAMS,
+    "h264_videotoolbox": VIDEOTOOLBOX_PARAMS,
+    "h264_qsv": QSV_PARAMS
+}
+
+# Constant-quality option of each encoder (-crf for libx264)
+QUALITY_FLAGS = {
+    "h264_nvenc": "-cq",
+    "h264_videotoolbox": "-q:v",
+    "h264_qsv": "-global_quality"
+}
+
+# CPU fallback: veryfast keeps software encodes from dominating render time
+LIBX264_PARAMS = {
+    "codec": "libx264",
+    "preset": "veryfast"
+}
+
+
+@lru_cache(maxsize=1)
+def get_ffmpeg_binary() -> str:
+    """
+    Get the ffmpeg executable MoviePy uses.
+
+    Returns:
+        Path or command name of the ffmpeg binary
+    """
+    binary = os.getenv("FFMPEG_BINARY", "ffmpeg-imageio")
+    if binary == "ffmpeg-imageio":
+        from imageio_ffmpeg import get_ffmpeg_exe
+        binary = get_ffmpeg_exe()
+    return binary
+
+
+@lru_cache(maxsize=1)
+def _listed_encoders() -> str:
+    """Output of `ffmpeg -encoders` (empty if ffmpeg can't be run)."""
+    try:
+        return subprocess.run(
+            [get_ffmpeg_binary(), "-hide_banner", "-encoders"],
+            capture_output=True,
+            text=True,
+            timeout=10
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+@lru_cache(maxsize=None)
+def encoder_available(codec: str) -> bool:
+    """
+    Check whether ffmpeg can actually encode with a (hardware) encoder.
+
+    Listing encoders is not enough (static builds list NVENC even without a
+    GPU), so a tiny test encode is run once per encoder and the result cached.
+
+    Args:
+        codec: ffmpeg encoder name, e.g. h264_nvenc
+
+    Returns:
+        True if the encoder is usable on this machine
+    """
+    if codec not in _listed_encoders():
+        return False
+
+    try:
+        probe = subprocess.run(
+            [
+                get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error",
+                "-f", "lavfi", "-i", "color=c=black:s=256x256:d=0.1",
+                "-c:v", codec, "-f", "null", "-"
+            ],
+            capture_output=True,
+            timeout=20
+        )
+        return probe.returncode == 0
+
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+
+@lru_cache(maxsize=1)
+def drawtext_available() -> bool:
+    """
+    Check whether ffmpeg was built with the drawtext filter.
+
+    Not every build has it (the imageio-ffmpeg binary MoviePy uses by default
+    does not), so callers fall back to rasterizing text with MoviePy.
+
+    Returns:
+        True if drawtext overlays can be rendered by ffmpeg
+    """
+    try:
+        filters = subprocess.run(
+            [get_ffmpeg_binary(), "-hide_banner", "-filters"],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+        return any(line.split()[1:2] == ["drawtext"] for line in filters.stdout.splitlines())
+
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+
+def get_h264_encoder_params(use_gpu: bool = True, codec: str = None) -> Dict:
+    """
+    Get write_videofile() keyword arguments for the fastest available H.264 encoder.
+
+    Hardware encoders are tried in order: NVENC, VideoToolbox (macOS), Quick
+    Sync; libx264 is the fallback. Set VIDEO_ENCODER (e.g. libx264,
+    h264_nvenc, h264_videotoolbox, h264_qsv) or pass codec to skip detection.
+
+    Args:
+        use_gpu: Allow hardware encoders; False always returns the libx264 settings
+        codec: Encoder to use instead of detecting one (overrides VIDEO_ENCODER)
+
+    Returns:
+        Dictionary with codec, preset and/or ffmpeg_params
+    """
+    encoder = codec or os.getenv("VIDEO_ENCODER")
+
+    if use_gpu:
+        if encoder is None:
+            encoder = next((codec for codec in HARDWARE_ENCODER_PARAMS if encoder_available(codec)), None)
+        if encoder in HARDWARE_ENCODER_PARAMS:
+            params = HARDWARE_ENCODER_PARAMS[encoder]
+            return dict(params, ffmpeg_params=list(params["ffmpeg_params"]))
+
+    return dict(LIBX264_PARAMS)
+
+
+def _media_stamp(path: str):
+    """Modification time and size of a local file (None for URLs), to key the probe cache."""
+    if "://" in path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@lru_cache(maxsize=256)
+def _probe(path: str, stamp) -> Dict:
+    """
+    Read duration and first video stream from the container header, once per file version.
+
+    Uses ffprobe when available, otherwise parses `ffmpeg -i` output
+    (imageio-ffmpeg ships ffmpeg but not ffprobe). No frames are decoded.
+    stamp only keys the cache, so a file rewritten in place is probed again.
+
+    Returns:
+        Dictionary with duration (seconds or None) and video (stream info or None)
+    """
+    try:
+        output = subprocess.check_output(
+            [
+                FFPROBE_BINARY, "-v", "error",
+                "-show_entries", "format=duration:stream=codec_type,codec_name,width,height,r_frame_rate,pix_fmt",
+                "-of", "json",
+                path
+            ],
+            text=True
+        )
+        info = json.loads(output)
+
+        try:
+            duration = float(info.get("format", {}).get("duration"))
+        except (TypeError, ValueError):
+            duration = None
+
+        video = None
+        for stream in info.get("streams", []):
+            if stream.get("codec_type") == "video":
+                video = {
+                    "codec_name": stream["codec_name"],
+                    "width": int(stream["width"]),
+                    "height": int(stream["height"]),
+                    "fps": float(Fraction(stream["r_frame_rate"])),
+                    "pix_fmt": stream.get("pix_fmt")
+                }
+                break
+
+        return {"duration": duration, "video": video}
+
+    except FileNotFoundError:
+        # No ffprobe on PATH - ffmpeg prints the header before failing on "no output"
+        result = subprocess.run(
+            [get_ffmpeg_binary(), "-hide_banner", "-i", path],
+            capture_output=True,
+            text=True
+        )
+
+        duration = None
+        match = _DURATION_PATTERN.search(result.stderr)
+        if match:
+            hours, minutes, seconds = match.groups()
+            duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+        video = None
+        match = _VIDEO_STREAM_PATTERN.search(result.stderr)
+        if match:
+            codec_name, pix_fmt, width, height, fps = match.groups()
+            video = {
+                "codec_name": codec_name,
+                "width": int(width),
+                "height": int(height),
+                "fps": float(fps),
+                "pix_fmt": pix_fmt
+            }
+
+        return {"duration": duration, "video": video}
+
+
+def probe_duration(path: str) -> float:
+    """
+    Read a media file's duration from its container header.
+
+    Results are cached per file version, so pipeline stages that look at the
+    same file share one probe.
+
+    Args:
+        path: Audio or video file path
+
+    Returns:
+        Duration in seconds
+    """
+    duration = _probe(path, _media_stamp(path))["duration"]
+    if duration is None:
+        raise ValueError(f"Could not determine duration of {path}")
+    return duration
+
+
+def probe_durations(paths: List[str], max_workers: int = 8) -> List[float]:
+    """
+    Probe several files' durations concurrently.
+
+    Args:
+        paths: Audio or video file paths
+        max_workers: Maximum number of concurrent probe processes
+
+    Returns:
+        Durations in seconds, in the same order as paths
+    """
+    if not paths:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+        return list(executor.map(probe_duration, paths))
+
+
+def probe_video_stream(path: str) -> Dict:
+    """
+    Read the first video stream's format from the container header.
+
+    Shares probe_duration()'s cache, so a file is probed once for both.
+
+    Args:
+        path: Video file path or URL
+
+    Returns:
+        Dictionary with codec_name, width, height, fps and pix_fmt
+    """
+    video = _probe(path, _media_stamp(path))["video"]
+    if video is None:
+        raise ValueError(f"Could not read video stream of {path}")
+    return dict(video)
+
+
+def existing_files(paths: List[str]) -> set:
+    """
+    Return which of the given local paths exist, with one scandir per directory.
+
+    Cheaper than an os.path.exists() stat per file when many files share a
+    directory (e.g. output/<reel>/audio), notably on network filesystems.
+    URLs and empty entries are never reported as existing.
+
+    Args:
+        paths: File paths
+
+    Returns:
+        Set of the input paths (as given) that exist as files
+    """
+    by_dir: Dict[str, List[str]] = {}
+    for path in paths:
+        if path and "://" not in path:
+            by_dir.setdefault(os.path.dirname(os.path.abspath(path)), []).append(path)
+
+    existing = set()
+    for directory, dir_paths in by_dir.items():
+        try:
+            with os.scandir(directory) as entries:
+                names = {entry.name for entry in entries if entry.is_file()}
+        except OSError:
+            continue
+        existing.update(path for path in dir_paths if os.path.basename(path) in names)
+
+    return existing
+
+
+def _concat_list_entry(path: str) -> str:
+    """Format one concat demuxer line, quoting the path."""
+    if "://" not in path:
+        path = os.path.abspath(path)
+    return "file '" + path.replace("'", "'\\''") + "'"
+
+
+def concat_copy(video_paths: List[str], audio_paths: List[str], output_path: str) -> str:
+    """
+    Join videos that share one format with the concat demuxer, without re-encoding.
+
+    Video packets are copied as-is; the narration tracks are joined the same
+    way and encoded to AAC (cheap next to a video encode). Each video must
+    already match its audio's duration.
+
+    Args:
+        video_paths: Videos with identical codec, resolution, frame rate and pixel format
+        audio_paths: One narration track per video
+        output_path: Destination MP4
+
+    Returns:
+        output_path
+    """
+    list_paths = []
+    try:
+        for paths in (video_paths, audio_paths):
+            with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+                f.write("\n".join(_concat_list_entry(path) for path in paths) + "\n")
+                list_paths.append(f.name)
+
+        concat_input = ["-f", "concat", "-safe", "0", "-protocol_whitelist", "file,http,https,tcp,tls"]
+        subprocess.run(
+            [
+                get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+                *concat_input, "-i", list_paths[0],
+                *concat_input, "-i", list_paths[1],
+                "-map", "0:v:0", "-map", "1:a:0",
+                "-c:v", "copy",
+                "-c:a", "aac",
+                "-movflags", "+faststart",
+                output_path
+            ],
+            check=True
+        )
+    finally:
+        for list_path in list_paths:
+            os.remove(list_path)
+
+    return output_path
+
+
+def remux_video(input_path: str, output_path: str) -> str:
+    """
+    Copy a video into a new MP4 container without re-encoding.
+
+    Streams are copied as-is and the moov atom is moved to the front
+    (+faststart) so the file starts playing before it is fully downloaded.
+
+    Args:
+        input_path: Source video
+        output_path: Destination MP4
+
+    Returns:
+        output_path
+    """
+    subprocess.run(
+        [
+            get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+            "-i", input_path,
+            "-c", "copy",
+            "-movflags", "+faststart",
+            output_path
+        ],
+        check=True
+    )
+    return output_path
+
+
+def encoder_args(encoder_params: Dict, quality: int = None) -> List[str]:
+    """
+    Turn get_h264_encoder_params() output into ffmpeg command-line arguments.
+
+    Args:
+        encoder_params: Dictionary with codec, optional preset and ffmpeg_params
+        quality: Optional constant-quality level (see QUALITY_FLAGS; -crf for libx264),
+            e.g. a lower value for intermediates that get encoded again
+
+    Returns:
+        List of ffmpeg output arguments
+    """
+    args = ["-c:v", encoder_params["codec"], "-pix_fmt", "yuv420p"]
+    if encoder_params.get("preset"):
+        args += ["-preset", encoder_params["preset"]]
+
+    ffmpeg_params = list(encoder_params.get("ffmpeg_params", []))
+    if quality is not None:
+        quality_flag = QUALITY_FLAGS.get(encoder_params["codec"], "-crf")
+        if quality_flag in ffmpeg_params:
+            ffmpeg_params[ffmpeg_params.index(quality_flag) + 1] = str(quality)
+        else:
+            ffmpeg_params += [quality_flag, str(quality)]
+
+    return args + ffmpeg_params
+
+
+def encode_filter_complex(
+    input_paths: List[str],
+    filtergraph: str,
+    output_path: str,
+    encoder_params: Dict = None,
+    video_label: str = "[v]",
+    audio_label: str = "[a]"
+) -> str:
+    """
+    Render a whole filtergraph over several inputs with one ffmpeg encode.
+
+    The graph is passed through a script file (-filter_complex_script) so
+    long graphs stay under argv limits.
+
+    Args:
+        input_paths: Inputs in the order the graph references them ([0:v], [1:a], ...)
+        filtergraph: -filter_complex graph producing video_label and audio_label
+        output_path: Destination MP4
+        encoder_params: write_videofile-style encoder kwargs
+            (defaults to get_h264_encoder_params())
+        video_label: Output pad of the graph holding the final video
+        audio_label: Output pad of the graph holding the final audio
+
+    Returns:
+        output_path
+    """
+    if encoder_params is None:
+        encoder_params = get_h264_encoder_params()
+
+    # GPU decode; frames are downloaded for the CPU filters automatically
+    hwaccel = ["-hwaccel", "cuda"] if encoder_params["codec"] == "h264_nvenc" else []
+    inputs = []
+    for path in input_paths:
+        inputs += [*hwaccel, "-i", path]
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+        f.write(filtergraph)
+        script_path = f.name
+
+    try:
+        subprocess.run(
+            [
+                get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+                *inputs,
+                "-filter_complex_script", script_path,
+                "-map", video_label, "-map", audio_label,
+                *encoder_args(encoder_params),
+                "-c:a", "aac",
+                "-movflags", "+faststart",
+                output_path
+            ],
+            check=True
+        )
+    finally:
+        os.remove(script_path)
+
+    return output_path
+
+
+def _escape_filter_value(value: str) -> str:
+    """Escape a filter option value for both the option and filtergraph parsers."""
+    # Option level (key=value:key=value)
+    for char in "\\':":
+        value = value.replace(char, "\\" + char)
+    # Filtergraph level (filter,filter;[link])
+    for char in "\\'[],;":
+        value = value.replace(char, "\\" + char)
+    return value
+
+
+def _enable_window(start: float, end: float) -> str:
+    """
+    Timeline expression enabling a filter for start <= t < end.
+
+    Half-open like a clip's start/end, so an overlay ending exactly when the
+    next one starts (consecutive karaoke words) never shares a frame with it.
+    """
+    return f"gte(t,{start:.3f})*lt(t,{end:.3f})"
+
+
+def _ffmpeg_color(color: str) -> str:
+    """Convert #RRGGBB to ffmpeg's 0xRRGGBB notation."""
+    return "0x" + color[1:] if color.startswith("#") else color
+
+
+def build_drawtext_filter(overlay_specs: List[Dict], font_path: str) -> str:
+    """
+    Build a drawtext filter chain that draws every overlay spec in one pass.
+
+    Args:
+        overlay_specs: Dicts with text, start, end, x, y, color, font_size,
+            stroke_color and stroke_width (see TextOverlayAgent._overlay_spec)
+        font_path: TrueType font file
+
+    Returns:
+        Filter chain for -vf / -filter_script:v
+    """
+    font = _escape_filter_value(font_path)
+    filters = []
+
+    for spec in overlay_specs:
+        enable = _enable_window(spec["start"], spec["end"])
+        options = [
+            f"fontfile={font}",
+            f"text={_escape_filter_value(spec['text'])}",
+            "expansion=none",
+            f"fontsize={spec['font_size']}",
+            f"fontcolor={_ffmpeg_color(spec['color'])}",
+            f"borderw={spec['stroke_width']}",
+            f"bordercolor={_ffmpeg_color(spec['stroke_color'])}",
+            f"x={spec['x']:.1f}",
+            f"y={spec['y']:.1f}",
+            f"enable={_escape_filter_value(enable)}"
+        ]
+        filters.append("drawtext=" + ":".join(options))
+
+    return ",\n".join(filters)
+
+
+def write_filter_script(overlay_specs: List[Dict], font_path: str) -> str:
+    """
+    Write a drawtext filter chain to a temporary file for -filter_script:v.
+
+    Long filter chains go through a script file to stay under argv limits.
+    The caller is responsible for removing the file.
+
+    Args:
+        overlay_specs: Overlay spec dicts (see build_drawtext_filter)
+        font_path: TrueType font file
+
+    Returns:
+        Path to the filter script
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+        f.write(build_drawtext_filter(overlay_specs, font_path))
+        return f.name
+
+
+def burn_text_overlays(
+    input_path: str,
+    output_path: str,
+    overlay_specs: List[Dict],
+    font_path: str,
+    encoder_params: Dict = None
+) -> str:
+    """
+    Draw timed text overlays onto a video with a single ffmpeg drawtext pass.
+
+    The audio stream is copied untouched; only the video is re-encoded.
+
+    Args:
+        input_path: Source video
+        output_path: Destination MP4
+        overlay_specs: Overlay spec dicts (see build_drawtext_filter)
+        font_path: TrueType font file
+        encoder_params: write_videofile-style encoder kwargs
+            (defaults to get_h264_encoder_params())
+
+    Returns:
+        output_path
+    """
+    if encoder_params is None:
+        encoder_params = get_h264_encoder_params()
+
+    script_path = write_filter_script(overlay_specs, font_path)
+
+    try:
+        subprocess.run(
+            [
+                get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+                "-i", input_path,
+                "-filter_script:v", script_path,
+                *encoder_args(encoder_params),
+                "-c:a", "copy",
+                "-movflags", "+faststart",
+                output_path
+            ],
+            check=True
+        )
+    finally:
+        os.remove(script_path)
+
+    return output_path
+
+
+def build_image_overlay_filters(
+    overlays: List[Dict],
+    source_label: str,
+    output_label: str,
+    first_input: int
+) -> List[str]:
+    """
+    Build the overlay filter chain that composites timed images onto a video.
+
+    Args:
+        overlays: Dicts with image, start, end, x and y; the images must be
+            ffmpeg inputs first_input, first_input + 1, ... in this order
+        source_label: Pad holding the video to draw on, e.g. [0:v]
+        output_label: Pad for the result, e.g. [v]
+        first_input: Input index of the first overlay image
+
+    Returns:
+        Filtergraph statements (join with ";")
+    """
+    if not overlays:
+        return [f"{source_label}null{output_label}"]
+
+    filters = []
+    label = source_label
+
+    for idx, overlay in enumerate(overlays, 1):
+        enable = _enable_window(overlay["start"], overlay["end"])
+        out_label = output_label if idx == len(overlays) else f"[o{idx}]"
+        filters.append(
+            f"{label}[{first_input + idx - 1}:v]overlay=x={overlay['x']:.1f}:y={overlay['y']:.1f}"
+            f":enable='{enable}'{out_label}"
+        )
+        label = out_label
+
+    return filters
+
+
+def burn_image_overlays(
+    input_path: str,
+    output_path: str,
+    overlays: List[Dict],
+    encoder_params: Dict = None
+) -> str:
+    """
+    Draw timed image overlays onto a video with a single ffmpeg overlay pass.
+
+    For ffmpeg builds without drawtext: text is rasterized to PNGs up front
+    (see text_overlay_agent.render_overlay_images) and each image is
+    composited by ffmpeg while enabled, with no per-frame work in Python.
+    The audio stream is copied untouched; only the video is re-encoded.
+
+    Args:
+        input_path: Source video
+        output_path: Destination MP4
+        overlays: Dicts with image (PNG path), start, end, x and y
+        encoder_params: write_videofile-style encoder kwargs
+            (defaults to get_h264_encoder_params())
+
+    Returns:
+        output_path
+    """
+    if encoder_params is None:
+        encoder_params = get_h264_encoder_params()
+
+    image_inputs = []
+    for overlay in overlays:
+        image_inputs += ["-i", overlay["image"]]
+
+    filters = build_image_overlay_filters(overlays, "[0:v]", "[v]", first_input=1)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+        f.write(";\n".join(filters))
+        script_path = f.name
+
+    try:
+        subprocess.run(
+            [
+                get_ffmpeg_binary(), "-y", "-hide_banner", "-loglevel", "error",
+                "-i", input_path,
+                *image_inputs,
+                "-filter_complex_script", script_path,
+                "-map", "[v]", "-map", "0:a?",
+                *encoder_args(encoder_params),
+                "-c:a", "copy",
+                "-movflags", "+faststart",
+                output_path
+            ],
+            check=True
+        )
+    finally:
+        os.remove(script_path)
+
+    return output_path
@@ -1,14 +1,19 @@
 import json
 import os
+from functools import lru_cache
 from typing import List, Dict
-from dotenv import load_dotenv
-from langchain_aws import ChatBedrock
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
 
-# Load environment variables from .env
-load_dotenv()
+from bedrock_utils import CLAUDE_MODEL_ID, get_bedrock_client, invoke_claude, parse_json_response
+
+# LangChain and python-dotenv are imported on first use, so importing this
+# module (e.g. for the orchestrator CLI) doesn't pay for their import graphs
+
+@lru_cache(maxsize=1)
+def _env_loaded() -> bool:
+    """Load environment variables from .env, once."""
+    from dotenv import load_dotenv
+    return load_dotenv()
 
 class ReelIdea(BaseModel):
     title: str = Field(description="The catchy title of the reel idea")
@@ -56,51 +61,36 @@ NEWS_SYSTEM_PROMPT = (
     "You must return the response in valid JSON format matching the schema provided."
 )
 
+@lru_cache(maxsize=1)
+def _ideas_format_instructions() -> str:
+    """Schema instructions for the ideas prompt, built once."""
+    from langchain_core.output_parsers import JsonOutputParser
+    return JsonOutputParser(pydantic_object=ReelIdeasResponse).get_format_instructions()
+
 def generate_reel_ideas(count: int, theme: str, mode: str = "story") -> List[Dict]:
-    # Use the Inference Profile ID (us. prefix) to support cross-region inference
-    llm = ChatBedrock(
-        model_id="us.anthropic.claude-3-5-sonnet-20240620-v1:0",
-        model_kwargs={"temperature": 0.5 if mode == "news" else 0.7}
-    )
+    _env_loaded()
 
-    parser = JsonOutputParser(pydantic_object=ReelIdeasResponse)
+    # A single prompt -> JSON round trip: call Bedrock directly on the shared
+    # client instead of building a LangChain chain per call
     system_prompt = NEWS_SYSTEM_PROMPT if mode == "news" else STORY_SYSTEM_PROMPT
-
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("human", "Generate {count} unique reel ideas based on the theme: '{theme}'.\n\n{format_instructions}")
-    ]).partial(format_instructions=parser.get_format_instructions())
-
-    chain = prompt | llm | parser
+    human_text = (
+        f"Generate {count} unique reel ideas based on the theme: '{theme}'.\n\n"
+        f"{_ideas_format_instructions()}"
+    )
 
     try:
-        response = chain.invoke({"count": count, "theme": theme})
-        return response.get("ideas", [])
+        response_text = invoke_claude(
+            system_prompt,
+            human_text,
+            temperature=0.5 if mode == "news" else 0.7
+        )
+        response = ReelIdeasResponse.model_validate(parse_json_response(response_text))
+        return [idea.model_dump() for idea in response.ideas]
     except Exception as e:
         print(f"Error generating reel ideas: {e}")
         return []
 
-def generate_video_plan(parsed_script: Dict, character_bibles: Dict, theme: str, reel_name: str = None) -> Dict:
-    """
-    Generate video-optimized scene plans for animation.
-
-    Args:
-        parsed_script: Output from ScriptParserAgent
-        character_bibles: Output from CharacterDesignerAgent
-        theme: Visual theme
-        reel_name: Optional name for saving output
-
-    Returns:
-        Dictionary with video scene plans
-    """
-    llm = ChatBedrock(
-        model_id="us.anthropic.claude-3-5-sonnet-20240620-v1:0",
-        model_kwargs={"temperature": 0.4}  # Moderate creativity for planning
-    )
-
-    parser = JsonOutputParser(pydantic_object=VideoScenePlanResponse)
-
-    system_prompt = """You are a professional film director planning animated video scenes.
+VIDEO_PLAN_SYSTEM_PROMPT = """You are a professional film director planning animated video scenes.
 
 Your task is to transform script scenes into detailed video generation plans.
 
@@ -126,28 +116,24 @@ CAMERA MOVEMENT GUIDELINES:
 
 Return valid JSON matching the VideoScenePlanResponse schema."""
 
-    # Build character reference lookup
-    char_features = {}
-    for char in character_bibles.get("characters", []):
-        char_features[char["name"]] = char.get("distinctive_features", "")
-
-    # Prepare scene context
-    scenes_context = []
-    for scene in parsed_script.get("scenes", []):
-        char_refs = [char_features.get(c, "") for c in scene.get("characters", [])]
-        scenes_context.append({
-            "scene_number": scene["scene_number"],
-            "characters": scene["characters"],
-            "dialogue": scene["dialogue"],
-            "action": scene["action"],
-            "location": scene["location"],
-            "camera": scene.get("camera", "static"),
-            "character_features": char_refs,
-            "duration_estimate": scene.get("duration_seconds", 6)
-        })
+@lru_cache(maxsize=1)
+def _get_video_plan_chain():
+    """Video plan prompt | llm | parser chain, built on first use and reused."""
+    from langchain_aws import ChatBedrock
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.output_parsers import JsonOutputParser
+
+    parser = JsonOutputParser(pydantic_object=VideoScenePlanResponse)
+    llm = ChatBedrock(
+        model_id=CLAUDE_MODEL_ID,
+        model_kwargs={"temperature": 0.4},  # Moderate creativity for planning
+        # Stream the (long) plan so it is never cut off by the read timeout
+        streaming=True,
+        client=get_bedrock_client()
+    )
 
     prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
+        ("system", VIDEO_PLAN_SYSTEM_PROMPT),
         ("human", """Theme: {theme}
 
 Scenes to plan:
@@ -158,12 +144,51 @@ Transform these scenes into detailed video generation plans.
 {format_instructions}""")
     ]).partial(format_instructions=parser.get_format_instructions())
 
-    chain = prompt | llm | parser
+    return prompt | llm | parser
+
+def generate_video_plan(parsed_script: Dict, character_bibles: Dict, theme: str, reel_name: str = None) -> Dict:
+    """
+    Generate video-optimized scene plans for animation.
+
+    Args:
+        parsed_script: Output from ScriptParserAgent
+        character_bibles: Output from CharacterDesignerAgent
+        theme: Visual theme
+        reel_name: Optional name for saving output
+
+    Returns:
+        Dictionary with video scene plans
+    """
+    _env_loaded()
+
+    # Build character reference lookup
+    char_features = {
+        char["name"]: char.get("distinctive_features", "")
+        for char in character_bibles.get("characters", [])
+    }
+
+    # Prepare scene context (references the script's strings, no copies)
+    scenes_context = [
+        {
+            "scene_number": scene["scene_number"],
+            "characters": scene["characters"],
+            "dialogue": scene["dialogue"],
+            "action": scene["action"],
+            "location": scene["location"],
+            "camera": scene.get("camera", "static"),
+            "character_features": [char_features.get(c, "") for c in scene.get("characters", [])],
+            "duration_estimate": scene.get("duration_seconds", 6)
+        }
+        for scene in parsed_script.get("scenes", [])
+    ]
+
+    chain = _get_video_plan_chain()
 
     try:
         result = chain.invoke({
             "theme": theme,
-            "scenes": json.dumps(scenes_context, indent=2)
+            # Compact JSON: the indentation only cost prompt tokens
+            "scenes": json.dumps(scenes_context, separators=(",", ":"))
         })
 
         # Save video plan if reel_name provided
@@ -2,11 +2,8 @@ import os
 import json
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from planner_agent import generate_reel_ideas
-from script_agent import generate_script
-from visual_agent import VisualAgent
-from voice_agent import VoiceAgent
-from video_agent import VideoAgent
 
 # Configure logging
 logging.basicConfig(
@@ -18,9 +15,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _generate_images(script: dict, theme: str, reel_name: str, mode: str):
+    """Step 3: generate scene images; returns the paths, or None on failure."""
+    try:
+        from visual_agent import VisualAgent
+        visual_agent = VisualAgent()
+        image_paths = visual_agent.generate_images(script, theme, reel_name, mode=mode, max_workers=8)
+        if not image_paths:
+            logger.error("No images were generated.")
+            return None
+        logger.info(f"Successfully generated {len(image_paths)} images.")
+        return image_paths
+    except Exception as e:
+        logger.error(f"Error during image generation: {e}")
+        return None
+
+def _generate_audio(script: dict, reel_name: str, mode: str, voice: str, engine: str):
+    """Step 4: generate voice-over audio; returns the paths, or None on failure."""
+    try:
+        from voice_agent import VoiceAgent
+        voice_agent = VoiceAgent(voice_id=voice, engine=engine)
+        audio_paths = voice_agent.generate_audio(script, reel_name, mode=mode, max_workers=8)
+        if not audio_paths:
+            logger.error("No audio files were generated.")
+            return None
+        logger.info(f"Successfully generated {len(audio_paths)} audio files and corresponding speech marks for karaoke.")
+        return audio_paths
+    except Exception as e:
+        logger.error(f"Error during audio generation: {e}")
+        return None
+
 def orchestrate_reel(reel_idea: str, theme: str, reel_name: str, duration: int = 30, mode: str = "story", voice: str = "Justin", engine: str = "neural"):
     """
     Orchestrates the creation of an Instagram Reel from an initial idea.
+
+    Each stage's agent (and with it MoviePy, LangChain, boto3) is imported
+    when the stage starts, so a run that fails early never pays for the rest.
     """
     output_dir = os.path.join("output", reel_name)
     os.makedirs(output_dir, exist_ok=True)
@@ -41,50 +71,40 @@ def orchestrate_reel(reel_idea: str, theme: str, reel_name: str, duration: int =
     plan = plans[0]
     plan_path = os.path.join(output_dir, "plan.json")
     with open(plan_path, "w") as f:
-        json.dump(plan, f, indent=2)
+        f.write(json.dumps(plan, indent=2))
     logger.info(f"Plan generated and saved to {plan_path}")
 
     # 2. Script Agent
     logger.info("Step 2/5: Generating detailed script...")
     try:
+        from script_agent import generate_script
         script = generate_script(plan, theme, target_duration=duration, mode=mode)
         script_path = os.path.join(output_dir, "script.json")
         with open(script_path, "w") as f:
-            json.dump(script, f, indent=2)
+            f.write(json.dumps(script, indent=2))
         logger.info(f"Script generated and saved to {script_path}")
     except Exception as e:
         logger.error(f"Failed to generate script: {e}")
         return None
 
-    # 3. Visual Agent
+    # 3 + 4. Visual and Voice Agents - both only need the script and are
+    # bound by Bedrock/Polly latency, so run them side by side
     logger.info("Step 3/5: Generating images for each scene...")
-    try:
-        visual_agent = VisualAgent()
-        image_paths = visual_agent.generate_images(script, theme, reel_name, mode=mode)
-        if not image_paths:
-            logger.error("No images were generated.")
-            return None
-        logger.info(f"Successfully generated {len(image_paths)} images.")
-    except Exception as e:
-        logger.error(f"Error during image generation: {e}")
-        return None
-
-    # 4. Voice Agent
     logger.info("Step 4/5: Generating voice-over audio...")
-    try:
-        voice_agent = VoiceAgent(voice_id=voice, engine=engine)
-        audio_paths = voice_agent.generate_audio(script, reel_name, mode=mode)
-        if not audio_paths:
-            logger.error("No audio files were generated.")
-            return None
-        logger.info(f"Successfully generated {len(audio_paths)} audio files and corresponding speech marks for karaoke.")
-    except Exception as e:
-        logger.error(f"Error during audio generation: {e}")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        image_future = executor.submit(_generate_images, script, theme, reel_name, mode)
+        audio_future = executor.submit(_generate_audio, script, reel_name, mode, voice, engine)
+        # Wait for both before deciding, so neither is abandoned mid-run
+        image_paths = image_future.result()
+        audio_paths = audio_future.result()
+
+    if not image_paths or not audio_paths:
         return None
 
     # 5. Video Agent
     logger.info("Step 5/5: Assembling final video...")
     try:
+        from video_agent import VideoAgent
         video_agent = VideoAgent()
         video_path = video_agent.create_video(reel_name, script, mode=mode)
         logger.info(f"Final video created successfully: {video_path}")
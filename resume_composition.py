@@ -12,8 +12,18 @@ Usage:
 
 import sys
 import json
+import tempfile
 from animation_compositor_agent import AnimationCompositorAgent
 from dialogue_overlay_agent import DialogueOverlayAgent
+from media_utils import (
+    burn_image_overlays,
+    burn_text_overlays,
+    drawtext_available,
+    get_h264_encoder_params,
+    probe_durations,
+    remux_video
+)
+from text_overlay_agent import render_overlay_images
 
 def resume_from_composition(reel_name: str):
     """
@@ -87,18 +97,14 @@ def resume_from_composition(reel_name: str):
 
     # Calculate scene start times based on ACTUAL audio durations
     # (not script durations, which may be estimates)
+    # (header probes run concurrently and are shared with the compositor's cache)
+    audio_durations = probe_durations([audio_dict['audio_path'] for audio_dict in audio_data])
+
     scene_start_times = []
     cumulative_time = 0.0
 
-    for audio_dict in audio_data:
+    for actual_duration in audio_durations:
         scene_start_times.append(cumulative_time)
-
-        # Get actual audio duration
-        from moviepy import AudioFileClip
-        audio_clip = AudioFileClip(audio_dict['audio_path'])
-        actual_duration = audio_clip.duration
-        audio_clip.close()
-
         cumulative_time += actual_duration
 
     print(f"\nActual scene timings: {[f'{t:.2f}s' for t in scene_start_times]}")
@@ -107,42 +113,34 @@ def resume_from_composition(reel_name: str):
     overlay_agent = DialogueOverlayAgent()
 
     try:
-        dialogue_clips = overlay_agent.create_dialogue_overlays_for_scenes(
+        overlay_specs = overlay_agent.create_dialogue_overlay_specs_for_scenes(
             parsed_script=parsed_script,
             audio_data=audio_data,
             scene_start_times=scene_start_times
         )
 
-        print(f"\n✓ Dialogue overlays created: {len(dialogue_clips)} clips")
-
-        # Composite final video
-        print("\nCompositing final video with dialogue overlays...")
-
-        from moviepy import VideoFileClip, CompositeVideoClip
-
-        composite_video = VideoFileClip(composite_video_path)
-
-        if dialogue_clips:
-            final_video = CompositeVideoClip([composite_video] + dialogue_clips)
-        else:
-            final_video = composite_video
+        print(f"\n✓ Dialogue overlays created: {len(overlay_specs)} clips")
 
         # Save final video
         final_path = f"{base_dir}/{reel_name}.mp4"
 
-        print(f"\nWriting final video to: {final_path}")
-        final_video.write_videofile(
-            final_path,
-            fps=24,
-            codec='libx264',
-            audio_codec='aac',
-            temp_audiofile='temp-audio-final.m4a',
-            remove_temp=True
-        )
-
-        # Cleanup
-        composite_video.close()
-        final_video.close()
+        if not overlay_specs:
+            # Nothing to draw - copy the composite streams without re-encoding
+            print(f"\nNo dialogue overlays, remuxing to: {final_path}")
+            remux_video(composite_video_path, final_path)
+        else:
+            # One ffmpeg pass draws every overlay (no per-frame compositing in
+            # Python); the hardware encoder is used when available
+            encoder_params = get_h264_encoder_params()
+            print(f"\nWriting final video to: {final_path} ({encoder_params['codec']})")
+
+            if drawtext_available():
+                burn_text_overlays(composite_video_path, final_path, overlay_specs, overlay_agent.font, encoder_params)
+            else:
+                # ffmpeg without drawtext: overlay pre-rendered text images instead
+                with tempfile.TemporaryDirectory() as image_dir:
+                    overlays = render_overlay_images(overlay_specs, overlay_agent.font, image_dir)
+                    burn_image_overlays(composite_video_path, final_path, overlays, encoder_params)
 
         print("\n" + "="*60)
         print("✓ REEL COMPLETE!")
@@ -1,46 +1,68 @@
+import hashlib
 import json
+import math
 import os
-from typing import List, Dict, Optional
+import random
+import re
+import time
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 from langchain_aws import ChatBedrock
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field, field_validator
+from bedrock_utils import CLAUDE_FAST_MODEL_ID, embed_text, get_bedrock_client
 
 load_dotenv()
 
+# Banned in news scripts; like the transitions below these match anywhere in
+# the (lowercased) text, one compiled pattern per category
+FICTIONAL_WORDS = ["imagine", "what if", "journey", "magic", "wonder", "story", "myth", "legend", "fairytale"]
+STORYTELLING_PHRASES = ["once upon a time", "in a world", "long ago", "it all started when", "picture this"]
+EXAGGERATIONS = ["mind-blowing", "unbelievable", "insane", "shocking", "life-changing"]
+_FICTIONAL_PATTERN = re.compile("|".join(re.escape(w) for w in FICTIONAL_WORDS))
+_STORYTELLING_PATTERN = re.compile("|".join(re.escape(p) for p in STORYTELLING_PHRASES))
+_EXAGGERATION_PATTERN = re.compile("|".join(re.escape(w) for w in EXAGGERATIONS))
+_EMOJI_PATTERN = re.compile("[\U0001F601-\U0001F64E]")
+# Anything past U+2000 (emojis, symbols); accented Latin letters are fine
+_SPECIAL_CHAR_PATTERN = re.compile("[\u2001-\U0010FFFF]")
+
 def validate_facts(script: Dict):
     """
     Checks for fictional elements, storytelling phrases, emojis, and exaggerations in the script.
     Fails if any are detected.
     """
-    fictional_words = ["imagine", "what if", "journey", "magic", "wonder", "story", "myth", "legend", "fairytale"]
-    storytelling_phrases = ["once upon a time", "in a world", "long ago", "it all started when", "picture this"]
-    
     for scene in script.get("scenes", []):
-        text = scene.get("voice_line", "").lower()
-        visual = scene.get("visual_prompt", "").lower()
-        combined = text + " " + visual
+        text = scene.get("voice_line", "")
+        combined = (text + " " + scene.get("visual_prompt", "")).lower()
         
         # Check for emojis
-        if any(char for char in text if ord(char) > 0x1F600 and ord(char) < 0x1F64F):
+        if _EMOJI_PATTERN.search(text):
             raise ValueError(f"Factual validation failed: Emojis detected in scene {scene['scene_number']}.")
         
         # Check for fictional words
-        for word in fictional_words:
-            if word in combined:
-                raise ValueError(f"Factual validation failed: Fictional word '{word}' detected in scene {scene['scene_number']}.")
+        match = _FICTIONAL_PATTERN.search(combined)
+        if match:
+            raise ValueError(f"Factual validation failed: Fictional word '{match.group(0)}' detected in scene {scene['scene_number']}.")
                 
         # Check for storytelling phrases
-        for phrase in storytelling_phrases:
-            if phrase in combined:
-                raise ValueError(f"Factual validation failed: Storytelling phrase '{phrase}' detected in scene {scene['scene_number']}.")
+        match = _STORYTELLING_PATTERN.search(combined)
+        if match:
+            raise ValueError(f"Factual validation failed: Storytelling phrase '{match.group(0)}' detected in scene {scene['scene_number']}.")
         
         # Check for exaggerations (very subjective, but we can catch some common ones)
-        exaggerations = ["mind-blowing", "unbelievable", "insane", "shocking", "life-changing"]
-        for word in exaggerations:
-            if word in combined:
-                raise ValueError(f"Factual validation failed: Exaggeration '{word}' detected in scene {scene['scene_number']}.")
+        match = _EXAGGERATION_PATTERN.search(combined)
+        if match:
+            raise ValueError(f"Factual validation failed: Exaggeration '{match.group(0)}' detected in scene {scene['scene_number']}.")
+
+# Words that connect a scene to the previous one; matched anywhere in the
+# text (not only as whole words), in a single pass over each scene
+STORY_TRANSITIONS = ["then", "as", "suddenly", "moments later", "realizes", "while", "instead", "now", "finally", "because", "so", "but", "however", "therefore"]
+_TRANSITIONS_PATTERN = re.compile("|".join(re.escape(t) for t in STORY_TRANSITIONS), re.IGNORECASE)
 
 class Character(BaseModel):
     name: str = Field(description="Character identifier (e.g., 'the robot', 'the girl')")
@@ -66,6 +88,10 @@ class Scene(BaseModel):
     emotion: str = Field(description="The emotion of the moment")
     duration_seconds: float = Field(description="Duration of the scene in seconds")
 
+class NewsScript(BaseModel):
+    story: str = Field(description="Factual summary of the event (80-120 words), written first")
+    scenes: List[Scene] = Field(description="List of 5-7 scenes derived from the summary")
+
 class Script(BaseModel):
     mode: str = Field(default="story", description="The mode: story or news")
     visual_bible: Optional[VisualBible] = Field(default=None, description="Visual consistency reference (story mode only)")
@@ -78,19 +104,18 @@ class Script(BaseModel):
         if not (5 <= len(v) <= 7):
             raise ValueError(f"Script must have between 5 and 7 scenes. Found {len(v)}.")
         
-        total_duration = sum(s.duration_seconds for s in v)
+        # Exactly rounded, so the 10-60s bounds see the true total
+        total_duration = math.fsum(s.duration_seconds for s in v)
         if not (10 <= total_duration <= 60):
              raise ValueError(f"Total duration ({total_duration}s) must be between 10 and 60 seconds.")
 
         if mode == "story":
             # Continuity validation: Check for transition keywords and flow
-            transitions = ["then", "as", "suddenly", "moments later", "realizes", "while", "instead", "now", "finally", "because", "so", "but", "however", "therefore"]
             flow_score = 0
             emotions = set()
             
             for i in range(len(v)):
-                combined_text = (v[i].voice_line + " " + v[i].visual_prompt).lower()
-                if i > 0 and any(t in combined_text for t in transitions):
+                if i > 0 and _TRANSITIONS_PATTERN.search(v[i].voice_line + " " + v[i].visual_prompt):
                     flow_score += 1
                 
                 emotions.add(v[i].emotion.lower())
@@ -109,7 +134,7 @@ class Script(BaseModel):
         
         elif mode == "news":
             for scene in v:
-                if any(char for char in scene.voice_line if ord(char) > 0x2000): # basic emoji/non-ascii check
+                if _SPECIAL_CHAR_PATTERN.search(scene.voice_line): # basic emoji/non-ascii check
                      raise ValueError(f"News script must not contain emojis or special characters.")
                 if scene.emotion.lower() != "neutral":
                      raise ValueError(f"News script must have 'neutral' emotion for all scenes.")
@@ -121,15 +146,15 @@ STORY_SYSTEM_PROMPT = (
     "Linguistic Rules: Use simple, everyday words (Grade 5 level). Avoid poetic, metaphorical, or flowery language. "
     "Structure: The story MUST follow the user's input literally. Keep it simple and easy to understand. "
     "Focus on clear communication, not abstract themes. "
-    "Target Duration: The story should be paced for a {target_duration} second video. "
-    "Theme: {theme}"
+    "Target Duration: The story should be paced for the target duration the user gives (in seconds). "
+    "Theme: use the theme the user gives."
 )
 
 SCENE_SYSTEM_PROMPT = (
     "You are a world-class director and script doctor. "
     "Transform the story into a 5-7 scene cinematic script. "
-    "The TOTAL duration of all scenes must equal exactly {target_duration} seconds. "
-    "Allocate 'duration_seconds' for each scene so that the sum equals exactly {target_duration}.\n"
+    "The TOTAL duration of all scenes must equal exactly the target duration the user gives (in seconds). "
+    "Allocate 'duration_seconds' for each scene so that the sum equals exactly that target.\n"
     "Linguistic Rules:\n"
     "1. NO industry jargon. Use simple, everyday words.\n"
     "2. Short sentences only. Maximum 10 words per voice line.\n"
@@ -143,27 +168,28 @@ SCENE_SYSTEM_PROMPT = (
     "Output JSON format:\n{format_instructions}"
 )
 
-NEWS_STORY_SYSTEM_PROMPT = (
-    "You are a professional news writer. Write a factual summary of the following event or discovery (80-120 words). "
-    "Rules: Neutral tone, NO emotions, NO metaphors, NO exaggeration, NO opinions, NO clickbait. "
-    "Focus purely on verified facts and clear reporting. "
-    "Target Duration: The report should be paced for a {target_duration} second video. "
-    "Subject: {theme}"
-)
+SINGLE_PASS_NEWS_PROMPT = """You are a professional news writer and broadcast director.
 
-NEWS_SCENE_SYSTEM_PROMPT = (
-    "You are a news broadcast director. Transform the provided facts into a 5-7 scene news script. "
-    "Rules:\n"
-    "1. Each scene must present ONE verified fact.\n"
-    "2. NO slang, NO storytelling transitions, NO emotional language.\n"
-    "3. Short, authoritative sentences (News anchor style).\n"
-    "4. Voice lines should be neutral and factual (e.g., 'The probe reached the surface at 4 PM').\n"
-    "5. Visual prompts must be realistic, documentary-style descriptions.\n"
-    "6. Emotion must ALWAYS be 'neutral'.\n"
-    "7. Total duration must be exactly {target_duration} seconds.\n"
-    "8. EVERY scene MUST include ALL fields: scene_number, voice_line, visual_prompt, emotion, duration_seconds.\n\n"
-    "Output JSON format:\n{format_instructions}"
-)
+TASK: Report the event or discovery the user gives as a short news video, in ONE response.
+
+STEP 1 - SUMMARY ("story" field):
+Write a factual summary of the event or discovery (80-120 words).
+- Neutral tone, NO emotions, NO metaphors, NO exaggeration, NO opinions, NO clickbait.
+- Focus purely on verified facts and clear reporting.
+- Pace it for the Target Duration the user gives (in seconds).
+
+STEP 2 - SCENES (5-7 scenes, derived from your summary):
+1. Each scene must present ONE verified fact from the summary.
+2. NO slang, NO storytelling transitions, NO emotional language.
+3. Short, authoritative sentences (News anchor style).
+4. Voice lines should be neutral and factual (e.g., 'The probe reached the surface at 4 PM').
+5. Visual prompts must be realistic, documentary-style descriptions.
+6. Emotion must ALWAYS be 'neutral'.
+7. Total duration must be exactly the Target Duration the user gives.
+8. EVERY scene MUST include ALL fields: scene_number, voice_line, visual_prompt, emotion, duration_seconds.
+
+Output JSON format:
+{format_instructions}"""
 
 SINGLE_PASS_STORY_PROMPT = """You are a helpful digital creator making a straightforward short video.
 
@@ -175,13 +201,13 @@ Define your characters and setting FIRST. Ensure they are grounded and realistic
 - Setting: Define the location, time of day, atmosphere, key visual elements
 - Color Palette: Choose 2-3 dominant colors that unify the visual style
 
-STEP 2 - SCENES (5-7 scenes, total {target_duration} seconds):
+STEP 2 - SCENES (5-7 scenes, total = the Target Duration the user gives):
 EVERY scene MUST include ALL of these fields:
 - scene_number: Sequential number (1, 2, 3, etc.)
 - voice_line: The narration text (max 10 words). Keep it DIRECT and SIMPLE. No poetic flourishes.
 - visual_prompt: What we see on screen
 - emotion: The tone of the moment (e.g., "curious", "focused", "happy", "surprised")
-- duration_seconds: How long this scene lasts (must sum to {target_duration})
+- duration_seconds: How long this scene lasts (must sum to the Target Duration)
 
 Each scene's visual_prompt MUST:
 - Reference characters using their Visual Bible descriptions
@@ -195,87 +221,428 @@ Rules:
 - Maximum 10 words per voice line.
 - Use simple, everyday words (Grade 5 level).
 - Follow the user's input STRICTLY.
-
-Theme/Style: {theme}
+- Use the Theme/Style the user gives.
 
 {format_instructions}"""
 
-def generate_script(idea: Dict, theme: str, target_duration: int = 30, mode: str = "story") -> Dict:
-    llm = ChatBedrock(
-        model_id="us.anthropic.claude-3-5-sonnet-20240620-v1:0",
-        model_kwargs={"temperature": 0.3 if mode == "news" else 0.7}
+SCRIPT_MODEL_ID = "us.anthropic.claude-3-5-sonnet-20240620-v1:0"
+# News scripts are factual summaries; they don't need Sonnet-tier writing
+NEWS_MODEL_ID = os.getenv("NEWS_SCRIPT_MODEL_ID", CLAUDE_FAST_MODEL_ID)
+
+# Mark the (static) system prompts as a Bedrock prompt-cache prefix. Only
+# enable with a model that supports prompt caching on Bedrock.
+PROMPT_CACHING = os.getenv("BEDROCK_PROMPT_CACHING", "").lower() in ("1", "true", "yes")
+
+# Generated scripts are cached on disk by their inputs
+SCRIPT_CACHE_DIR = os.getenv("SCRIPT_CACHE_DIR", os.path.join(".cache", "script"))
+SCRIPT_CACHE_TTL = 7 * 24 * 3600  # seconds
+
+
+def _cache_key(**inputs) -> str:
+    """
+    Hash the inputs of a script generation into a cache key.
+
+    The model and the prompts are part of the key, so editing a prompt
+    never serves a script generated with the old one.
+    """
+    prompts = [SINGLE_PASS_STORY_PROMPT, SINGLE_PASS_NEWS_PROMPT]
+    payload = json.dumps(
+        {"model": [SCRIPT_MODEL_ID, NEWS_MODEL_ID], "prompts": prompts, **inputs},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cache_get(key: str):
+    """Return the cached value for key, or None if missing or expired."""
+    path = os.path.join(SCRIPT_CACHE_DIR, f"{key}.json")
+    try:
+        if time.time() - os.path.getmtime(path) > SCRIPT_CACHE_TTL:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_set(key: str, value) -> None:
+    """Store value under key (written to a temp file, then renamed into place)."""
+    try:
+        os.makedirs(SCRIPT_CACHE_DIR, exist_ok=True)
+        path = os.path.join(SCRIPT_CACHE_DIR, f"{key}.json")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+# Opt-in: serve a cached script for a near-identical idea (same mode and
+# duration, cosine similarity of idea + theme embeddings >= the threshold)
+SEMANTIC_CACHE = os.getenv("SCRIPT_SEMANTIC_CACHE", "").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SCRIPT_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+
+
+def _semantic_index_path() -> str:
+    return os.path.join(SCRIPT_CACHE_DIR, "semantic_index.jsonl")
+
+
+def _idea_embedding(idea, theme: str) -> Optional[np.ndarray]:
+    """Embed an idea (title | description) and theme; None if Bedrock can't be reached."""
+    if isinstance(idea, dict):
+        idea_text = " | ".join(str(idea.get(field, "")) for field in ("title", "description"))
+    else:
+        idea_text = str(idea)
+    try:
+        return np.asarray(embed_text(f"{idea_text} | {theme}"), dtype=np.float32)
+    except Exception:
+        return None
+
+
+# (index file (mtime, size), its entries, their embeddings stacked row-wise)
+_semantic_index = None
+
+
+def _load_semantic_index() -> Tuple[List[Dict], np.ndarray]:
+    """Semantic index entries and embedding matrix, re-read only when the index file changes."""
+    global _semantic_index
+    path = _semantic_index_path()
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    if _semantic_index is None or _semantic_index[0] != stamp:
+        with open(path, "r", encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        matrix = np.asarray([entry.pop("embedding") for entry in entries], dtype=np.float32)
+        _semantic_index = (stamp, entries, matrix)
+
+    return _semantic_index[1], _semantic_index[2]
+
+
+def _semantic_cache_get(embedding: np.ndarray, target_duration: int, mode: str) -> Optional[Dict]:
+    """
+    Find the most similar cached idea with the same mode and duration.
+
+    Returns:
+        The cached script if its similarity reaches SEMANTIC_CACHE_THRESHOLD
+    """
+    prompt_key = _cache_key()
+    try:
+        entries, matrix = _load_semantic_index()
+        rows = [
+            i for i, entry in enumerate(entries)
+            if (entry["prompt_key"], entry["target_duration"], entry["mode"]) == (prompt_key, target_duration, mode)
+        ]
+        keys = [entries[i]["key"] for i in rows]
+    except (OSError, ValueError, KeyError):
+        return None
+
+    if not rows:
+        return None
+
+    # Embeddings are unit length, so the dot product is the cosine similarity
+    similarities = matrix[rows] @ embedding
+    for idx in np.argsort(similarities)[::-1]:
+        if similarities[idx] < SEMANTIC_CACHE_THRESHOLD:
+            break
+        cached = _cache_get(keys[idx])
+        if cached is not None:
+            return cached
+    return None
+
+
+def _semantic_cache_add(key: str, embedding: np.ndarray, target_duration: int, mode: str) -> None:
+    """Record a cached script's idea embedding in the semantic index."""
+    entry = {
+        "key": key,
+        "prompt_key": _cache_key(),
+        "target_duration": target_duration,
+        "mode": mode,
+        "embedding": [round(float(x), 6) for x in embedding]
+    }
+    try:
+        os.makedirs(SCRIPT_CACHE_DIR, exist_ok=True)
+        with open(_semantic_index_path(), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError:
+        pass
+
+
+def _system_message(prompt: str, format_instructions: str = "") -> SystemMessage:
+    """
+    Build a system message from a static prompt.
+
+    The prompts carry no per-request values (idea, theme and duration go in
+    the human message), so the same prefix is sent on every call and retry
+    and can be served from Bedrock's prompt cache when PROMPT_CACHING is on.
+    """
+    text = prompt.replace("{format_instructions}", format_instructions)
+    if not PROMPT_CACHING:
+        return SystemMessage(content=text)
+    return SystemMessage(content=[{"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}])
+
+
+# Scene durations within this fraction of the target are rescaled in Python
+# instead of asking the LLM again
+DURATION_TOLERANCE = 0.3
+
+
+def _sanitize_durations(scenes: Optional[List[Dict]], target_duration: float) -> None:
+    """
+    Rescale the scenes' duration_seconds in place so they sum to the target.
+
+    Only applied when the model's total is within DURATION_TOLERANCE of the
+    target; anything further off (or malformed) is left for validation to
+    reject, which triggers a retry.
+    """
+    if not scenes or not target_duration:
+        return
+    try:
+        durations = [float(scene["duration_seconds"]) for scene in scenes]
+    except (KeyError, TypeError, ValueError):
+        return
+
+    total = sum(durations)
+    if total <= 0 or abs(total - target_duration) / target_duration >= DURATION_TOLERANCE:
+        return
+
+    factor = target_duration / total
+    scaled = [round(duration * factor, 2) for duration in durations]
+    # Put the rounding remainder on the last scene so the sum is exact
+    scaled[-1] = round(target_duration - sum(scaled[:-1]), 2)
+    for scene, duration in zip(scenes, scaled):
+        scene["duration_seconds"] = duration
+
+
+@lru_cache(maxsize=8)
+def _get_llm(temperature: float, model_id: str = SCRIPT_MODEL_ID) -> ChatBedrock:
+    """Shared ChatBedrock per temperature and model, on top of the shared bedrock-runtime client."""
+    return ChatBedrock(
+        model_id=model_id,
+        model_kwargs={"temperature": temperature, "max_tokens": SCRIPT_MAX_TOKENS},
+        # Stream the response: tokens arrive as they are generated and a long
+        # script never sits idle past the client read timeout
+        streaming=True,
+        client=get_bedrock_client()
     )
 
-    parser = JsonOutputParser(pydantic_object=Script)
 
+@lru_cache(maxsize=None)
+def _get_parser(model: type) -> Tuple[JsonOutputParser, str]:
+    """JSON parser and its format instructions, built once per output model."""
+    parser = JsonOutputParser(pydantic_object=model)
+    return parser, parser.get_format_instructions()
+
+
+@lru_cache(maxsize=None)
+def _get_prompt(mode: str) -> ChatPromptTemplate:
+    """
+    Script prompt per mode, built once.
+
+    Story mode is single-pass (Visual Bible + scenes in one call); news mode
+    writes the factual summary and the scenes derived from it in one call.
+    """
     if mode == "story":
-        # Single-pass generation for story mode: Visual Bible + scenes in one call
-        story_prompt = ChatPromptTemplate.from_messages([
-            ("system", SINGLE_PASS_STORY_PROMPT),
-            ("human", "Create a cinematic story based on this idea: {idea}")
-        ]).partial(format_instructions=parser.get_format_instructions())
-
-        story_chain = story_prompt | llm | parser
-
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                script_data = story_chain.invoke({
-                    "idea": idea,
-                    "theme": theme,
-                    "target_duration": target_duration
-                })
-                script_data["mode"] = mode
-
-                # Validate using Pydantic
-                validated_script = Script(**script_data)
-                script_dict = validated_script.model_dump()
-
-                return script_dict
-
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    raise Exception(f"Failed to generate a valid script ({mode}): {str(e)}")
-                continue
+        _, format_instructions = _get_parser(Script)
+        system_prompt = SINGLE_PASS_STORY_PROMPT
+        human_prompt = "Create a cinematic story based on this idea: {idea}\n\nTheme/Style: {theme}\nTarget Duration: {target_duration} seconds"
     else:
-        # Two-step generation for news mode (no Visual Bible needed)
-        # Step 1: Summary Generation
-        news_story_prompt = ChatPromptTemplate.from_messages([
-            ("system", NEWS_STORY_SYSTEM_PROMPT),
-            ("human", "Idea: {idea}")
-        ])
-
-        news_story_chain = news_story_prompt | llm | StrOutputParser()
-
-        # Step 2: Split into Scenes
-        news_script_prompt = ChatPromptTemplate.from_messages([
-            ("system", NEWS_SCENE_SYSTEM_PROMPT),
-            ("human", "Content: {story}")
-        ]).partial(format_instructions=parser.get_format_instructions())
-
-        news_script_chain = news_script_prompt | llm | parser
-
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                story = news_story_chain.invoke({"idea": idea, "theme": theme, "target_duration": target_duration})
-                script_data = news_script_chain.invoke({"story": story, "target_duration": target_duration})
-                script_data["mode"] = mode
-
-                # Validate using Pydantic
-                validated_script = Script(**script_data)
-                script_dict = validated_script.model_dump()
-
-                # Additional fact validation for news mode
-                validate_facts(script_dict)
+        _, format_instructions = _get_parser(NewsScript)
+        system_prompt = SINGLE_PASS_NEWS_PROMPT
+        human_prompt = "Idea: {idea}\n\nSubject: {theme}\nTarget Duration: {target_duration} seconds"
+
+    return ChatPromptTemplate.from_messages([
+        _system_message(system_prompt, format_instructions),
+        ("human", human_prompt),
+        MessagesPlaceholder("corrections", optional=True)
+    ])
+
+
+MAX_SCRIPT_ATTEMPTS = 3
+
+# Caps a runaway generation; a full 7-scene script is well under this
+SCRIPT_MAX_TOKENS = 4096
+
+# Bedrock errors worth another attempt (after boto3's own retries gave up);
+# anything else (access denied, bad model ID, ...) fails immediately
+RETRYABLE_BEDROCK_ERRORS = {
+    "ThrottlingException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "ModelTimeoutException",
+    "InternalServerException"
+}
+
+
+def _bedrock_error_code(error: BaseException) -> Optional[str]:
+    """AWS error code of a ClientError, also when LangChain wrapped it in another exception."""
+    while error is not None:
+        if isinstance(error, ClientError):
+            return error.response.get("Error", {}).get("Code")
+        error = error.__cause__ or error.__context__
+    return None
+
 
-                return script_dict
+def _stream_script(chain, inputs: Dict, target_duration: float) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Stream a script chain, stopping as soon as the output can no longer validate.
+
+    The JSON parser yields the partially parsed object as tokens arrive, so
+    too many scenes, or a running duration total that neither rescaling
+    nor the 60s cap would accept, is caught mid-generation instead of
+    after the model has written the rest of the script.
+
+    Returns:
+        (parsed output, None) on completion, or (partial output, reason)
+        when the stream was stopped early
+    """
+    max_total = max(60.0, target_duration * (1 + DURATION_TOLERANCE))
+    data = None
 
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    raise Exception(f"Failed to generate a valid script ({mode}): {str(e)}")
+    stream = chain.stream(inputs)
+    try:
+        for data in stream:
+            scenes = data.get("scenes") if isinstance(data, dict) else None
+            if not isinstance(scenes, list):
                 continue
 
+            if len(scenes) > 7:
+                return data, f"Script must have between 5 and 7 scenes. Found at least {len(scenes)}."
+
+            total = sum(
+                scene["duration_seconds"] for scene in scenes
+                if isinstance(scene, dict) and isinstance(scene.get("duration_seconds"), (int, float))
+            )
+            if total > max_total:
+                return data, f"Total duration (at least {total}s) must be between 10 and 60 seconds."
+    finally:
+        # Closing the generator closes the Bedrock response stream
+        stream.close()
+
+    return data, None
+
+
+def _generate_validated(chain, inputs: Dict, to_script_data, mode: str, target_duration: int, on_success) -> Dict:
+    """
+    Stream a script chain until its output validates, up to MAX_SCRIPT_ATTEMPTS.
+
+    - Output that is bound to fail validation is cut off mid-stream (see
+      _stream_script) and handled like any other validation failure.
+    - Output that fails validation is sent back with the error, so the model
+      fixes those fields instead of writing a new script from scratch.
+    - Output that isn't parseable JSON is regenerated from scratch.
+    - Throttling and other transient Bedrock errors back off (with jitter)
+      before the next attempt; other Bedrock errors abort immediately.
+
+    Args:
+        chain: prompt | llm | parser, with an optional "corrections" placeholder
+        inputs: Prompt variables
+        to_script_data: Turns the parsed output into Script kwargs
+        mode: "story" or "news"
+        target_duration: Target total duration in seconds
+        on_success: Called with the validated script dict
+
+    Returns:
+        Validated script dict
+    """
+    corrections = []
+    last_error = None
+
+    for attempt in range(MAX_SCRIPT_ATTEMPTS):
+        if attempt > 0 and _bedrock_error_code(last_error) in RETRYABLE_BEDROCK_ERRORS:
+            time.sleep(min(30.0, 2.0 ** attempt) + random.uniform(0, 1))
+
+        try:
+            data, abort_reason = _stream_script(chain, dict(inputs, corrections=corrections), target_duration)
+        except Exception as e:
+            code = _bedrock_error_code(e)
+            if code is not None and code not in RETRYABLE_BEDROCK_ERRORS:
+                raise Exception(f"Failed to generate a valid script ({mode}): {str(e)}")
+            last_error = e
+            corrections = []
+            continue
+
+        try:
+            if abort_reason:
+                raise ValueError(f"{abort_reason} (generation was stopped early)")
+
+            script_data = to_script_data(data)
+            _sanitize_durations(script_data.get("scenes"), target_duration)
+
+            # Validate using Pydantic
+            script_dict = Script(**script_data).model_dump()
+
+            # Additional fact validation for news mode
+            if mode == "news":
+                validate_facts(script_dict)
+
+        except Exception as e:
+            last_error = e
+            corrections = [
+                AIMessage(content=json.dumps(data)),
+                HumanMessage(content=(
+                    f"Your previous output failed validation: {e}\n"
+                    "Return the complete corrected JSON, changing only what is needed to fix this."
+                ))
+            ]
+            continue
+
+        on_success(script_dict)
+        return script_dict
+
+    raise Exception(f"Failed to generate a valid script ({mode}): {str(last_error)}")
+
+
+def generate_script(idea: Dict, theme: str, target_duration: int = 30, mode: str = "story", use_cache: bool = True) -> Dict:
+    """
+    Generate a validated script for an idea.
+
+    With use_cache, a script already generated for the same idea, theme,
+    duration and mode (and unchanged prompts) is loaded from SCRIPT_CACHE_DIR
+    instead of calling Bedrock again; with SCRIPT_SEMANTIC_CACHE=1, so is one
+    generated for a near-identical idea.
+    """
+    script_key = _cache_key(idea=idea, theme=theme, target_duration=target_duration, mode=mode)
+    embedding = None
+    if use_cache:
+        cached = _cache_get(script_key)
+        if cached is not None:
+            return cached
+
+        if SEMANTIC_CACHE:
+            embedding = _idea_embedding(idea, theme)
+            if embedding is not None:
+                cached = _semantic_cache_get(embedding, target_duration, mode)
+                if cached is not None:
+                    return cached
+
+    llm = _get_llm(0.3, NEWS_MODEL_ID) if mode == "news" else _get_llm(0.7)
+
+    def on_success(script_dict: Dict):
+        if use_cache:
+            _cache_set(script_key, script_dict)
+            if embedding is not None:
+                _semantic_cache_add(script_key, embedding, target_duration, mode)
+
+    if mode == "story":
+        to_script_data = lambda data: dict(data, mode=mode)
+    else:
+        # News scenes come back alongside the summary they were derived from
+        to_script_data = lambda data: {"mode": mode, "scenes": data.get("scenes", [])}
+
+    chain = _get_prompt(mode) | llm | _get_parser(Script if mode == "story" else NewsScript)[0]
+
+    return _generate_validated(
+        chain,
+        {"idea": idea, "theme": theme, "target_duration": target_duration},
+        to_script_data,
+        mode,
+        target_duration,
+        on_success
+    )
+
 if __name__ == "__main__":
     # Test story mode with Visual Bible
     story_idea = "A lonely robot finds a flower in a wasteland"
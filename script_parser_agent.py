@@ -1,16 +1,39 @@
 import json
 import os
 import re
-from typing import List, Dict
+from functools import lru_cache
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
-from langchain_aws import ChatBedrock
+from langchain_aws import ChatBedrock, ChatBedrockConverse
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
 
+from bedrock_utils import CLAUDE_FAST_MODEL_ID, CLAUDE_MODEL_ID, LATENCY_OPTIMIZED, get_bedrock_client
+
 # Load environment variables from .env
 load_dotenv()
 
+@lru_cache(maxsize=None)
+def _get_fast_llm() -> ChatBedrockConverse:
+    """Shared Haiku chat model: parsing is pure reformatting, so it doesn't need Sonnet."""
+    return ChatBedrockConverse(
+        model=CLAUDE_FAST_MODEL_ID,
+        temperature=0.3,  # Low temperature for structured parsing
+        max_tokens=8192,
+        performance_config={"latency": "optimized"} if LATENCY_OPTIMIZED else None,
+        client=get_bedrock_client()
+    )
+
+@lru_cache(maxsize=None)
+def _get_llm() -> ChatBedrock:
+    """Shared Sonnet ChatBedrock, the fallback when the fast model's output doesn't parse."""
+    return ChatBedrock(
+        model_id=CLAUDE_MODEL_ID,
+        model_kwargs={"temperature": 0.3},  # Low temperature for structured parsing
+        client=get_bedrock_client()
+    )
+
 class CharacterDefinition(BaseModel):
     """Definition of a character in the script"""
     name: str = Field(description="Character name (e.g., ROBO-7, GIRL)")
@@ -34,29 +57,7 @@ class ParsedScript(BaseModel):
     scenes: List[ScriptScene] = Field(description="All scenes in sequential order")
     total_duration: float = Field(description="Total estimated duration in seconds")
 
-class ScriptParserAgent:
-    def __init__(self):
-        self.llm = ChatBedrock(
-            model_id="us.anthropic.claude-3-5-sonnet-20240620-v1:0",
-            model_kwargs={"temperature": 0.3}  # Low temperature for structured parsing
-        )
-        self.parser = JsonOutputParser(pydantic_object=ParsedScript)
-        self.base_output_dir = "output"
-
-    def parse_script(self, script_text: str, reel_name: str = None) -> Dict:
-        """
-        Parse plain text script with scene markers into structured JSON.
-
-        Args:
-            script_text: Plain text script following the defined format
-            reel_name: Optional name for saving output
-
-        Returns:
-            Dictionary containing parsed script structure
-        """
-
-        # Define the parsing prompt
-        system_prompt = """You are a professional script parser. Your task is to parse plain text scripts into structured JSON format.
+PARSE_SYSTEM_PROMPT = """You are a professional script parser. Your task is to parse plain text scripts into structured JSON format.
 
 PARSING RULES:
 1. Extract TITLE from "TITLE: ..." line
@@ -82,15 +83,63 @@ DURATION ESTIMATION:
 
 Return valid JSON matching the ParsedScript schema."""
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "Parse this script:\n\n{script_text}\n\n{format_instructions}")
-        ]).partial(format_instructions=self.parser.get_format_instructions())
+# Built once at import: the format instructions serialize the full
+# ParsedScript JSON schema
+PARSER = JsonOutputParser(pydantic_object=ParsedScript)
+PARSE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", PARSE_SYSTEM_PROMPT),
+    ("human", "Parse this script:\n\n{script_text}\n\n{format_instructions}")
+]).partial(format_instructions=PARSER.get_format_instructions())
+
+# Deterministic parsing of the documented script format
+_TITLE_PATTERN = re.compile(r"^\s*TITLE:\s*(.+?)\s*$", re.MULTILINE | re.IGNORECASE)
+_THEME_PATTERN = re.compile(r"^\s*THEME:\s*(.+?)\s*$", re.MULTILINE | re.IGNORECASE)
+_CHARACTERS_SECTION_PATTERN = re.compile(
+    r"^\s*CHARACTERS:\s*$(.*?)(?=^\s*SCENE\s+\d+|\Z)", re.MULTILINE | re.DOTALL | re.IGNORECASE
+)
+_CHARACTER_LINE_PATTERN = re.compile(r"^\s*[-*]\s*([^:\n]+?)\s*:\s*(.+?)\s*$", re.MULTILINE)
+_SCENE_PATTERN = re.compile(
+    r"^\s*SCENE\s+(\d+)[^\S\n]*(?:\(\s*Location:\s*([^)\n]*)\))?[^\n]*$(.*?)(?=^\s*SCENE\s+\d+|\Z)",
+    re.MULTILINE | re.DOTALL | re.IGNORECASE
+)
+_REQUIRED_SECTION_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in (r"TITLE:", r"THEME:", r"CHARACTERS:", r"SCENE \d+")
+]
+# "KEY: value" lines inside a scene: ACTION, CAMERA, or a speaking character
+# (a parenthetical after the speaker, e.g. "GIRL (whispering):", is dropped)
+_SCENE_LINE_PATTERN = re.compile(r"^\s*([A-Za-z0-9][\w .'-]*?)\s*(?:\([^)\n]*\))?\s*:\s*(.+?)\s*$")
+# Blank lines and "---" separators are the only other lines a scene may hold
+_SCENE_FILLER_PATTERN = re.compile(r"^\s*(?:-{3,}\s*)?$")
 
-        chain = prompt | self.llm | self.parser
+class ScriptParserAgent:
+    def __init__(self):
+        self.llm = _get_fast_llm()
+        self.parser = PARSER
+        self.base_output_dir = "output"
+
+    def parse_script(self, script_text: str, reel_name: str = None) -> Dict:
+        """
+        Parse plain text script with scene markers into structured JSON.
+
+        Args:
+            script_text: Plain text script following the defined format
+            reel_name: Optional name for saving output
+
+        Returns:
+            Dictionary containing parsed script structure
+        """
 
         try:
-            parsed = chain.invoke({"script_text": script_text})
+            # Scripts in the documented format are parsed directly; the LLM
+            # only handles text the regex parser can't make sense of
+            parsed = self.parse_script_text(script_text)
+            if parsed is None:
+                # Retry on Sonnet only if Haiku's output fails to parse (or the call fails)
+                chain = (PARSE_PROMPT | self.llm | self.parser).with_fallbacks(
+                    [PARSE_PROMPT | _get_llm() | self.parser]
+                )
+                parsed = chain.invoke({"script_text": script_text})
 
             # Validate and fix scenes (add missing fields with defaults)
             for scene in parsed.get("scenes", []):
@@ -122,7 +171,7 @@ Return valid JSON matching the ParsedScript schema."""
 
                 output_path = os.path.join(output_dir, "script_parsed.json")
                 with open(output_path, "w") as f:
-                    json.dump(parsed, f, indent=2)
+                    f.write(json.dumps(parsed, indent=2))
 
                 print(f"Parsed script saved to: {output_path}")
 
@@ -132,6 +181,80 @@ Return valid JSON matching the ParsedScript schema."""
             print(f"Error parsing script: {e}")
             raise
 
+    def parse_script_text(self, script_text: str) -> Optional[Dict]:
+        """
+        Parse a script in the documented TITLE/THEME/CHARACTERS/SCENE format without the LLM.
+
+        Follows the same rules as PARSE_SYSTEM_PROMPT: speaker lines become
+        the scene's characters and dialogue, ACTION/CAMERA lines its action
+        and camera, and durations come from estimate_scene_duration.
+
+        Args:
+            script_text: Plain text script
+
+        Returns:
+            Dictionary matching ParsedScript, or None if the text doesn't
+            follow the format (no title, theme or scenes, a scene line that
+            isn't ACTION, CAMERA or a speaker from CHARACTERS/NARRATOR, or
+            text spilling over onto a line of its own)
+        """
+        title = _TITLE_PATTERN.search(script_text)
+        theme = _THEME_PATTERN.search(script_text)
+        scene_matches = list(_SCENE_PATTERN.finditer(script_text))
+        if not title or not theme or not scene_matches:
+            return None
+
+        characters = []
+        section = _CHARACTERS_SECTION_PATTERN.search(script_text)
+        if section:
+            for name, description in _CHARACTER_LINE_PATTERN.findall(section.group(1)):
+                characters.append({"name": name, "description": description})
+        known_speakers = {character["name"].upper() for character in characters} | {"NARRATOR"}
+
+        scenes = []
+        for match in scene_matches:
+            speakers, lines = [], []
+            action, camera = "", ""
+            for line in match.group(3).splitlines():
+                line_match = _SCENE_LINE_PATTERN.match(line)
+                if not line_match:
+                    if _SCENE_FILLER_PATTERN.match(line):
+                        continue
+                    # Wrapped or free-form text; leave it to the LLM
+                    return None
+                key, value = line_match.groups()
+                field = key.upper()
+                if field == "ACTION":
+                    action = value
+                elif field == "CAMERA":
+                    camera = value
+                elif field not in known_speakers:
+                    # e.g. "SOUND: Wind howls" isn't a character line
+                    return None
+                else:
+                    if key not in speakers:
+                        speakers.append(key)
+                    lines.append(value.strip('"\u201c\u201d'))
+
+            dialogue = " ".join(lines)
+            scenes.append({
+                "scene_number": int(match.group(1)),
+                "characters": speakers,
+                "dialogue": dialogue,
+                "action": action,
+                "location": (match.group(2) or "").strip(),
+                "camera": camera,
+                "duration_seconds": self.estimate_scene_duration(dialogue, action)
+            })
+
+        return {
+            "title": title.group(1),
+            "theme": theme.group(1),
+            "characters": characters,
+            "scenes": scenes,
+            "total_duration": round(sum(scene["duration_seconds"] for scene in scenes), 1)
+        }
+
     def validate_script_format(self, script_text: str) -> bool:
         """
         Validate that script text follows the expected format.
@@ -142,16 +265,9 @@ Return valid JSON matching the ParsedScript schema."""
         Returns:
             True if format is valid, False otherwise
         """
-        required_patterns = [
-            r"TITLE:",
-            r"THEME:",
-            r"CHARACTERS:",
-            r"SCENE \d+"
-        ]
-
-        for pattern in required_patterns:
-            if not re.search(pattern, script_text, re.IGNORECASE):
-                print(f"Warning: Script missing required section: {pattern}")
+        for pattern in _REQUIRED_SECTION_PATTERNS:
+            if not pattern.search(script_text):
+                print(f"Warning: Script missing required section: {pattern.pattern}")
                 return False
 
         return True
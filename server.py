@@ -1,18 +1,94 @@
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 import os
 import json
 import logging
+import multiprocessing
+import threading
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
 from reel_orchestrator import orchestrate_reel
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="ReelForge API")
+# Mock database or file-based tracking: the status of every reel lives in
+# REELS_DB for the life of the process; a background thread writes it to
+# REELS_DB_FILE whenever it changes, so requests never touch the disk
+REELS_DB_FILE = "reels_status.json"
+REELS_DB: Dict[str, Dict] = {}
+# Each reel's entry already encoded for /status, refreshed on every change
+_status_json: Dict[str, str] = {}
+_db_lock = threading.Lock()
+_db_dirty = threading.Event()
+_db_write_lock = threading.Lock()
+
+def load_db():
+    if os.path.exists(REELS_DB_FILE):
+        with open(REELS_DB_FILE, "r") as f:
+            return json.load(f)
+    return {}
+
+def save_db():
+    with _db_lock:
+        data = json.dumps(REELS_DB, indent=4)
+    # Write to a temp file first so a crash mid-write never truncates the DB
+    tmp_path = f"{REELS_DB_FILE}.tmp"
+    with _db_write_lock:
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, REELS_DB_FILE)
+
+def update_reel(name: str, **fields):
+    """Update a reel's status entry and schedule a flush to disk."""
+    with _db_lock:
+        REELS_DB.setdefault(name, {}).update(fields)
+        _status_json[name] = json.dumps(REELS_DB[name])
+    _db_dirty.set()
+
+def _flush_db_loop():
+    while True:
+        _db_dirty.wait()
+        _db_dirty.clear()
+        try:
+            save_db()
+        except OSError as e:
+            logger.error(f"Error saving {REELS_DB_FILE}: {e}")
+
+# Reels are generated in worker processes: video assembly is CPU-bound
+# Python (MoviePy compositing), so reels run side by side in threads would
+# all share one GIL. The pool size caps how many reels run at once.
+MAX_CONCURRENT_REELS = int(os.getenv("MAX_CONCURRENT_REELS", "2"))
+
+def _new_reel_pool() -> ProcessPoolExecutor:
+    # spawn, not fork: the server process has threads running
+    return ProcessPoolExecutor(
+        max_workers=MAX_CONCURRENT_REELS,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    REELS_DB.update(load_db())
+    # A reel still "processing" on startup died with the previous server
+    for reel in REELS_DB.values():
+        if reel.get("status") == "processing":
+            reel["status"] = "failed"
+            _db_dirty.set()
+    _status_json.update((name, json.dumps(reel)) for name, reel in REELS_DB.items())
+    threading.Thread(target=_flush_db_loop, name="reels-db-flush", daemon=True).start()
+    app.state.reel_pool = _new_reel_pool()
+    yield
+    app.state.reel_pool.shutdown(wait=False, cancel_futures=True)
+    save_db()
+
+app = FastAPI(title="ReelForge API", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -23,19 +99,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mock database or file-based tracking
-REELS_DB_FILE = "reels_status.json"
-
-def load_db():
-    if os.path.exists(REELS_DB_FILE):
-        with open(REELS_DB_FILE, "r") as f:
-            return json.load(f)
-    return {}
-
-def save_db(db):
-    with open(REELS_DB_FILE, "w") as f:
-        json.dump(db, f, indent=4)
-
 class ReelRequest(BaseModel):
     idea: str
     theme: str
@@ -46,89 +109,117 @@ class ReelRequest(BaseModel):
     engine: str = "neural"
 
 @app.post("/generate")
-async def generate_reel(request: ReelRequest, background_tasks: BackgroundTasks):
-    db = load_db()
-    if request.name in db and db[request.name]["status"] == "processing":
-        raise HTTPException(status_code=400, detail="Reel with this name is already being processed")
+async def generate_reel(request: ReelRequest):
+    with _db_lock:
+        if request.name in REELS_DB and REELS_DB[request.name]["status"] == "processing":
+            raise HTTPException(status_code=400, detail="Reel with this name is already being processed")
     
-    db[request.name] = {
-        "idea": request.idea,
-        "theme": request.theme,
-        "duration": request.duration,
-        "mode": request.mode,
-        "voice": request.voice,
-        "engine": request.engine,
-        "status": "processing",
-        "video_path": None
-    }
-    save_db(db)
+        REELS_DB[request.name] = {
+            "idea": request.idea,
+            "theme": request.theme,
+            "duration": request.duration,
+            "mode": request.mode,
+            "voice": request.voice,
+            "engine": request.engine,
+            "status": "processing",
+            "video_path": None
+        }
+        _status_json[request.name] = json.dumps(REELS_DB[request.name])
+    _db_dirty.set()
     
-    background_tasks.add_task(
-        run_orchestration, 
-        request.idea, 
-        request.theme, 
-        request.name, 
-        request.duration,
-        request.mode,
-        request.voice,
-        request.engine
-    )
+    args = (request.idea, request.theme, request.name, request.duration, request.mode, request.voice, request.engine)
+    try:
+        future = app.state.reel_pool.submit(orchestrate_reel, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool
+        app.state.reel_pool = _new_reel_pool()
+        future = app.state.reel_pool.submit(orchestrate_reel, *args)
+    future.add_done_callback(lambda future: finish_orchestration(request.name, future))
     return {"message": "Generation started", "reel_name": request.name}
 
-def run_orchestration(idea: str, theme: str, name: str, duration: int, mode: str, voice: str, engine: str):
+def finish_orchestration(name: str, future: Future):
+    """Record the outcome of a reel's orchestrate_reel run in the status DB."""
     try:
-        video_path = orchestrate_reel(
-            idea, 
-            theme, 
-            name, 
-            duration=duration,
-            mode=mode,
-            voice=voice,
-            engine=engine
-        )
-        db = load_db()
+        video_path = future.result()
         if video_path:
             # We want the path relative to the static route
             # orchestrate_reel returns something like "output/reel_name/reel_name.mp4"
             # We serve the whole 'output' folder at /videos/
             # So the URL will be /videos/reel_name/reel_name.mp4
-            db[name]["status"] = "completed"
-            db[name]["video_path"] = f"/videos/{name}/{name}.mp4"
+            update_reel(name, status="completed", video_path=f"/videos/{name}/{name}.mp4")
         else:
-            db[name]["status"] = "failed"
-        save_db(db)
+            update_reel(name, status="failed")
+    except CancelledError:
+        # Still queued when the server shut down the pool
+        logger.warning(f"Reel {name} was cancelled before it started")
+        update_reel(name, status="failed")
     except Exception as e:
         logger.error(f"Error generating reel {name}: {e}")
-        db = load_db()
-        db[name]["status"] = "failed"
-        save_db(db)
+        update_reel(name, status="failed")
+
+# (output dir mtime, reels with a video, reel dirs still without one)
+_reels_scan_cache = None
+
+def _scan_output_reels(output_dir: str) -> List[str]:
+    """
+    Names of the reel folders in output_dir that contain their video.
+
+    The folder listing is only re-read when output_dir's mtime changes
+    (a reel folder was added or removed). A video written into an
+    existing folder doesn't touch that mtime, so folders without one yet
+    are re-checked on every call.
+    """
+    global _reels_scan_cache
+    try:
+        mtime = os.stat(output_dir).st_mtime_ns
+    except FileNotFoundError:
+        return []
+
+    if _reels_scan_cache is None or _reels_scan_cache[0] != mtime:
+        with os.scandir(output_dir) as entries:
+            pending = [entry.name for entry in entries if entry.is_dir()]
+        _reels_scan_cache = (mtime, [], pending)
+
+    mtime, complete, pending = _reels_scan_cache
+    finished = [name for name in pending if os.path.exists(os.path.join(output_dir, name, f"{name}.mp4"))]
+    if finished:
+        complete = complete + finished
+        pending = [name for name in pending if name not in finished]
+        _reels_scan_cache = (mtime, complete, pending)
+
+    return complete
 
 @app.get("/reels")
 async def list_reels():
-    db = load_db()
+    with _db_lock:
+        db = {name: dict(reel) for name, reel in REELS_DB.items()}
     # Also scan the output folder to sync if needed
-    output_dir = "output"
-    if os.path.exists(output_dir):
-        for name in os.listdir(output_dir):
-            reel_path = os.path.join(output_dir, name)
-            if os.path.isdir(reel_path):
-                video_file = os.path.join(reel_path, f"{name}.mp4")
-                if os.path.exists(video_file) and name not in db:
-                    db[name] = {
-                        "idea": "Imported",
-                        "theme": "Imported",
-                        "status": "completed",
-                        "video_path": f"/videos/{name}/{name}.mp4"
-                    }
+    for name in _scan_output_reels("output"):
+        if name not in db:
+            db[name] = {
+                "idea": "Imported",
+                "theme": "Imported",
+                "status": "completed",
+                "video_path": f"/videos/{name}/{name}.mp4"
+            }
     
-    return [{"name": k, **v} for k, v in db.items()]
+    # Stream the JSON array one reel at a time instead of serializing the
+    # whole library in one blob
+    def rows():
+        yield "["
+        for i, (k, v) in enumerate(db.items()):
+            yield ("," if i else "") + json.dumps({"name": k, **v})
+        yield "]"
+
+    return StreamingResponse(rows(), media_type="application/json")
 
 @app.get("/status/{name}")
 async def get_status(name: str):
-    db = load_db()
-    if name not in db:
+    # Polled while a reel is processing: serve the pre-encoded entry
+    content = _status_json.get(name)
+    if content is None:
         raise HTTPException(status_code=404, detail="Reel not found")
-    return db[name]
+    return Response(content=content, media_type="application/json")
 
 @app.get("/config")
 async def get_config():
@@ -1,63 +1,65 @@
+import asyncio
+import hashlib
 import json
 import os
-from typing import Dict, List
+import re
+import time
+import uuid
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from dotenv import load_dotenv
-from langchain_aws import ChatBedrock
+from langchain_aws import ChatBedrock, ChatBedrockConverse
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
-load_dotenv()
+from bedrock_utils import (
+    CLAUDE_FAST_MODEL_ID,
+    CLAUDE_MODEL_ID,
+    LATENCY_OPTIMIZED,
+    embed_text,
+    get_aws_client,
+    get_bedrock_client
+)
 
-class StoryToScriptAgent:
-    """
-    Converts natural language story descriptions into formatted scripts.
+load_dotenv()
 
-    Takes simple inputs like:
-    - Story idea/plot
-    - Character descriptions
-    - Theme preference
+# Bedrock model ID, cross-region inference profile ID (us.anthropic...) or
+# inference profile ARN for scriptwriting; the fast model is the fallback
+# story_to_reel switches to when the main model fails (e.g. throttled).
+# With BEDROCK_LATENCY_OPTIMIZED, scripts default to Claude 3.5 Haiku (Sonnet
+# 3.5 isn't offered on latency-optimized inference).
+STORY_MODEL_ID = os.getenv("STORY_SCRIPT_MODEL_ID", CLAUDE_FAST_MODEL_ID if LATENCY_OPTIMIZED else CLAUDE_MODEL_ID)
+STORY_FAST_MODEL_ID = os.getenv("STORY_SCRIPT_FAST_MODEL_ID", CLAUDE_FAST_MODEL_ID)
 
-    Generates properly formatted scripts for the animated reel pipeline.
+@lru_cache(maxsize=None)
+def _get_llm(model_id: str = None):
     """
+    Shared scriptwriting chat model per model ID, on top of the shared
+    bedrock-runtime client.
 
-    def __init__(self):
-        self.llm = ChatBedrock(
-            model_id="us.anthropic.claude-3-5-sonnet-20240620-v1:0",
-            model_kwargs={"temperature": 0.7}  # Creative but controlled
+    model_id defaults to STORY_SCRIPT_MODEL_ID. With BEDROCK_LATENCY_OPTIMIZED,
+    Claude 3.5 Haiku runs on latency-optimized inference.
+    """
+    model_id = model_id or STORY_MODEL_ID
+    if LATENCY_OPTIMIZED and model_id == CLAUDE_FAST_MODEL_ID:
+        return ChatBedrockConverse(
+            model=CLAUDE_FAST_MODEL_ID,
+            temperature=0.7,  # Creative but controlled
+            max_tokens=4096,
+            performance_config={"latency": "optimized"},
+            client=get_bedrock_client()
         )
-        self.parser = StrOutputParser()
-        self.base_output_dir = "output"
 
-    def generate_script(
-        self,
-        story: str,
-        characters: Dict[str, str] = None,
-        theme: str = "Cinematic",
-        duration: str = "30 seconds",
-        title: str = None
-    ) -> str:
-        """
-        Generate a formatted script from natural language input.
-
-        Args:
-            story: Natural language story description
-            characters: Dict of character_name: description (optional, will be inferred)
-            theme: Visual theme (Cinematic, Cartoon, Cyberpunk, Sketch, Corporate)
-            duration: Target duration ("15 seconds", "30 seconds", "1 minute")
-            title: Optional title (will be generated if not provided)
-
-        Returns:
-            Formatted script text ready for ScriptParserAgent
-        """
-
-        # Build character section if provided
-        character_section = ""
-        if characters:
-            character_section = "Use these characters:\n"
-            for name, desc in characters.items():
-                character_section += f"- {name}: {desc}\n"
+    return ChatBedrock(
+        model_id=model_id,
+        # An ARN doesn't name the provider, so ChatBedrock can't infer it
+        provider="anthropic" if model_id.startswith("arn:") else None,
+        model_kwargs={"temperature": 0.7},  # Creative but controlled
+        client=get_bedrock_client()
+    )
 
-        system_prompt = """You are a professional scriptwriter for animated storytelling video reels.
+SYSTEM_PROMPT = """You are a professional scriptwriter for animated storytelling video reels.
 
 Your task is to convert story ideas into properly formatted scripts with rich narration and detailed visuals.
 
@@ -120,7 +122,7 @@ THEME GUIDELINES:
 - Sketch: Hand-drawn aesthetic, artistic line work
 - Corporate: Clean, professional, modern minimalist"""
 
-        user_prompt = """Story: {story}
+USER_PROMPT = """Story: {story}
 
 {character_section}
 
@@ -131,31 +133,382 @@ Target Duration: {duration}
 Generate a complete formatted script following the exact format shown in the system prompt.
 Make it engaging, visual, and perfect for animated video generation."""
 
-        # Build title instruction
-        title_instruction = f"Title: {title}" if title else "Generate an appropriate title"
+SCRIPT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT),
+    ("human", USER_PROMPT)
+])
+
+_TITLE_PATTERN = re.compile(r'TITLE:\s*(.+)')
+_UNSAFE_FILENAME_CHARS = re.compile(r'[^\w\s-]')
+
+# Bedrock batch inference for bulk script generation (about half the
+# on-demand price). Needs a service role Bedrock can assume to read and
+# write the bucket; without one, batches run as on-demand calls.
+BATCH_ROLE_ARN = os.getenv("BEDROCK_BATCH_ROLE_ARN")
+BATCH_MODEL_ID = os.getenv("BEDROCK_BATCH_MODEL_ID", "anthropic.claude-3-5-sonnet-20240620-v1:0")
+BATCH_S3_BUCKET = os.getenv("S3_BUCKET_NAME", "reelforge-video-output")
+BATCH_S3_PREFIX = os.getenv("BEDROCK_BATCH_PREFIX", "script-batches/")
+# Bedrock rejects batch jobs below its per-job minimum record count
+BATCH_MIN_RECORDS = int(os.getenv("BEDROCK_BATCH_MIN_RECORDS", "100"))
+BATCH_DONE_STATUSES = {"Completed", "PartiallyCompleted", "Failed", "Stopped", "Expired"}
+
+# Opt-in: serve a cached script for a paraphrase of an earlier story (same
+# model, prompts, theme, duration and title, no explicit characters, and
+# cosine similarity of story + theme embeddings >= the threshold)
+SEMANTIC_CACHE = os.getenv("STORY_SEMANTIC_CACHE", "").lower() in ("1", "true", "yes")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("STORY_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL = 24 * 3600  # seconds
+SEMANTIC_CACHE_PATH = os.path.join(
+    os.getenv("SCRIPT_CACHE_DIR", os.path.join(".cache", "script")),
+    "story_semantic_index.jsonl"
+)
+
+# Editing a prompt invalidates the scripts cached with the old one
+_PROMPT_HASH = hashlib.sha256((SYSTEM_PROMPT + USER_PROMPT).encode("utf-8")).hexdigest()
+
+# (index file (mtime, size), its entries, their embeddings stacked row-wise)
+_semantic_index = None
+
+
+def _story_embedding(story: str, theme: str) -> Optional[np.ndarray]:
+    """Embed a story and theme; None if Bedrock can't be reached."""
+    try:
+        return np.asarray(embed_text(f"{story} | {theme}"), dtype=np.float32)
+    except Exception:
+        return None
+
+
+def _load_semantic_index() -> Tuple[List[Dict], np.ndarray]:
+    """Semantic index entries and embedding matrix, re-read only when the index file changes."""
+    global _semantic_index
+    stat = os.stat(SEMANTIC_CACHE_PATH)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    if _semantic_index is None or _semantic_index[0] != stamp:
+        with open(SEMANTIC_CACHE_PATH, "r", encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        matrix = np.asarray([entry.pop("embedding") for entry in entries], dtype=np.float32)
+        _semantic_index = (stamp, entries, matrix)
+
+    return _semantic_index[1], _semantic_index[2]
+
+
+def _semantic_cache_get(embedding: np.ndarray, scope: Dict) -> Optional[str]:
+    """
+    Find the most similar unexpired cached story with the same scope.
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", user_prompt)
-        ])
+    Returns:
+        The cached script if its similarity reaches SEMANTIC_CACHE_THRESHOLD
+    """
+    oldest = time.time() - SEMANTIC_CACHE_TTL
+    try:
+        entries, matrix = _load_semantic_index()
+        rows = [
+            i for i, entry in enumerate(entries)
+            if entry["scope"] == scope and entry["created"] >= oldest
+        ]
+    except (OSError, ValueError, KeyError):
+        return None
+
+    if not rows:
+        return None
+
+    # Embeddings are unit length, so the dot product is the cosine similarity
+    similarities = matrix[rows] @ embedding
+    best = int(np.argmax(similarities))
+    if similarities[best] < SEMANTIC_CACHE_THRESHOLD:
+        return None
+    return entries[rows[best]]["script"]
+
+
+def _semantic_cache_add(embedding: np.ndarray, scope: Dict, script: str) -> None:
+    """Append a generated script and its story embedding to the semantic index."""
+    entry = {
+        "scope": scope,
+        "created": time.time(),
+        "script": script,
+        "embedding": [round(float(x), 6) for x in embedding]
+    }
+    try:
+        os.makedirs(os.path.dirname(SEMANTIC_CACHE_PATH), exist_ok=True)
+        with open(SEMANTIC_CACHE_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError:
+        pass
 
-        chain = prompt | self.llm | self.parser
+class StoryToScriptAgent:
+    """
+    Converts natural language story descriptions into formatted scripts.
 
-        try:
-            script = chain.invoke({
-                "story": story,
-                "character_section": character_section,
+    Takes simple inputs like:
+    - Story idea/plot
+    - Character descriptions
+    - Theme preference
+
+    Generates properly formatted scripts for the animated reel pipeline.
+
+    model_id takes a Bedrock model ID, inference profile ID or inference
+    profile ARN (defaults to STORY_SCRIPT_MODEL_ID); story_to_reel falls
+    back to fast_model_id if it fails.
+    """
+
+    def __init__(self, model_id: str = None, fast_model_id: str = STORY_FAST_MODEL_ID):
+        self.model_id = model_id or STORY_MODEL_ID
+        self.llm = _get_llm(self.model_id)
+        self.parser = StrOutputParser()
+        self.chain = SCRIPT_PROMPT | self.llm | self.parser
+        # No fallback when the main model already is the fast one
+        self.fast_model_id = None
+        self.fast_chain = None
+        self.fallback_chain = self.chain
+        if fast_model_id and fast_model_id != self.model_id:
+            self.fast_model_id = fast_model_id
+            self.fast_chain = SCRIPT_PROMPT | _get_llm(fast_model_id) | self.parser
+            self.fallback_chain = self.chain.with_fallbacks([self.fast_chain])
+        self.base_output_dir = "output"
+
+    def generate_script(
+        self,
+        story: str,
+        characters: Dict[str, str] = None,
+        theme: str = "Cinematic",
+        duration: str = "30 seconds",
+        title: str = None,
+        fallback: bool = False
+    ) -> str:
+        """
+        Generate a formatted script from natural language input.
+
+        Args:
+            story: Natural language story description
+            characters: Dict of character_name: description (optional, will be inferred)
+            theme: Visual theme (Cinematic, Cartoon, Cyberpunk, Sketch, Corporate)
+            duration: Target duration ("15 seconds", "30 seconds", "1 minute")
+            title: Optional title (will be generated if not provided)
+            fallback: Retry on the fast model if the main model fails
+
+        Returns:
+            Formatted script text ready for ScriptParserAgent
+        """
+        # Explicit characters must appear exactly as given, so those
+        # requests always get a fresh script
+        embedding = None
+        if SEMANTIC_CACHE and not characters:
+            scope = {
+                "model": self.model_id,
+                "prompts": _PROMPT_HASH,
                 "theme": theme,
                 "duration": duration,
-                "title_instruction": title_instruction
-            })
+                "title": title
+            }
+            embedding = _story_embedding(story, theme)
+            if embedding is not None:
+                cached = _semantic_cache_get(embedding, scope)
+                if cached is not None:
+                    print("Using cached script for a similar story")
+                    return cached
+
+        inputs = self._chain_inputs(story, characters, theme, duration, title)
+        try:
+            try:
+                script = self.chain.invoke(inputs)
+            except Exception:
+                if not (fallback and self.fast_chain):
+                    raise
+                # Cached under the model that actually wrote the script
+                script = self.fast_chain.invoke(inputs)
+                if embedding is not None:
+                    scope = dict(scope, model=self.fast_model_id)
+
+        except Exception as e:
+            print(f"Error generating script: {e}")
+            raise
+
+        if embedding is not None:
+            _semantic_cache_add(embedding, scope, script)
+        return script
+
+    async def agenerate_script(
+        self,
+        story: str,
+        characters: Dict[str, str] = None,
+        theme: str = "Cinematic",
+        duration: str = "30 seconds",
+        title: str = None
+    ) -> str:
+        """
+        Async generate_script, for callers running on an event loop.
+
+        The Bedrock call is awaited, so other scripts (or requests) make
+        progress while this one is generating.
 
-            return script
+        Returns:
+            Formatted script text ready for ScriptParserAgent
+        """
+        try:
+            return await self.chain.ainvoke(self._chain_inputs(story, characters, theme, duration, title))
 
         except Exception as e:
             print(f"Error generating script: {e}")
             raise
 
+    def generate_scripts(
+        self,
+        stories: List[Dict],
+        max_concurrency: int = 4,
+        return_exceptions: bool = False,
+        fallback: bool = False
+    ) -> List[str]:
+        """
+        Generate several scripts concurrently.
+
+        Each Bedrock call is an independent round trip, so a batch takes
+        about as long as its slowest script instead of the sum of all.
+
+        Args:
+            stories: generate_script keyword arguments, one dict per script
+            max_concurrency: Maximum Bedrock calls in flight
+            return_exceptions: Put a failed script's exception in its place
+                instead of raising it (the other scripts are kept)
+            fallback: Retry on the fast model if the main model fails
+
+        Returns:
+            Formatted scripts, in the order of stories
+        """
+        inputs = [
+            self._chain_inputs(
+                story["story"],
+                story.get("characters"),
+                story.get("theme", "Cinematic"),
+                story.get("duration", "30 seconds"),
+                story.get("title")
+            )
+            for story in stories
+        ]
+        chain = self.fallback_chain if fallback else self.chain
+        return chain.batch(inputs, config={"max_concurrency": max_concurrency}, return_exceptions=return_exceptions)
+
+    def generate_scripts_batch(
+        self,
+        stories: List[Dict],
+        poll_interval: float = 60,
+        timeout: float = 24 * 3600
+    ) -> List[str]:
+        """
+        Generate many scripts with a Bedrock batch inference job.
+
+        Small batches (below BATCH_MIN_RECORDS) or a missing
+        BEDROCK_BATCH_ROLE_ARN fall back to generate_scripts. Records the
+        job fails on are regenerated on demand.
+
+        Args:
+            stories: generate_script keyword arguments, one dict per script
+            poll_interval: Seconds between job status checks
+            timeout: Seconds to wait for the job before giving up
+
+        Returns:
+            Formatted scripts, in the order of stories
+        """
+        if not BATCH_ROLE_ARN or len(stories) < BATCH_MIN_RECORDS:
+            return self.generate_scripts(stories)
+
+        region = os.getenv("AWS_REGION", "us-east-1")
+        s3 = get_aws_client("s3", region)
+        bedrock = get_aws_client("bedrock", region)
+
+        job_name = f"reelforge-scripts-{uuid.uuid4().hex[:12]}"
+        job_prefix = f"{BATCH_S3_PREFIX}{job_name}/"
+
+        # One Messages API request per story, keyed by its index
+        records = []
+        for i, story in enumerate(stories):
+            inputs = self._chain_inputs(
+                story["story"],
+                story.get("characters"),
+                story.get("theme", "Cinematic"),
+                story.get("duration", "30 seconds"),
+                story.get("title")
+            )
+            records.append(json.dumps({
+                "recordId": f"{i:08d}",
+                "modelInput": {
+                    "anthropic_version": "bedrock-2023-05-31",
+                    "max_tokens": 4096,
+                    "temperature": 0.7,
+                    "system": SYSTEM_PROMPT,
+                    "messages": [{"role": "user", "content": USER_PROMPT.format(**inputs)}]
+                }
+            }))
+        s3.put_object(Bucket=BATCH_S3_BUCKET, Key=f"{job_prefix}input.jsonl", Body="\n".join(records).encode("utf-8"))
+
+        job_arn = bedrock.create_model_invocation_job(
+            jobName=job_name,
+            roleArn=BATCH_ROLE_ARN,
+            modelId=BATCH_MODEL_ID,
+            inputDataConfig={"s3InputDataConfig": {"s3Uri": f"s3://{BATCH_S3_BUCKET}/{job_prefix}input.jsonl"}},
+            outputDataConfig={"s3OutputDataConfig": {"s3Uri": f"s3://{BATCH_S3_BUCKET}/{job_prefix}output/"}}
+        )["jobArn"]
+        print(f"Submitted batch job {job_name} for {len(stories)} scripts")
+
+        deadline = time.monotonic() + timeout
+        while True:
+            status = bedrock.get_model_invocation_job(jobIdentifier=job_arn)["status"]
+            if status in BATCH_DONE_STATUSES:
+                break
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Batch job {job_name} still {status} after {timeout}s")
+            time.sleep(poll_interval)
+        print(f"Batch job {job_name}: {status}")
+
+        scripts = [None] * len(stories)
+        if status in ("Completed", "PartiallyCompleted"):
+            # Output lands under output/<job id>/<input file name>.out
+            output_key = f"{job_prefix}output/{job_arn.rsplit('/', 1)[-1]}/input.jsonl.out"
+            body = s3.get_object(Bucket=BATCH_S3_BUCKET, Key=output_key)["Body"].read()
+            for line in body.decode("utf-8").splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                content = (record.get("modelOutput") or {}).get("content") or []
+                text = "".join(block.get("text", "") for block in content if block.get("type") == "text")
+                if text:
+                    scripts[int(record["recordId"])] = text
+
+        missing = [i for i, script in enumerate(scripts) if script is None]
+        if missing:
+            print(f"Regenerating {len(missing)} scripts the batch job didn't return")
+            for i, script in zip(missing, self.generate_scripts([stories[i] for i in missing])):
+                scripts[i] = script
+
+        return scripts
+
+    def _chain_inputs(
+        self,
+        story: str,
+        characters: Dict[str, str] = None,
+        theme: str = "Cinematic",
+        duration: str = "30 seconds",
+        title: str = None
+    ) -> Dict[str, str]:
+        """Prompt variables for one script."""
+        # Build character section if provided
+        character_section = ""
+        if characters:
+            character_section = "Use these characters:\n"
+            for name, desc in characters.items():
+                character_section += f"- {name}: {desc}\n"
+
+        # Build title instruction
+        title_instruction = f"Title: {title}" if title else "Generate an appropriate title"
+
+        return {
+            "story": story,
+            "character_section": character_section,
+            "theme": theme,
+            "duration": duration,
+            "title_instruction": title_instruction
+        }
+
     def save_script(self, script: str, filename: str) -> str:
         """
         Save generated script to a file.
@@ -179,6 +532,16 @@ Make it engaging, visual, and perfect for animated video generation."""
         print(f"Script saved to: {filepath}")
         return filepath
 
+    async def asave_script(self, script: str, filename: str) -> str:
+        """
+        Async save_script: the file is written on a worker thread so the
+        event loop isn't blocked on disk I/O.
+
+        Returns:
+            Path to saved script file
+        """
+        return await asyncio.to_thread(self.save_script, script, filename)
+
     def story_to_reel(
         self,
         story: str,
@@ -201,7 +564,7 @@ Make it engaging, visual, and perfect for animated video generation."""
             Path to saved script file
         """
         print("Generating script from story...")
-        script = self.generate_script(story, characters, theme, duration)
+        script = self.generate_script(story, characters, theme, duration, fallback=True)
 
         print("\n" + "="*60)
         print("GENERATED SCRIPT:")
@@ -212,11 +575,10 @@ Make it engaging, visual, and perfect for animated video generation."""
         # Generate filename if not provided
         if not output_name:
             # Create safe filename from title in script
-            import re
-            title_match = re.search(r'TITLE:\s*(.+)', script)
+            title_match = _TITLE_PATTERN.search(script)
             if title_match:
                 title = title_match.group(1).strip()
-                output_name = re.sub(r'[^\w\s-]', '', title).strip().replace(' ', '_').lower()
+                output_name = _UNSAFE_FILENAME_CHARS.sub('', title).strip().replace(' ', '_').lower()
             else:
                 output_name = "generated_script"
 
@@ -256,25 +618,13 @@ def generate_reel_from_story(
 
 if __name__ == "__main__":
     # Example 1: Simple story with auto-generated characters
-    print("=== Example 1: Simple Story ===\n")
-
     simple_story = """
     A lonely robot wakes up in a desert wasteland. It discovers a small flower
     growing in the sand and realizes it's not alone. A young girl appears and
     befriends the robot, showing it that there's still hope in the world.
     """
 
-    agent = StoryToScriptAgent()
-    script = agent.story_to_reel(
-        story=simple_story,
-        theme="Cinematic",
-        duration="30 seconds",
-        output_name="robot_friendship"
-    )
-
-    print("\n" + "="*60)
-    print("=== Example 2: Story with Defined Characters ===\n")
-
+    # Example 2: Story with defined characters
     adventure_story = """
     A brave knight climbs a mountain to retrieve a magical crystal.
     At the peak, they face a dragon guardian. Instead of fighting,
@@ -286,13 +636,31 @@ if __name__ == "__main__":
         "DRAGON": "A large purple dragon with kind eyes and golden scales"
     }
 
-    script2 = agent.story_to_reel(
-        story=adventure_story,
-        characters=adventure_characters,
-        theme="Cartoon",
-        duration="30 seconds",
-        output_name="knight_and_dragon"
-    )
+    examples = [
+        ("Simple Story", "robot_friendship", {
+            "story": simple_story,
+            "theme": "Cinematic",
+            "duration": "30 seconds"
+        }),
+        ("Story with Defined Characters", "knight_and_dragon", {
+            "story": adventure_story,
+            "characters": adventure_characters,
+            "theme": "Cartoon",
+            "duration": "30 seconds"
+        })
+    ]
+
+    # Both scripts are generated concurrently
+    agent = StoryToScriptAgent()
+    print("Generating example scripts...")
+    scripts = agent.generate_scripts([story for _, _, story in examples])
+
+    for (label, output_name, _), script in zip(examples, scripts):
+        print("\n" + "="*60)
+        print(f"=== {label} ===")
+        print("="*60)
+        print(script)
+        agent.save_script(script, output_name)
 
     print("\n✓ Examples complete!")
     print("\nGenerated scripts can be used with:")
@@ -1,8 +1,199 @@
 import json
+import logging
 import os
 import math
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import List, Dict, Tuple
-from moviepy import TextClip, ColorClip, VideoClip
+import numpy as np
+from moviepy import ColorClip, ImageClip, VideoClip
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def load_font(font: str, font_size: int) -> ImageFont.FreeTypeFont:
+    """Load a TrueType font once per (file, size)."""
+    return ImageFont.truetype(font, font_size)
+
+
+def _wrap_words(text: str, font: ImageFont.FreeTypeFont, max_width: float) -> List[str]:
+    """Greedy word wrap so each line's advance width stays within max_width."""
+    lines = []
+    current = ""
+    for word in text.split():
+        candidate = f"{current} {word}".strip()
+        if current and font.getlength(candidate) > max_width:
+            lines.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        lines.append(current)
+    return lines
+
+
+@lru_cache(maxsize=4096)
+def render_text_rgba(
+    text: str,
+    font: str,
+    font_size: int,
+    color: str,
+    stroke_color: str = None,
+    stroke_width: int = 0,
+    method: str = "label",
+    size: tuple = (None, None),
+    margin: tuple = (None, None),
+    text_align: str = "left"
+) -> np.ndarray:
+    """
+    Rasterize text with Pillow, once per distinct style, as an RGBA array.
+
+    Takes the TextClip options this module used: method='label' draws one line
+    sized to the text; method='caption' word-wraps to size[0]. The first
+    glyph's origin sits at (margin_x + stroke_width, margin_y + stroke_width),
+    so prefix widths from font.getlength() map straight to x offsets.
+
+    The result is shared between callers - don't modify it.
+
+    Returns:
+        (height, width, 4) uint8 array
+    """
+    pil_font = load_font(font, font_size)
+    margin_x = margin[0] or 0
+    margin_y = margin[1] or 0
+    stroke_width = stroke_width if stroke_color else 0
+    ascent, descent = pil_font.getmetrics()
+    line_height = ascent + descent
+
+    if method == "caption" and size[0]:
+        lines = _wrap_words(text, pil_font, size[0] - 2 * stroke_width) or [""]
+        width = size[0] + 2 * margin_x
+        interline = 4
+    else:
+        lines = [text]
+        width = math.ceil(pil_font.getlength(text)) + 2 * (margin_x + stroke_width)
+        interline = 0
+
+    height = len(lines) * line_height + (len(lines) - 1) * interline + 2 * (margin_y + stroke_width)
+
+    image = Image.new("RGBA", (max(1, width), max(1, height)), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+
+    for idx, line in enumerate(lines):
+        line_width = pil_font.getlength(line)
+        if text_align == "center":
+            x = (width - line_width) / 2
+        elif text_align == "right":
+            x = width - margin_x - stroke_width - line_width
+        else:
+            x = margin_x + stroke_width
+        y = margin_y + stroke_width + idx * (line_height + interline)
+
+        draw.text(
+            (x, y),
+            line,
+            font=pil_font,
+            fill=color,
+            stroke_width=stroke_width,
+            stroke_fill=stroke_color
+        )
+
+    rgba = np.asarray(image)
+    rgba.flags.writeable = False
+    return rgba
+
+
+def text_image_clip(rgba: np.ndarray) -> ImageClip:
+    """Wrap a rendered RGBA text array in a clip whose mask is the alpha channel."""
+    return ImageClip(rgba, transparent=True)
+
+
+def render_overlay_images(overlay_specs: List[Dict], font: str, output_dir: str) -> List[Dict]:
+    """
+    Rasterize drawtext overlay specs to PNGs for media_utils.burn_image_overlays.
+
+    Each distinct text style is rendered and written once; the returned
+    overlays are positioned so the glyphs land where drawtext would draw them.
+
+    Args:
+        overlay_specs: Specs from create_karaoke_specs / wrap_text_specs
+        font: TrueType font file
+        output_dir: Directory for the PNGs
+
+    Returns:
+        Overlay dicts with image, start, end, x and y
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    images = {}
+    overlays = []
+
+    for spec in overlay_specs:
+        style = (spec["text"], spec["font_size"], spec["color"], spec["stroke_color"], spec["stroke_width"])
+        if style not in images:
+            rgba = render_text_rgba(
+                spec["text"], font, spec["font_size"], spec["color"],
+                spec["stroke_color"], spec["stroke_width"], 'label'
+            )
+            image_path = os.path.join(output_dir, f"overlay_{len(images)}.png")
+            Image.fromarray(rgba).save(image_path, compress_level=1)
+            images[style] = image_path
+
+        # render_text_rgba puts the glyph origin at (stroke, stroke)
+        stroke = spec["stroke_width"] if spec["stroke_color"] else 0
+        overlays.append({
+            "image": images[style],
+            "start": spec["start"],
+            "end": spec["end"],
+            "x": spec["x"] - stroke,
+            "y": spec["y"] - stroke
+        })
+
+    return overlays
+
+
+def karaoke_line_clip(
+    base_rgba: np.ndarray,
+    highlight_rgba: np.ndarray,
+    word_spans: List[Tuple[int, int]],
+    word_offsets: np.ndarray,
+    duration: float
+) -> VideoClip:
+    """
+    One clip for a whole karaoke line instead of a base clip plus one clip per word.
+
+    The frame at time t is the base line with the columns of the word being
+    spoken copied in from the highlight render. Each word state is composed
+    once, on first use, and reused for every frame it covers.
+
+    Args:
+        base_rgba: Rendered line in the normal color
+        highlight_rgba: Same line rendered in the highlight color
+        word_spans: (x1, x2) column range of each word in the line arrays
+        word_offsets: Start of each word, in seconds from the line start
+        duration: Line duration in seconds
+
+    Returns:
+        Clip with an alpha mask, sized like base_rgba
+    """
+    offsets = np.asarray(word_offsets, dtype=np.float64)
+
+    @lru_cache(maxsize=None)
+    def state(word_idx: int) -> Tuple[np.ndarray, np.ndarray]:
+        rgba = base_rgba
+        if word_idx >= 0:
+            x1, x2 = word_spans[word_idx]
+            rgba = base_rgba.copy()
+            np.copyto(rgba[:, x1:x2], highlight_rgba[:, x1:x2], where=highlight_rgba[:, x1:x2, 3:4] > 0)
+        return rgba[..., :3], rgba[..., 3] / 255.0
+
+    def word_at(t: float) -> int:
+        return int(np.searchsorted(offsets, t, side="right")) - 1
+
+    mask = VideoClip(lambda t: state(word_at(t))[1], is_mask=True, duration=duration)
+    return VideoClip(lambda t: state(word_at(t))[0], duration=duration).with_mask(mask)
+
 
 class TextOverlayAgent:
     def __init__(self):
@@ -31,18 +222,37 @@ class TextOverlayAgent:
         Polly returns newline-delimited JSON objects.
         """
         if not os.path.exists(json_path):
-            print(f"Warning: Speech marks file not found at {json_path}")
+            logger.warning("Speech marks file not found at %s", json_path)
             return []
             
-        speech_marks = []
         try:
             with open(json_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if line.strip():
-                        speech_marks.append(json.loads(line))
+                lines = [line for line in f.read().splitlines() if line.strip()]
+            # One json.loads over the marks as an array instead of one per line
+            return json.loads("[" + ",".join(lines) + "]")
         except Exception as e:
-            print(f"Error loading speech marks from {json_path}: {e}")
-        return speech_marks
+            logger.error("Error loading speech marks from %s: %s", json_path, e)
+        return []
+
+    def load_speech_marks_batch(self, json_paths: List[str], max_workers: int = 16) -> List[list]:
+        """
+        Load several speech marks files concurrently.
+
+        Args:
+            json_paths: Speech marks paths; None entries are skipped (empty list)
+            max_workers: Maximum number of concurrent reads
+
+        Returns:
+            Parsed speech marks per path, in the same order
+        """
+        if not json_paths:
+            return []
+
+        def load(json_path):
+            return self.load_speech_marks(json_path) if json_path is not None else []
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(json_paths))) as executor:
+            return list(executor.map(load, json_paths))
 
     def create_background_bar(self, duration: float, video_size: tuple) -> VideoClip:
         """Create semi-transparent background bar for text"""
@@ -57,15 +267,189 @@ class TextOverlayAgent:
         bar_y = height - self.bottom_offset - (self.bg_height / 2)
         return bar.with_position(('center', bar_y))
 
+    def _group_words_into_lines(self, word_marks: list) -> list:
+        """
+        Group word speech marks into display lines by word count and estimated width.
+
+        A line takes words until it holds max_words_per_line or the next word
+        would push its estimated width past max_line_width; each break is
+        found with one search over the cumulative widths.
+        """
+        if not word_marks:
+            return []
+
+        # Estimate width to decide on line breaks
+        # Using 0.8 factor to be more conservative and prevent side clipping
+        lengths = np.fromiter((len(m["value"]) for m in word_marks), dtype=np.float64, count=len(word_marks))
+        estimated_w = lengths * (self.font_size * 0.8)
+        # Width of words 0..k, each followed by a space
+        cum = np.cumsum(estimated_w + self.word_spacing)
+
+        lines = []
+        start = 0
+        while start < len(word_marks):
+            # The first line's width counts a space after every word; later
+            # lines don't count one after their first word
+            offset = cum[start - 1] + self.word_spacing if start else 0.0
+            fits = int(np.searchsorted(cum, self.max_line_width + self.word_spacing + offset, side="right"))
+            end = min(start + self.max_words_per_line, max(start + 1, fits), len(word_marks))
+            lines.append(word_marks[start:end])
+            start = end
+
+        return lines
+
+    def _mark_times(self, word_marks: list) -> np.ndarray:
+        """Start of every word mark in seconds, read out of the mark dicts once."""
+        return np.fromiter((m["time"] for m in word_marks), dtype=np.float64, count=len(word_marks)) / 1000.0
+
+    def _line_times(self, lines: list, times: np.ndarray, scene_start_time: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get (start time in video, duration, index of the first word) of every line.
+
+        A line stays up until the next line starts; the last one until 0.8s
+        after its last word starts.
+        """
+        firsts = np.cumsum([0] + [len(line) for line in lines[:-1]])
+        line_start_abs = times[firsts]
+        line_end_abs = np.append(times[firsts[1:]], times[-1] + 0.8)
+
+        durations = np.maximum(0.2, line_end_abs - line_start_abs)
+        starts_rel = np.maximum(0, line_start_abs + scene_start_time)
+        return starts_rel, durations, firsts
+
+    def _word_times(self, word_times: np.ndarray, scene_start_time: float, line_end_rel: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get (start, end) times in video of every word in a line, as arrays.
+
+        A word stays highlighted until the next one starts; the last word
+        until the line ends. Every word is shown for at least 0.1s.
+        """
+        starts = word_times + scene_start_time
+        ends = np.append(starts[1:], line_end_rel)
+        return starts, np.maximum(ends, starts + 0.1)
+
+    def _get_measure_font(self, font_size: int = None) -> ImageFont.FreeTypeFont:
+        """Pillow font used to measure text widths (shared via load_font's cache)."""
+        return load_font(self.font, font_size or self.font_size)
+
+    def _overlay_spec(self, text: str, start: float, end: float, x: float, y: float, color: str, font_size: int = None) -> Dict:
+        """Describe one timed text draw for media_utils.burn_text_overlays."""
+        return {
+            "text": text,
+            "start": start,
+            "end": end,
+            "x": x,
+            "y": y,
+            "color": color,
+            "font_size": font_size or self.font_size,
+            "stroke_color": self.stroke_color,
+            "stroke_width": self.stroke_width
+        }
+
+    def create_karaoke_specs(self,
+                             narration: str,
+                             speech_marks: list,
+                             scene_start_time: float,
+                             video_size: tuple = (1080, 1920),
+                             bottom_offset: float = None) -> list:
+        """
+        Same karaoke layout and timing as create_karaoke_clips, but returned as
+        plain overlay specs so ffmpeg drawtext can render them in one pass.
+
+        Text is measured with Pillow instead of being rasterized.
+
+        Returns: List of overlay spec dicts (text, start, end, x, y, color, ...)
+        """
+        if not speech_marks:
+            return []
+
+        word_marks = [m for m in speech_marks if m.get("type") == "word"]
+        if not word_marks:
+            return []
+
+        lines = self._group_words_into_lines(word_marks)
+        times = self._mark_times(word_marks)
+        line_starts, line_durations, line_firsts = self._line_times(lines, times, scene_start_time)
+        font = self._get_measure_font()
+
+        v_width, v_height = video_size
+        if bottom_offset is None:
+            bottom_offset = self.bottom_offset
+
+        # Calculate total Y height to center the block
+        total_text_height = len(lines) * self.line_spacing
+        start_y = v_height - bottom_offset - (total_text_height / 2)
+
+        specs = []
+        for line_idx, line in enumerate(lines):
+            text_y_pos = start_y + (line_idx * self.line_spacing)
+            line_start_rel = float(line_starts[line_idx])
+            line_end_rel = line_start_rel + float(line_durations[line_idx])
+
+            full_line_text = " ".join(m["value"] for m in line)
+
+            # Match the rendered clip layout: 20px margin above the glyphs, centered line
+            text_y = max(0, min(text_y_pos, v_height - 100)) + 20
+            line_x_start = (v_width - font.getlength(full_line_text)) / 2
+
+            # 1. White base line
+            specs.append(self._overlay_spec(full_line_text, line_start_rel, line_end_rel, line_x_start, text_y, self.normal_color))
+
+            # 2. Gold word drawn over the base line while it is spoken
+            first = line_firsts[line_idx]
+            word_starts, word_ends = self._word_times(times[first:first + len(line)], scene_start_time, line_end_rel)
+            char_ptr = 0
+            for mark, word_start_rel, word_end_rel in zip(line, word_starts.tolist(), word_ends.tolist()):
+                word_val = mark["value"]
+                x1 = font.getlength(full_line_text[:char_ptr])
+
+                specs.append(self._overlay_spec(word_val, word_start_rel, word_end_rel, line_x_start + x1, text_y, self.highlight_color))
+
+                # Move pointer to next word (account for space)
+                char_ptr += len(word_val) + 1
+
+        return specs
+
+    def wrap_text_specs(self,
+                        text: str,
+                        start_time: float,
+                        duration: float,
+                        top_y: float,
+                        video_size: tuple = (1080, 1920)) -> list:
+        """
+        Word-wrap static text to max_line_width and return centered overlay specs
+        (drawtext equivalent of render_text_rgba with method='caption').
+        """
+        font = self._get_measure_font()
+        v_width = video_size[0]
+
+        lines = _wrap_words(text, font, self.max_line_width)
+
+        return [
+            self._overlay_spec(
+                line,
+                start_time,
+                start_time + duration,
+                (v_width - font.getlength(line)) / 2,
+                top_y + idx * self.line_spacing,
+                self.normal_color
+            )
+            for idx, line in enumerate(lines)
+        ]
+
     def create_karaoke_clips(self, 
                             narration: str, 
                             speech_marks: list, 
                             scene_start_time: float,
-                            video_size: tuple = (1080, 1920)) -> list:
+                            video_size: tuple = (1080, 1920),
+                            bottom_offset: float = None) -> list:
         """
-        Generate list of TextClip objects with karaoke highlighting
-        
-        Returns: List of MoviePy TextClip objects with proper timing
+        Generate list of text clips with karaoke highlighting
+
+        bottom_offset overrides self.bottom_offset for this call only, so
+        concurrent callers never share a mutated attribute.
+
+        Returns: List of MoviePy clips (one per line) with proper timing
         """
         if not speech_marks:
             return []
@@ -76,48 +460,28 @@ class TextOverlayAgent:
             return []
 
         # Group words into lines based on word count and max width
-        lines = []
-        current_line = []
-        current_width = 0
-        
+        lines = self._group_words_into_lines(word_marks)
+        times = self._mark_times(word_marks)
+        line_starts, line_durations, line_firsts = self._line_times(lines, times, scene_start_time)
+
         # Use Montserrat-Bold from the local repo fonts directory
         active_font = self.font
-        
-        for mark in word_marks:
-            word_text = mark["value"]
-            # Estimate width to decide on line breaks
-            # Using 0.8 factor to be more conservative and prevent side clipping
-            estimated_w = len(word_text) * (self.font_size * 0.8)
-            
-            if len(current_line) >= self.max_words_per_line or (current_width + estimated_w > self.max_line_width and current_line):
-                lines.append(current_line)
-                current_line = [mark]
-                current_width = estimated_w
-            else:
-                current_line.append(mark)
-                current_width += estimated_w + self.word_spacing
-        
-        if current_line:
-            lines.append(current_line)
+        font = self._get_measure_font()
 
         all_clips = []
         v_width, v_height = video_size
-        
+        if bottom_offset is None:
+            bottom_offset = self.bottom_offset
+
         # Calculate total Y height to center the block
         total_text_height = len(lines) * self.line_spacing
-        start_y = v_height - self.bottom_offset - (total_text_height / 2)
+        start_y = v_height - bottom_offset - (total_text_height / 2)
 
         for line_idx, line in enumerate(lines):
             text_y_pos = start_y + (line_idx * self.line_spacing)
             
-            line_start_abs = line[0]["time"] / 1000.0
-            if line_idx < len(lines) - 1:
-                line_end_abs = lines[line_idx+1][0]["time"] / 1000.0
-            else:
-                line_end_abs = (line[-1]["time"] / 1000.0) + 0.8
-            
-            line_duration = max(0.2, line_end_abs - line_start_abs)
-            line_start_rel = max(0, line_start_abs + scene_start_time)
+            line_start_rel = float(line_starts[line_idx])
+            line_duration = float(line_durations[line_idx])
 
             # 1. Create the static Base line (White) and Highlight Template (Gold)
             words_in_line = [m["value"] for m in line]
@@ -128,92 +492,51 @@ class TextOverlayAgent:
                 # Ensure text_y_pos is within bounds
                 safe_text_y = max(0, min(text_y_pos, v_height - 100))
 
-                base_line_clip = TextClip(
-                    text=full_line_text,
-                    font=active_font,
-                    font_size=self.font_size,
-                    color=self.normal_color,
-                    stroke_color=self.stroke_color,
-                    stroke_width=self.stroke_width,
-                    method='label',
-                    margin=(20, 20)
-                ).with_start(line_start_rel).with_duration(line_duration).with_position(('center', safe_text_y))
-                
-                line_w, line_h = base_line_clip.size
-                all_clips.append(base_line_clip)
-                
+                base_line = render_text_rgba(
+                    full_line_text, active_font, self.font_size, self.normal_color,
+                    self.stroke_color, self.stroke_width, 'label', margin=(20, 20)
+                )
+
                 # Gold Highlight Template with identical safety margin
-                highlight_template = TextClip(
-                    text=full_line_text,
-                    font=active_font,
-                    font_size=self.font_size,
-                    color=self.highlight_color,
-                    stroke_color=self.stroke_color,
-                    stroke_width=self.stroke_width,
-                    method='label',
-                    margin=(20, 20)
+                highlight_template = render_text_rgba(
+                    full_line_text, active_font, self.font_size, self.highlight_color,
+                    self.stroke_color, self.stroke_width, 'label', margin=(20, 20)
                 )
-                
-                line_x_start = (v_width - line_w) / 2
+
+                line_w = base_line.shape[1]
                 char_ptr = 0
-                
-                for i, mark in enumerate(line):
+                word_spans = []
+
+                for mark in line:
                     word_val = mark["value"]
-                    
+
                     # Calculate exact boundaries of the word within the full_line_text
                     start_idx = char_ptr
                     end_idx = char_ptr + len(word_val)
-                    
-                    # Measure the prefix width within the context of the line
-                    p1_text = full_line_text[:start_idx]
-                    p2_text = full_line_text[:end_idx]
-                    
+
+                    # Glyphs start at margin + stroke in the rendered line, so
+                    # the prefix advance width is the word's x offset
+                    text_origin = 20 + self.stroke_width
                     x1 = 0
-                    if p1_text:
-                        # Measure the prefix with safety margin
-                        m1 = TextClip(text=p1_text, font=active_font, font_size=self.font_size, 
-                                     method='label', stroke_color=self.stroke_color, stroke_width=self.stroke_width, margin=(20, 20))
-                        x1 = m1.size[0] - 20 # Subtract one side of the margin to get the starting x of the next word
-                    
-                    m2 = TextClip(text=p2_text, font=active_font, font_size=self.font_size, 
-                                 method='label', stroke_color=self.stroke_color, stroke_width=self.stroke_width, margin=(20, 20))
-                    x2 = m2.size[0] - 20
-                    
-                    # CROP: Take a slice of the GOLD line template.
-                    # Width is adjusted by the margins
-                    crop_width = max(1, x2 - x1)  # Ensure positive width
-                    crop_height = max(1, line_h)  # Ensure positive height
-
-                    # Skip if dimensions are invalid
-                    if crop_width <= 0 or crop_height <= 0:
-                        char_ptr += len(word_val) + 1
-                        continue
-
-                    word_highlight = highlight_template.cropped(x1=x1, y1=0, width=crop_width, height=crop_height)
-
-                    # Timing
-                    word_start_rel = (mark["time"] / 1000.0) + scene_start_time
-                    if i < len(line) - 1:
-                        word_end_rel = (line[i+1]["time"] / 1000.0) + scene_start_time
-                    else:
-                        word_end_rel = line_start_rel + line_duration
-
-                    word_duration = max(0.1, word_end_rel - word_start_rel)
-
-                    # Position: Anchor to the same line_x_start and line_y_pos as the white line
-                    # Ensure position is within video bounds
-                    word_x = max(0, min(line_x_start + x1, v_width - crop_width))
-                    word_y = max(0, min(text_y_pos, v_height - crop_height))
-                    word_pos = (word_x, word_y)
-
-                    final_clip = word_highlight.with_start(word_start_rel).with_duration(word_duration).with_position(word_pos)
-                    all_clips.append(final_clip)
-                    
+                    if start_idx:
+                        x1 = int(text_origin + font.getlength(full_line_text[:start_idx]))
+                    x2 = int(math.ceil(text_origin + font.getlength(full_line_text[:end_idx]) + self.stroke_width))
+
+                    word_spans.append((x1, min(line_w, max(x1 + 1, x2))))
+
                     # Move pointer to next word (account for space)
                     char_ptr += len(word_val) + 1
-                    
+
+                # One clip per line: the highlighted word is swapped in per frame
+                first = line_firsts[line_idx]
+                word_starts, _ = self._word_times(times[first:first + len(line)], scene_start_time, line_start_rel + line_duration)
+                line_clip = karaoke_line_clip(
+                    base_line, highlight_template, word_spans, word_starts - word_starts[0], line_duration
+                ).with_start(line_start_rel).with_position(('center', safe_text_y))
+                all_clips.append(line_clip)
+
             except Exception as e:
-                print(f"Error creating line-based clips: {e}")
+                logger.error("Error creating line-based clips: %s", e)
                 continue
                 
         return all_clips
@@ -1,19 +1,39 @@
 import os
 import json
 import sys
-from typing import Dict
-from moviepy import ImageClip, AudioFileClip, concatenate_videoclips, CompositeVideoClip
-import moviepy.video.fx as vfx
-from text_overlay_agent import TextOverlayAgent
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
+from media_utils import (
+    build_drawtext_filter,
+    build_image_overlay_filters,
+    drawtext_available,
+    encode_filter_complex,
+    get_h264_encoder_params,
+    probe_duration
+)
+from text_overlay_agent import TextOverlayAgent, render_overlay_images
+
+IMAGE_EXTENSIONS = {"png", "jpg"}
+AUDIO_EXTENSIONS = {"mp3"}
+
+def _count_files(directory: str, extensions: set) -> int:
+    """Number of files in directory with one of the given extensions, from one scandir pass."""
+    with os.scandir(directory) as entries:
+        return sum(1 for entry in entries if entry.name.rpartition(".")[2] in extensions and entry.is_file())
 
 class VideoAgent:
-    def __init__(self):
+    def __init__(self, codec: str = None, use_gpu: bool = True):
         self.base_dir = "output"
         self.fps = 24
         self.width = 1080
         self.height = 1920
+        # Hardware H.264 encoder when one works here (NVENC, VideoToolbox,
+        # Quick Sync), libx264 otherwise; codec picks one explicitly
+        self.encoder_params = get_h264_encoder_params(use_gpu, codec)
 
-    def create_video(self, reel_name: str, script_json: Dict, mode: str = "story"):
+    def create_video(self, reel_name: str, script_json: Dict, mode: str = "story", max_workers: int = 8):
         scenes = script_json.get("scenes", [])
         reel_path = os.path.join(self.base_dir, reel_name)
         image_dir = os.path.join(reel_path, "images")
@@ -27,102 +47,182 @@ class VideoAgent:
         if not os.path.exists(image_dir) or not os.path.exists(audio_dir):
             raise FileNotFoundError(f"Required directories missing: {image_dir} or {audio_dir}")
 
-        image_files = [f for f in os.listdir(image_dir) if f.endswith(('.png', '.jpg'))]
-        audio_files = [f for f in os.listdir(audio_dir) if f.endswith('.mp3')]
+        image_count = _count_files(image_dir, IMAGE_EXTENSIONS)
+        audio_count = _count_files(audio_dir, AUDIO_EXTENSIONS)
 
         # Validation: Number of scenes matches images and audio
-        if len(image_files) != len(scenes):
-            raise ValueError(f"Validation Mismatch: Found {len(image_files)} images for {len(scenes)} scenes.")
-        if len(audio_files) != len(scenes):
-            raise ValueError(f"Validation Mismatch: Found {len(audio_files)} audio files for {len(scenes)} scenes.")
+        if image_count != len(scenes):
+            raise ValueError(f"Validation Mismatch: Found {image_count} images for {len(scenes)} scenes.")
+        if audio_count != len(scenes):
+            raise ValueError(f"Validation Mismatch: Found {audio_count} audio files for {len(scenes)} scenes.")
 
         # News mode uses even simpler transitions if needed, but 0.3s crossfade is professional
-        overlap = 0.1 if mode == "news" else 0.3  
-        clips = []
-        
+        overlap = 0.1 if mode == "news" else 0.3
+
         # Text Overlay Setup
         text_overlay_agent = TextOverlayAgent()
-        all_text_clips = []
+
+        # Reading each scene's image header, audio duration and speech marks
+        # is disk reads and an ffmpeg probe, so scenes are loaded concurrently
+        # and kept in order
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(scenes)))) as executor:
+            built = list(executor.map(
+                lambda scene: self._build_scene(scene, image_dir, audio_dir, text_overlay_agent),
+                scenes
+            ))
+
+        # Scenes are joined back to back, each lasting as long as its
+        # narration (the last one holds for 'overlap' longer), and every
+        # karaoke word is a timed overlay: the frames are composited and
+        # encoded by one ffmpeg filtergraph, never frame by frame in Python
+        timeline = []
+        overlay_specs = []
         current_time = 0.0
-        for scene in scenes:
-            num = scene.get("scene_number")
-            duration = scene.get("duration_seconds")
-            img_path = os.path.join(image_dir, f"scene_{num}.png")
-            aud_path = os.path.join(audio_dir, f"scene_{num}.mp3")
-
-            # Validate: All image and audio files exist for each scene
-            if not os.path.exists(img_path):
-                print(f"Error: Missing image for scene {num}")
-                continue
-            if not os.path.exists(aud_path):
-                print(f"Error: Missing audio for scene {num}")
+        for scene, result in zip(scenes, built):
+            if result is None:
                 continue
-
-            try:
-                # Audio Integration
-                audio = AudioFileClip(aud_path)
-                audio_duration = audio.duration
-
-                if audio_duration <= 0:
-                    audio_duration = duration
-
-                # Video Clip Creation - extend duration by 'overlap' for the transition
-                clip = ImageClip(img_path).with_duration(audio_duration + overlap)
-
-                # Resize to fill vertical 1080x1920
-                clip = clip.resized(height=self.height)
-                if clip.w < self.width:
-                    clip = clip.resized(width=self.width)
-
-                # Center Crop
-                x1 = (clip.w - self.width) / 2
-                y1 = (clip.h - self.height) / 2
-                clip = clip.cropped(x1=max(0, x1), y1=max(0, y1), width=self.width, height=self.height)
-
-                # Attach Audio
-                clip = clip.with_audio(audio)
-
-                # Text Overlay Integration
-                speech_marks_path = f"{aud_path}_speechmarks.json"
-                if os.path.exists(speech_marks_path):
-                    speech_marks = text_overlay_agent.load_speech_marks(speech_marks_path)
-                    scene_text_clips = text_overlay_agent.create_karaoke_clips(
-                        narration=scene.get("voice_line", ""),
-                        speech_marks=speech_marks,
-                        scene_start_time=current_time
-                    )
-                    all_text_clips.extend(scene_text_clips)
-
-                clips.append(clip)
-                current_time += audio_duration
-            except Exception as e:
-                print(f"Graceful handle: Exception for scene {num}: {e}")
-
-        if not clips:
+            img_path, aud_path, audio_duration, speech_marks = result
+
+            # Text Overlay Integration - a scene's captions start where the
+            # previous scenes' audio ends
+            if speech_marks:
+                overlay_specs += text_overlay_agent.create_karaoke_specs(
+                    narration=scene.get("voice_line", ""),
+                    speech_marks=speech_marks,
+                    scene_start_time=current_time,
+                    video_size=(self.width, self.height)
+                )
+
+            timeline.append((img_path, aud_path, audio_duration))
+            current_time += audio_duration
+
+        if not timeline:
             raise RuntimeError("No valid clips were generated.")
 
-        # Final Assembly with Crossfade and Text Overlays
-        video_clip = concatenate_videoclips(clips, method="compose", padding=-overlap)
-        final = CompositeVideoClip([video_clip] + all_text_clips)
-        final.write_videofile(
-            output_file,
-            fps=self.fps,
-            codec="libx264",
-            audio_codec="aac"
-        )
-
-        # Cleanup
-        for c in clips:
-            c.close()
+        input_paths = []
+        graph = []
+        for idx, (img_path, aud_path, audio_duration) in enumerate(timeline):
+            # The overlapping clips used to leave the last one running
+            # 'overlap' past its narration; keep that tail
+            if idx == len(timeline) - 1:
+                audio_duration += overlap
+            graph += self._scene_filters(idx, len(input_paths), audio_duration)
+            input_paths += [img_path, aud_path]
+
+        segments = "".join(f"[v{idx}][a{idx}]" for idx in range(len(timeline)))
+        graph.append(f"{segments}concat=n={len(timeline)}:v=1:a=1[vcat][a]")
+
+        print(f"Writing video with {self.encoder_params['codec']} ({len(overlay_specs)} text overlays)")
+        if not overlay_specs or drawtext_available():
+            if overlay_specs:
+                graph.append(f"[vcat]{build_drawtext_filter(overlay_specs, text_overlay_agent.font)}[v]")
+            else:
+                graph.append("[vcat]null[v]")
+            encode_filter_complex(input_paths, ";\n".join(graph), output_file, self.encoder_params)
+        else:
+            # ffmpeg without drawtext: overlay pre-rendered text images instead
+            with tempfile.TemporaryDirectory() as overlay_dir:
+                overlays = render_overlay_images(overlay_specs, text_overlay_agent.font, overlay_dir)
+                graph += build_image_overlay_filters(overlays, "[vcat]", "[v]", first_input=len(input_paths))
+                input_paths += [overlay["image"] for overlay in overlays]
+                encode_filter_complex(input_paths, ";\n".join(graph), output_file, self.encoder_params)
 
         return output_file
 
+    def _build_scene(
+        self,
+        scene: Dict,
+        image_dir: str,
+        audio_dir: str,
+        text_overlay_agent: TextOverlayAgent
+    ) -> Optional[Tuple]:
+        """
+        Check one scene's files and read what the filtergraph needs about them.
+
+        Returns:
+            (image path, audio path, audio duration, speech marks or None),
+            or None if the scene is skipped
+        """
+        num = scene.get("scene_number")
+        duration = scene.get("duration_seconds")
+        img_path = os.path.join(image_dir, f"scene_{num}.png")
+        aud_path = os.path.join(audio_dir, f"scene_{num}.mp3")
+
+        # Validate: All image and audio files exist for each scene
+        if not os.path.exists(img_path):
+            print(f"Error: Missing image for scene {num}")
+            return None
+        if not os.path.exists(aud_path):
+            print(f"Error: Missing audio for scene {num}")
+            return None
+
+        try:
+            # Header only (the pixels are decoded by ffmpeg): an unreadable
+            # image skips this scene instead of failing the whole render
+            Image.open(img_path).close()
+
+            # Audio Integration
+            audio_duration = probe_duration(aud_path)
+
+            if audio_duration <= 0:
+                audio_duration = duration
+
+            speech_marks = None
+            speech_marks_path = f"{aud_path}_speechmarks.json"
+            if os.path.exists(speech_marks_path):
+                speech_marks = text_overlay_agent.load_speech_marks(speech_marks_path)
+
+            return img_path, aud_path, audio_duration, speech_marks
+        except Exception as e:
+            print(f"Graceful handle: Exception for scene {num}: {e}")
+            return None
+
+    def _scene_filters(self, idx: int, image_input: int, duration: float) -> List[str]:
+        """
+        Build one scene's video and audio chains for the concat filter.
+
+        The still image is scaled to cover the vertical frame, center
+        cropped and held for the scene; the narration is padded or cut to
+        the same length.
+
+        Args:
+            idx: Scene position in the concat (labels [v<idx>] and [a<idx>])
+            image_input: Input index of the scene image; its audio is the next input
+            duration: Scene duration in seconds
+
+        Returns:
+            [video chain, audio chain]
+        """
+        video_filters = [
+            # Resize to fill vertical 1080x1920, then center crop
+            f"scale={self.width}:{self.height}:force_original_aspect_ratio=increase",
+            f"crop={self.width}:{self.height}",
+            f"fps={self.fps}",
+            f"tpad=stop_mode=clone:stop_duration={duration:.3f}",
+            f"trim=duration={duration:.3f}",
+            "format=yuv420p",
+            "setsar=1"
+        ]
+        audio_filters = [
+            "asetpts=PTS-STARTPTS",
+            "aresample=44100",
+            "aformat=channel_layouts=stereo",
+            "apad",
+            f"atrim=duration={duration:.3f}"
+        ]
+
+        return [
+            f"[{image_input}:v]{','.join(video_filters)}[v{idx}]",
+            f"[{image_input + 1}:a]{','.join(audio_filters)}[a{idx}]"
+        ]
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Assemble Video from scenes")
     parser.add_argument("name", help="Reel name")
     parser.add_argument("script", help="Path to script.json")
     parser.add_argument("--mode", default="story", help="story or news")
+    parser.add_argument("--codec", default=None, help="H.264 encoder (e.g. libx264, h264_nvenc); detected if omitted")
     
     args = parser.parse_args()
 
@@ -130,7 +230,7 @@ if __name__ == "__main__":
         with open(args.script, 'r') as f:
             script_data = json.load(f)
 
-        agent = VideoAgent()
+        agent = VideoAgent(codec=args.codec)
         output = agent.create_video(args.name, script_data, mode=args.mode)
         print(f"Video created successfully: {output}")
     except Exception as error:
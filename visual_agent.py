@@ -1,129 +1,281 @@
 import os
+import re
 import json
+import time
+import random
 import base64
-import boto3
-from typing import List, Dict, Optional
+import shutil
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+from botocore.exceptions import ClientError
 from dotenv import load_dotenv
 
+from bedrock_utils import get_bedrock_client
+
 load_dotenv()
 
+# Prompt suffix per theme; other themes get "in the style of <theme>"
+STYLE_MAPPINGS = {
+    "cartoon": "vibrant 3D animation style, Pixar-like, expressive characters",
+    "cinematic": "photorealistic, cinematic lighting, 8k, highly detailed, professional photography",
+    "corporate": "clean, professional stock photo, minimalist, modern office aesthetic",
+    "cyberpunk": "neon, futuristic, high-tech, dark moody lighting",
+    "sketch": "artistic charcoal sketch, hand-drawn, textured paper"
+}
+
+# Base64 image data is decoded and written in blocks of this many
+# characters (a multiple of 4, so every block decodes on its own)
+BASE64_CHUNK_SIZE = 64 * 1024
+
+_IMAGES_FIELD_PATTERN = re.compile(rb'"images"\s*:\s*\[\s*"')
+
+# Same for every scene: only the prompt text changes between requests
+CANVAS_IMAGE_CONFIG = {
+    "numberOfImages": 1,
+    "height": 1024,  # 9:16 ratio
+    "width": 576,
+    "quality": "standard",
+    "cfgScale": 8.0
+}
+
+# Request body around the prompt, serialized once; the bytes match a compact
+# json.dumps of the whole payload
+_CANVAS_BODY_HEAD = b'{"taskType":"TEXT_IMAGE","textToImageParams":{"text":'
+_CANVAS_BODY_TAIL = b'},"imageGenerationConfig":' + json.dumps(CANVAS_IMAGE_CONFIG, separators=(",", ":")).encode("utf-8") + b"}"
+
+def _canvas_request_body(text: str) -> bytes:
+    """Nova Canvas TEXT_IMAGE request body for a prompt, as sent to invoke_model."""
+    return _CANVAS_BODY_HEAD + json.dumps(text).encode("utf-8") + _CANVAS_BODY_TAIL
+
+# Throttling that outlasts boto3's adaptive retries is retried this many
+# more times, with backoff, before the scene fails
+THROTTLING_ERRORS = {"ThrottlingException", "TooManyRequestsException"}
+MAX_THROTTLE_RETRIES = 5
+
+# Generated images are cached on disk by their request
+CANVAS_CACHE_DIR = os.getenv("CANVAS_CACHE_DIR", os.path.join(".cache", "canvas"))
+
+def _character_index(visual_bible: Optional[Dict]) -> Optional[Tuple[List[Tuple[str, str, str]], "re.Pattern"]]:
+    """
+    Visual Bible characters that have distinctive features, for matching
+    against scene prompts.
+
+    Returns:
+        ([(lowercased name, name, features)] in Visual Bible order, pattern
+        finding any of the lowercased names), or None if there are none
+    """
+    if not visual_bible:
+        return None
+
+    table = [
+        (c["name"].lower(), c["name"], c["distinctive_features"])
+        for c in visual_bible.get("characters", [])
+        if c.get("name") and c.get("distinctive_features")
+    ]
+    if not table:
+        return None
+
+    # Longest names first, inside a lookahead so a match is tried at every
+    # position: each name in a prompt is then a prefix of some match
+    names = sorted({name_lower for name_lower, _, _ in table}, key=len, reverse=True)
+    return table, re.compile("(?=(" + "|".join(map(re.escape, names)) + "))")
+
+def _save_canvas_image(raw: bytes, file_path: str) -> None:
+    """
+    Write the first image of a Nova Canvas response body to file_path.
+
+    The base64 string is decoded straight out of the raw response, block by
+    block, instead of parsing the whole JSON into a str and decoding that
+    into one more full-size copy.
+    """
+    match = _IMAGES_FIELD_PATTERN.search(raw)
+    end = raw.find(b'"', match.end()) if match else -1
+    if end == -1 or raw.find(b"\\", match.end(), end) != -1:
+        # Unexpected layout or JSON escapes in the string: parse it normally
+        image_data = base64.b64decode(json.loads(raw).get("images")[0])
+        with open(file_path, "wb") as f:
+            f.write(image_data)
+        return
+
+    encoded = memoryview(raw)[match.end():end]
+    with open(file_path, "wb") as f:
+        for offset in range(0, len(encoded), BASE64_CHUNK_SIZE):
+            f.write(base64.b64decode(encoded[offset:offset + BASE64_CHUNK_SIZE]))
+
 class VisualAgent:
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
         self.region = os.getenv("AWS_REGION", "us-east-1")
-        self.bedrock = boto3.client(
-            service_name="bedrock-runtime",
-            region_name=self.region
-        )
+        # Shared client: connection pool sized for concurrent scenes, adaptive retries
+        self.bedrock = get_bedrock_client(self.region)
         self.model_id = "amazon.nova-canvas-v1:0"
         self.base_output_dir = "output"
+        # Nova Canvas uses a fixed default seed, so the same request body
+        # gives the same image: reuse it instead of generating it again
+        self.use_cache = use_cache
 
-    def _optimize_prompt(self, visual_prompt: str, theme: str, visual_bible: Optional[Dict] = None, mode: str = "story") -> str:
-        if mode == "news":
-            return f"photojournalism, natural lighting, real world, {visual_prompt}. High quality, documentary style, realistic, no text."
+        # In-flight Nova Canvas requests across every generate_images call on
+        # this agent (e.g. several reels served at once), to stay under the
+        # account's request rate instead of bursting past it
+        self.max_parallel_requests = int(os.getenv("NOVA_CANVAS_MAX_PARALLEL", "8"))
+        self._request_semaphore = threading.BoundedSemaphore(self.max_parallel_requests)
 
-        style_mappings = {
-            "cartoon": "vibrant 3D animation style, Pixar-like, expressive characters",
-            "cinematic": "photorealistic, cinematic lighting, 8k, highly detailed, professional photography",
-            "corporate": "clean, professional stock photo, minimalist, modern office aesthetic",
-            "cyberpunk": "neon, futuristic, high-tech, dark moody lighting",
-            "sketch": "artistic charcoal sketch, hand-drawn, textured paper"
-        }
+    def _reel_prompt_parts(self, theme: str, visual_bible: Optional[Dict]) -> Tuple[str, str]:
+        """
+        The parts of a story prompt that are the same for every scene of a reel.
+
+        Returns:
+            (style text following the scene's visual prompt, color palette
+            hint following the scene's character hints)
+        """
+        style_suffix = STYLE_MAPPINGS.get(theme.lower(), f"in the style of {theme}")
+        style_part = f". {style_suffix}. High quality, no text."
+
+        # Add color palette as a subtle hint
+        palette_hint = ""
+        if visual_bible and visual_bible.get("color_palette"):
+            palette_hint = f" Colors: {visual_bible.get('color_palette')}."
 
-        style_suffix = style_mappings.get(theme.lower(), f"in the style of {theme}")
+        return style_part, palette_hint
+
+    def _optimize_prompt(
+        self,
+        visual_prompt: str,
+        reel_parts: Tuple[str, str],
+        mode: str = "story",
+        character_index: Optional[Tuple] = None
+    ) -> str:
+        if mode == "news":
+            return f"photojournalism, natural lighting, real world, {visual_prompt}. High quality, documentary style, realistic, no text."
 
         # Build compact Visual Bible hints (only for characters mentioned in this scene)
-        consistency_hints = ""
-        if visual_bible:
+        character_hints = ""
+        if character_index:
             # Find which characters are mentioned in this scene's visual_prompt
-            prompt_lower = visual_prompt.lower()
-            characters = visual_bible.get("characters", [])
-
-            mentioned_chars = []
-            for c in characters:
-                char_name = c.get("name", "").lower()
-                # Check if character name appears in the visual prompt
-                if char_name and char_name in prompt_lower:
-                    # Build a compact description: just distinctive features
-                    features = c.get("distinctive_features", "")
-                    if features:
-                        mentioned_chars.append(f"{c.get('name')}: {features}")
-
+            # (one regex pass instead of a substring search per character)
+            table, pattern = character_index
+            hits = set(pattern.findall(visual_prompt.lower()))
+            mentioned_chars = [
+                # Build a compact description: just distinctive features
+                f"{name}: {features}"
+                for name_lower, name, features in table
+                if any(name_lower in hit for hit in hits)
+            ]
             if mentioned_chars:
-                consistency_hints = " Character details: " + ", ".join(mentioned_chars) + "."
-
-            # Add color palette as a subtle hint
-            if visual_bible.get("color_palette"):
-                consistency_hints += f" Colors: {visual_bible.get('color_palette')}."
+                character_hints = " Character details: " + ", ".join(mentioned_chars) + "."
 
         # SCENE ACTION FIRST, then style, then consistency hints at the end
-        return f"{visual_prompt}. {style_suffix}. High quality, no text.{consistency_hints}"
+        style_part, palette_hint = reel_parts
+        return f"{visual_prompt}{style_part}{character_hints}{palette_hint}"
 
-    def generate_images(self, script_json: Dict, theme: str, reel_name: str, mode: str = "story") -> List[str]:
-        generated_files = []
+    def generate_images(self, script_json: Dict, theme: str, reel_name: str, mode: str = "story", max_workers: int = 8) -> List[str]:
         scenes = script_json.get("scenes", [])
         visual_bible = script_json.get("visual_bible")
 
         reel_dir = os.path.join(self.base_output_dir, reel_name, "images")
         os.makedirs(reel_dir, exist_ok=True)
 
-        for scene in scenes:
-            scene_num = scene.get("scene_number")
-            visual_prompt = scene.get("visual_prompt")
-
-            optimized_prompt = self._optimize_prompt(visual_prompt, theme, visual_bible, mode)
-            
-            # Updated payload format for amazon.nova-canvas-v1:0
-            body_dict = {
-                "taskType": "TEXT_IMAGE",
-                "textToImageParams": {
-                    "text": optimized_prompt
-                },
-                "imageGenerationConfig": {
-                    "numberOfImages": 1,
-                    "height": 1024,  # 9:16 ratio
-                    "width": 576,
-                    "quality": "standard",
-                    "cfgScale": 8.0
-                }
-            }
-
-            success = False
-            for attempt in range(2): # Simple retry with slightly modified prompt if filtered
-                try:
-                    if attempt > 0:
-                        # Slightly modify prompt if it was blocked
-                        if mode == "news":
-                            body_dict["textToImageParams"]["text"] = f"Photo of: {visual_prompt}, natural lighting"
-                        else:
-                            body_dict["textToImageParams"]["text"] = f"A beautiful artistic depiction of: {visual_prompt}"
-
-                    response = self.bedrock.invoke_model(
-                        modelId=self.model_id,
-                        body=json.dumps(body_dict)
-                    )
-                    
-                    response_body = json.loads(response.get("body").read())
-                    base64_image = response_body.get("images")[0]
-                    image_data = base64.b64decode(base64_image)
-                    
-                    file_path = os.path.join(reel_dir, f"scene_{scene_num}.png")
-                    with open(file_path, "wb") as f:
-                        f.write(image_data)
-                    
-                    generated_files.append(file_path)
-                    success = True
-                    break
-                except Exception as e:
-                    if "blocked by our content filters" in str(e) and attempt == 0:
-                        print(f"Content filter block for scene {scene_num}, retrying with modified prompt...")
-                        continue
-                    print(f"Error generating image for scene {scene_num}: {e}")
-                    raise Exception(f"Failed to generate image for scene {scene_num}: {e}")
-            
-            if not success:
-                raise Exception(f"Failed to generate image for scene {scene_num} after multiple attempts.")
-                
-        return generated_files
+        if not scenes:
+            return []
+
+        # Style, palette and character table are the same for every scene
+        reel_parts = self._reel_prompt_parts(theme, visual_bible)
+        character_index = _character_index(visual_bible)
+
+        # Each Nova Canvas call is one network round trip; request all scenes
+        # at once (results keep scene order, the first failure is raised)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(scenes)))) as executor:
+            return list(executor.map(
+                lambda scene: self._generate_scene_image(scene, reel_parts, mode, reel_dir, character_index),
+                scenes
+            ))
+
+    def _generate_scene_image(
+        self,
+        scene: Dict,
+        reel_parts: Tuple[str, str],
+        mode: str,
+        reel_dir: str,
+        character_index: Optional[Tuple] = None
+    ) -> str:
+        scene_num = scene.get("scene_number")
+        visual_prompt = scene.get("visual_prompt")
+
+        optimized_prompt = self._optimize_prompt(visual_prompt, reel_parts, mode, character_index)
+
+        prompt_text = optimized_prompt
+        file_path = os.path.join(reel_dir, f"scene_{scene_num}.png")
+
+        for attempt in range(2): # Simple retry with slightly modified prompt if filtered
+            try:
+                if attempt > 0:
+                    # Slightly modify prompt if it was blocked
+                    if mode == "news":
+                        prompt_text = f"Photo of: {visual_prompt}, natural lighting"
+                    else:
+                        prompt_text = f"A beautiful artistic depiction of: {visual_prompt}"
+
+                # Payload format for amazon.nova-canvas-v1:0, encoded once:
+                # the same bytes are hashed for the cache key and sent
+                body = _canvas_request_body(prompt_text)
+
+                cached_path = self._cache_path(body) if self.use_cache else None
+                if cached_path and os.path.exists(cached_path):
+                    shutil.copyfile(cached_path, file_path)
+                    return file_path
+
+                _save_canvas_image(self._invoke_model(body), file_path)
+
+                if cached_path:
+                    self._cache_store(cached_path, file_path)
+
+                return file_path
+            except Exception as e:
+                if "blocked by our content filters" in str(e) and attempt == 0:
+                    print(f"Content filter block for scene {scene_num}, retrying with modified prompt...")
+                    continue
+                print(f"Error generating image for scene {scene_num}: {e}")
+                raise Exception(f"Failed to generate image for scene {scene_num}: {e}")
+
+        raise Exception(f"Failed to generate image for scene {scene_num} after multiple attempts.")
+
+    def _invoke_model(self, body: bytes) -> bytes:
+        """
+        Run one Nova Canvas request, at most max_parallel_requests at a time.
+
+        Throttling errors back off (exponentially, with jitter) and retry up
+        to MAX_THROTTLE_RETRIES times; any other error is raised as is.
+
+        Returns:
+            Raw response body
+        """
+        for attempt in range(MAX_THROTTLE_RETRIES + 1):
+            try:
+                with self._request_semaphore:
+                    response = self.bedrock.invoke_model(modelId=self.model_id, body=body)
+                    return response["body"].read()
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") not in THROTTLING_ERRORS or attempt == MAX_THROTTLE_RETRIES:
+                    raise
+            # Waits without holding a slot, so other scenes keep going
+            time.sleep(min(30.0, 2.0 ** attempt) + random.uniform(0, 1))
+
+    def _cache_path(self, body: bytes) -> str:
+        """Cache file for a request: a hash of the model and the exact request body."""
+        key = hashlib.sha256(self.model_id.encode("utf-8") + b"\n" + body).hexdigest()
+        return os.path.join(CANVAS_CACHE_DIR, f"{key}.png")
+
+    def _cache_store(self, cached_path: str, file_path: str) -> None:
+        """Copy a generated image into the cache (temp file, then renamed into place)."""
+        tmp_path = f"{cached_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(CANVAS_CACHE_DIR, exist_ok=True)
+            shutil.copyfile(file_path, tmp_path)
+            os.replace(tmp_path, cached_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
 if __name__ == "__main__":
     # Example usage
@@ -1,15 +1,49 @@
 import os
 import json
-import boto3
-from typing import Dict, List
+import logging
+import shutil
+import hashlib
+import threading
+import time
+from urllib.parse import unquote, urlparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
+from bedrock_utils import get_aws_client
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Polly audio is copied to disk in chunks of this size as it arrives
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Polly responses are cached on disk by their request
+POLLY_CACHE_DIR = os.getenv("POLLY_CACHE_DIR", os.path.join(".cache", "polly"))
+
+# Asynchronous synthesis tasks write their output here before it is downloaded
+POLLY_S3_BUCKET = os.getenv("S3_BUCKET_NAME", "reelforge-video-output")
+POLLY_S3_PREFIX = os.getenv("POLLY_S3_PREFIX", "polly-tasks/")
+POLLY_TASK_TIMEOUT = float(os.getenv("POLLY_TASK_TIMEOUT", "300"))
+
+def _save_stream(stream, file_path: str) -> None:
+    """Write a Polly AudioStream to file_path chunk by chunk, never holding the whole payload."""
+    with open(file_path, "wb") as f:
+        for chunk in stream.iter_chunks(chunk_size=STREAM_CHUNK_SIZE):
+            f.write(chunk)
+
 class VoiceAgent:
-    def __init__(self, voice_id: str = "Justin", engine: str = "neural"):
+    def __init__(self, voice_id: str = "Justin", engine: str = "neural", use_async_polly: bool = False):
         self.region = os.getenv("AWS_REGION", "us-east-1")
-        self.polly = boto3.client("polly", region_name=self.region)
+        # Shared client: scenes are synthesized concurrently on one pool
+        self.polly = get_aws_client("polly", self.region)
+
+        # Synthesize through start_speech_synthesis_task (output staged in
+        # S3) instead of synthesize_speech: every scene's task is queued at
+        # once and Polly renders them in parallel, and lines are not held
+        # to the synchronous request size limit
+        self.use_async_polly = use_async_polly or os.getenv("POLLY_ASYNC_TASKS") == "1"
+        self.s3_client = get_aws_client("s3", self.region) if self.use_async_polly else None
         self.voice_id = voice_id
         self.engine = engine
         self.base_output_dir = "output"
@@ -24,85 +58,190 @@ class VoiceAgent:
             "MAN": "Matthew",
             "NARRATOR": "Justin"
         }
+        # Same mapping keyed by uppercase name: one lookup per character
+        self._voice_map = {name.upper(): voice for name, voice in self.character_voice_mapping.items()}
+
+    def _synthesize(self, **request) -> Optional[str]:
+        """
+        Call Polly once per distinct request (synthesize_speech, or a
+        synthesis task when use_async_polly is set).
+
+        Polly's output is determined by the text, voice, engine and format,
+        so each response is kept in POLLY_CACHE_DIR under a hash of the
+        request; repeated lines and reruns of a reel skip the round trip.
+
+        Returns:
+            Path of the cached response (MP3 or speech marks JSON), or None
+            if Polly returned no audio stream
+        """
+        key = hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+        extension = "mp3" if request["OutputFormat"] == "mp3" else "json"
+        cached_path = os.path.join(POLLY_CACHE_DIR, f"{key}.{extension}")
+        if os.path.exists(cached_path):
+            return cached_path
+
+        if not self.use_async_polly:
+            response = self.polly.synthesize_speech(**request)
+            if "AudioStream" not in response:
+                return None
+
+        # Written under a temporary name, then renamed into place, so a
+        # concurrent or interrupted write never leaves a partial entry
+        os.makedirs(POLLY_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cached_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if self.use_async_polly:
+                self._run_synthesis_task(request, tmp_path)
+            else:
+                _save_stream(response["AudioStream"], tmp_path)
+            os.replace(tmp_path, cached_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return cached_path
+
+    def _run_synthesis_task(self, request: Dict, file_path: str) -> None:
+        """
+        Run one request as a Polly synthesis task and download its output.
+
+        The task is queued immediately; its status is then polled with
+        exponential backoff (0.25s doubling up to 4s) and the finished
+        object is downloaded from POLLY_S3_BUCKET to file_path, then deleted
+        from the bucket.
 
-    def generate_speech_marks(self, text: str, text_type: str = "text") -> str:
+        Raises:
+            RuntimeError: If the task fails
+            TimeoutError: If the task is not done within POLLY_TASK_TIMEOUT seconds
+        """
+        task = self.polly.start_speech_synthesis_task(
+            OutputS3BucketName=POLLY_S3_BUCKET,
+            OutputS3KeyPrefix=POLLY_S3_PREFIX,
+            **request
+        )["SynthesisTask"]
+
+        delay = 0.25
+        deadline = time.monotonic() + POLLY_TASK_TIMEOUT
+        while task["TaskStatus"] not in ("completed", "failed"):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Polly task {task['TaskId']} not done after {POLLY_TASK_TIMEOUT:.0f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 4.0)
+            task = self.polly.get_speech_synthesis_task(TaskId=task["TaskId"])["SynthesisTask"]
+
+        if task["TaskStatus"] == "failed":
+            raise RuntimeError(f"Polly task {task['TaskId']} failed: {task.get('TaskStatusReason')}")
+
+        # OutputUri is https://s3.<region>.amazonaws.com/<bucket>/<key> with
+        # the key URL-encoded (or <bucket>.s3... with just /<key> as the path)
+        key = unquote(urlparse(task["OutputUri"]).path).lstrip("/")
+        if key.startswith(f"{POLLY_S3_BUCKET}/"):
+            key = key[len(POLLY_S3_BUCKET) + 1:]
+        self.s3_client.download_file(POLLY_S3_BUCKET, key, file_path)
+
+        # The audio now lives in the local cache; don't let task output pile up
+        try:
+            self.s3_client.delete_object(Bucket=POLLY_S3_BUCKET, Key=key)
+        except Exception as e:
+            logger.warning("Could not delete Polly task output %s: %s", key, e)
+
+    def generate_speech_marks(self, text: str, text_type: str = "text", voice_id: str = None) -> str:
         """
         Calls Amazon Polly to generate word-level speech marks for the given text.
+
+        voice_id defaults to the agent's voice; pass the voice the audio was
+        synthesized with, since word timings differ between voices.
         """
         try:
-            response = self.polly.synthesize_speech(
+            cached_path = self._synthesize(
                 Text=text,
                 OutputFormat="json",
-                VoiceId=self.voice_id,
+                VoiceId=voice_id or self.voice_id,
                 Engine=self.engine,
                 TextType=text_type,
                 SpeechMarkTypes=["word"]
             )
             
-            if "AudioStream" in response:
-                return response["AudioStream"].read().decode("utf-8")
+            if cached_path:
+                with open(cached_path, "r", encoding="utf-8") as f:
+                    return f.read()
         except Exception as e:
-            print(f"Error generating speech marks: {e}")
+            logger.warning("Error generating speech marks: %s", e)
         return ""
 
-    def generate_audio(self, script_json: Dict, reel_name: str, mode: str = "story") -> List[str]:
-        generated_files = []
+    def generate_audio(self, script_json: Dict, reel_name: str, mode: str = "story", max_workers: int = 8) -> List[str]:
         scenes = script_json.get("scenes", [])
         
         audio_dir = os.path.join(self.base_output_dir, reel_name, "audio")
         os.makedirs(audio_dir, exist_ok=True)
         
+        # Validate every scene before synthesizing anything
         for scene in scenes:
-            scene_num = scene.get("scene_number")
-            
             if "voice_line" not in scene:
-                raise ValueError(f"Missing voice_line field in scene {scene_num}")
-                
-            voice_line = scene.get("voice_line")
+                raise ValueError(f"Missing voice_line field in scene {scene.get('scene_number')}")
+
+        scenes = [scene for scene in scenes if scene.get("voice_line") and scene["voice_line"].strip()]
+        if not scenes:
+            return []
+
+        # Polly requests are independent round trips; synthesize scenes concurrently
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(scenes)))) as executor:
+            results = list(executor.map(
+                lambda scene: self._synthesize_scene(scene, audio_dir, mode),
+                scenes
+            ))
+
+        return [file_path for file_path in results if file_path]
+
+    def _synthesize_scene(self, scene: Dict, audio_dir: str, mode: str) -> Optional[str]:
+        """Synthesize one scene's voice line and speech marks; returns the MP3 path, or None on failure."""
+        scene_num = scene.get("scene_number")
+        voice_line = scene.get("voice_line")
+
+        try:
+            text_to_synthesize = voice_line
+            text_type = "text"
             
-            if not voice_line or not voice_line.strip():
-                continue
-                
-            try:
-                text_to_synthesize = voice_line
-                text_type = "text"
-                
-                if mode == "news":
-                    # Use SSML for news mode to ensure a slower, professional pace
-                    text_to_synthesize = f"<speak><prosody rate='slow'>{voice_line}</prosody></speak>"
-                    text_type = "ssml"
+            if mode == "news":
+                # Use SSML for news mode to ensure a slower, professional pace
+                text_to_synthesize = f"<speak><prosody rate='slow'>{voice_line}</prosody></speak>"
+                text_type = "ssml"
+
+            # The speech marks request doesn't depend on the audio; send both at once
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                marks_future = executor.submit(self.generate_speech_marks, text_to_synthesize, text_type)
 
-                response = self.polly.synthesize_speech(
+                cached_path = self._synthesize(
                     Text=text_to_synthesize,
                     OutputFormat="mp3",
                     VoiceId=self.voice_id,
                     Engine=self.engine,
                     TextType=text_type
                 )
+                speech_marks = marks_future.result()
+
+            file_path = os.path.join(audio_dir, f"scene_{scene_num}.mp3")
+            if cached_path:
+                shutil.copyfile(cached_path, file_path)
+
+                # Save speech marks
+                if speech_marks:
+                    speechmarks_path = f"{file_path}_speechmarks.json"
+                    with open(speechmarks_path, "w") as f:
+                        f.write(speech_marks)
                 
-                file_path = os.path.join(audio_dir, f"scene_{scene_num}.mp3")
-                if "AudioStream" in response:
-                    with open(file_path, "wb") as f:
-                        f.write(response["AudioStream"].read())
-                    
-                    # Generate and save speech marks
-                    speech_marks = self.generate_speech_marks(text_to_synthesize, text_type)
-                    if speech_marks:
-                        speechmarks_path = f"{file_path}_speechmarks.json"
-                        with open(speechmarks_path, "w") as f:
-                            f.write(speech_marks)
-                    
-                    generated_files.append(file_path)
-            except Exception as e:
-                print(f"Error generating audio for scene {scene_num}: {e}")
+                return file_path
+        except Exception as e:
+            logger.error("Error generating audio for scene %s: %s", scene_num, e)
 
-        return generated_files
+        return None
 
     def generate_audio_for_animated_scenes(
         self,
         parsed_script: Dict,
         reel_name: str,
-        mode: str = "story"
+        mode: str = "story",
+        generate_visemes: Optional[bool] = None
     ) -> List[Dict]:
         """
         Generate audio with character-specific voices and viseme data.
@@ -111,6 +250,8 @@ class VoiceAgent:
             parsed_script: Output from ScriptParserAgent with scenes
             reel_name: Name for organizing output
             mode: "story" or "news"
+            generate_visemes: Also request viseme marks (defaults to off in
+                news mode, which has no character mouths to animate)
 
         Returns:
             List of dictionaries with audio_path, speech_marks, visemes, character
@@ -121,7 +262,10 @@ class VoiceAgent:
         audio_dir = os.path.join(self.base_output_dir, reel_name, "audio")
         os.makedirs(audio_dir, exist_ok=True)
 
-        print(f"\n=== Generating audio for {len(scenes)} scenes ===")
+        if generate_visemes is None:
+            generate_visemes = mode != "news"
+
+        logger.info("=== Generating audio for %d scenes ===", len(scenes))
 
         for scene in scenes:
             scene_num = scene.get("scene_number")
@@ -129,15 +273,15 @@ class VoiceAgent:
             dialogue = scene.get("dialogue", "")
 
             if not dialogue or not dialogue.strip():
-                print(f"\nScene {scene_num}: No dialogue, skipping")
+                logger.debug("Scene %s: No dialogue, skipping", scene_num)
                 continue
 
             # Determine character and voice
             character_name = characters[0] if characters else "NARRATOR"
             voice_id = self._get_voice_for_character(character_name)
 
-            print(f"\nScene {scene_num}: {character_name} ({voice_id})")
-            print(f"  Dialogue: {dialogue[:50]}...")
+            logger.debug("Scene %s: %s (%s)", scene_num, character_name, voice_id)
+            logger.debug("Scene %s: Dialogue: %.50s...", scene_num, dialogue)
 
             try:
                 audio_data = self.generate_audio_with_visemes(
@@ -146,14 +290,15 @@ class VoiceAgent:
                     voice_id=voice_id,
                     scene_num=scene_num,
                     reel_name=reel_name,
-                    mode=mode
+                    mode=mode,
+                    generate_visemes=generate_visemes
                 )
 
                 generated_audio.append(audio_data)
-                print(f"  ✓ Audio generated")
+                logger.debug("Scene %s: ✓ Audio generated", scene_num)
 
             except Exception as e:
-                print(f"  ✗ Error: {e}")
+                logger.error("Scene %s (%s): ✗ Error: %s", scene_num, character_name, e)
                 raise
 
         return generated_audio
@@ -165,7 +310,8 @@ class VoiceAgent:
         voice_id: str,
         scene_num: int,
         reel_name: str,
-        mode: str = "story"
+        mode: str = "story",
+        generate_visemes: bool = True
     ) -> Dict:
         """
         Generate audio, speech marks, and visemes for a character.
@@ -177,6 +323,7 @@ class VoiceAgent:
             scene_num: Scene number
             reel_name: Name for organizing output
             mode: "story" or "news"
+            generate_visemes: If False, skip the viseme request (visemes_path is None)
 
         Returns:
             Dictionary with audio_path, speech_marks_path, visemes_path, character
@@ -191,37 +338,45 @@ class VoiceAgent:
             text_to_synthesize = f"<speak><prosody rate='slow'>{dialogue}</prosody></speak>"
             text_type = "ssml"
 
-        # Generate audio
-        audio_response = self.polly.synthesize_speech(
-            Text=text_to_synthesize,
-            OutputFormat="mp3",
-            VoiceId=voice_id,
-            Engine=self.engine,
-            TextType=text_type
-        )
-
         # Safe character name for filename
         safe_char_name = character_name.replace(" ", "_").replace("-", "_")
         file_base = os.path.join(audio_dir, f"scene_{scene_num}_{safe_char_name}")
-
-        # Save audio
         audio_path = f"{file_base}.mp3"
-        with open(audio_path, "wb") as f:
-            f.write(audio_response["AudioStream"].read())
 
-        # Generate speech marks (word-level timing)
-        speech_marks = self.generate_speech_marks(text_to_synthesize, text_type)
-        speech_marks_path = f"{file_base}_speechmarks.json"
+        # Audio, speech marks (word-level timing) and visemes (mouth shape
+        # data for future lip-sync) are independent Polly requests for the
+        # same text: send all three at once
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            marks_future = executor.submit(self.generate_speech_marks, text_to_synthesize, text_type, voice_id)
+            visemes_future = (
+                executor.submit(self._generate_visemes, text_to_synthesize, voice_id, text_type)
+                if generate_visemes else None
+            )
+
+            # Generate and save audio
+            cached_path = self._synthesize(
+                Text=text_to_synthesize,
+                OutputFormat="mp3",
+                VoiceId=voice_id,
+                Engine=self.engine,
+                TextType=text_type
+            )
+            if not cached_path:
+                raise ValueError(f"Polly returned no audio for scene {scene_num}")
+            shutil.copyfile(cached_path, audio_path)
 
+            speech_marks = marks_future.result()
+            visemes = visemes_future.result() if visemes_future else None
+
+        speech_marks_path = f"{file_base}_speechmarks.json"
         with open(speech_marks_path, "w") as f:
             f.write(speech_marks)
 
-        # Generate visemes (mouth shape data for future lip-sync)
-        visemes = self._generate_visemes(text_to_synthesize, voice_id, text_type)
-        visemes_path = f"{file_base}_visemes.json"
-
-        with open(visemes_path, "w") as f:
-            f.write(visemes)
+        visemes_path = None
+        if visemes is not None:
+            visemes_path = f"{file_base}_visemes.json"
+            with open(visemes_path, "w") as f:
+                f.write(visemes)
 
         return {
             "audio_path": audio_path,
@@ -241,17 +396,8 @@ class VoiceAgent:
         Returns:
             Polly voice ID
         """
-        # Try exact match first
-        if character_name in self.character_voice_mapping:
-            return self.character_voice_mapping[character_name]
-
-        # Try uppercase match
-        upper_name = character_name.upper()
-        if upper_name in self.character_voice_mapping:
-            return self.character_voice_mapping[upper_name]
-
-        # Default to narrator voice
-        return self.voice_id
+        # Case-insensitive match, defaulting to the narrator voice
+        return self._voice_map.get(character_name.upper(), self.voice_id)
 
     def _generate_visemes(
         self,
@@ -271,7 +417,7 @@ class VoiceAgent:
             JSON string with viseme data
         """
         try:
-            response = self.polly.synthesize_speech(
+            cached_path = self._synthesize(
                 Text=text,
                 OutputFormat="json",
                 VoiceId=voice_id,
@@ -280,15 +426,18 @@ class VoiceAgent:
                 SpeechMarkTypes=["viseme"]
             )
 
-            if "AudioStream" in response:
-                return response["AudioStream"].read().decode("utf-8")
+            if cached_path:
+                with open(cached_path, "r", encoding="utf-8") as f:
+                    return f.read()
 
         except Exception as e:
-            print(f"    Warning: Could not generate visemes: {e}")
+            logger.warning("Could not generate visemes: %s", e)
 
         return "[]"
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # Test legacy generate_audio
     example_script = {
         "scenes": [